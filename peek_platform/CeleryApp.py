@@ -1,10 +1,35 @@
+import gc
 
+from peek_platform import PeekPlatformConfig
 
-from celery import Celery
 
-from peek_platform import PeekPlatformConfig
+class _LazyCeleryApp:
+    """ Lazy Celery App
+
+    Celery is only imported when the app is first used, EG by a @celeryApp.task
+    decorator or start(). Services that never run a worker don't pay for it.
+
+    The attributes are passed through to the Celery app.
+
+    """
+
+    def __init__(self):
+        object.__setattr__(self, '_app', None)
+
+    def _celeryApp(self):
+        if self._app is None:
+            from celery import Celery
+            object.__setattr__(self, '_app', Celery('celery'))
+        return self._app
+
+    def __getattr__(self, name):
+        return getattr(self._celeryApp(), name)
 
-celeryApp = Celery('celery')
+    def __setattr__(self, name, value):
+        setattr(self._celeryApp(), name, value)
+
+
+celeryApp = _LazyCeleryApp()
 
 
 def configureCeleryApp(app):
@@ -24,7 +49,17 @@ def configureCeleryApp(app):
     )
 
 
+def _attachSharedConfigSnapshot(**kwargs):
+    # This runs in each prefork child, serve the config from the parents snapshot
+    PeekPlatformConfig.config.attachSharedSnapshot()
+
+    # Each prefork child runs one task at a time
+    PeekPlatformConfig.dbConcurrency = 1
+
+
 def start():
+    from celery.signals import worker_process_init
+
     configureCeleryApp(celeryApp)
 
     pluginIncludes = PeekPlatformConfig.pluginLoader.celeryAppIncludes
@@ -38,4 +73,13 @@ def start():
     # Worker is passed as sender to @worker_init.connect
     celeryApp.peekDbConnectString = PeekPlatformConfig.config.dbConnectString
 
+    # Publish the config once, for the prefork children to share.
+    # Call PeekPlatformConfig.config.publishSharedSnapshot() again to push changes.
+    PeekPlatformConfig.config.publishSharedSnapshot()
+    worker_process_init.connect(_attachSharedConfigSnapshot, weak=False)
+
+    # Keep the GC from touching, and so copying, the parents objects in the children
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
     celeryApp.worker_main()
@@ -0,0 +1,181 @@
+""" Peek DB Pool
+
+This module sizes the SQLAlchemy connection pools from the concurrency of the process,
+and records telemetry for them.
+
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_watchEnginesLock = threading.Lock()
+_watchingEngines = False
+
+
+def processDbConcurrency() -> int:
+    """ Process DB Concurrency
+
+    :return: The number of threads in this process that may use the database at once.
+
+    This is PeekPlatformConfig.dbConcurrency if the service has set it, (EG, celery
+    sets it to 1 in each prefork child), otherwise it's the size of the reactors
+    thread pool, which is where the blocking DB calls run.
+    """
+    from peek_platform import PeekPlatformConfig
+    if PeekPlatformConfig.dbConcurrency:
+        return PeekPlatformConfig.dbConcurrency
+
+    from twisted.internet import reactor
+    return reactor.getThreadPool().max
+
+
+def autoDbEngineArgs(concurrency: int) -> dict:
+    """ Auto DB Engine Args
+
+    :param concurrency: The number of threads that may use the database at once
+    :return: The pool args for create_engine, sized for the concurrency
+    """
+    concurrency = max(1, concurrency)
+    return {
+        'pool_size': concurrency,  # One connection per thread
+        'max_overflow': max(1, concurrency // 2),  # Head room for nested sessions
+    }
+
+
+class PeekDbPoolTelemetry:
+    """ Peek DB Pool Telemetry
+
+    This class records how the connections of a SQLAlchemy pool are used.
+
+    It wraps the pools _do_get method, so it sees how long each checkout waited and
+    which ones timed out. The other figures come from the pool its self.
+
+    """
+
+    __instancesByName = {}
+
+    def __init__(self, name: str, pool, timeoutExceptionType=None):
+        """ Constructor
+
+        :param name: The name to report the pool as, EG the DB url without a password
+        :param pool: The SQLAlchemy pool, or a stand in with the same interface.
+        :param timeoutExceptionType: The exception the pool raises on a timeout,
+            defaults to sqlalchemy.exc.TimeoutError
+        """
+        if timeoutExceptionType is None:
+            from sqlalchemy.exc import TimeoutError as timeoutExceptionType
+
+        self.name = name
+        self._pool = pool
+        self._lock = threading.Lock()
+
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waitSecondsTotal = 0.0
+        self.waitSecondsMax = 0.0
+
+        doGet = pool._do_get
+
+        def _do_get():
+            startTime = time.perf_counter()
+            timedOut = False
+            try:
+                return doGet()
+
+            except timeoutExceptionType:
+                timedOut = True
+                raise
+
+            finally:
+                self._record(time.perf_counter() - startTime, timedOut)
+
+        pool._do_get = _do_get
+
+        self.__instancesByName[name] = self
+
+    @classmethod
+    def forEngine(cls, name: str, engine) -> 'PeekDbPoolTelemetry':
+        """ For Engine
+
+        Record the telemetry for the pool of a SQLAlchemy engine.
+        """
+        return cls(name, engine.pool)
+
+    @classmethod
+    def allStats(cls) -> [dict]:
+        """ All Stats
+
+        :return: The stats of every pool in this process
+        """
+        return [telemetry.stats() for telemetry in cls.__instancesByName.values()]
+
+    def _record(self, waitSeconds: float, timedOut: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timedOut)
+            self.waitSecondsTotal += waitSeconds
+            self.waitSecondsMax = max(self.waitSecondsMax, waitSeconds)
+
+        if timedOut:
+            logger.warning("DB pool %s timed out after %.3fs, %s",
+                           self.name, waitSeconds, self.stats())
+
+    def _poolValue(self, methodName: str):
+        method = getattr(self._pool, methodName, None)
+        return method() if method else None
+
+    def stats(self) -> dict:
+        """ Stats
+
+        :return: A dict of the current pool stats
+        """
+        with self._lock:
+            return {
+                'name': self.name,
+                'pid': os.getpid(),
+                'size': self._poolValue('size'),
+                'checkedOut': self._poolValue('checkedout'),
+                'checkedIn': self._poolValue('checkedin'),
+                'overflow': self._poolValue('overflow'),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'waitSecondsMax': self.waitSecondsMax,
+                'waitSecondsAvg': (self.waitSecondsTotal / self.checkouts
+                                   if self.checkouts else 0.0),
+            }
+
+
+def watchEnginePools() -> None:
+    """ Watch Engine Pools
+
+    Record the telemetry for the pool of every SQLAlchemy engine in this process.
+
+    The services create the engines from dbEngineArgs, so this is started when they
+    are read, and the telemetry is attached when each engine first connects.
+    """
+    global _watchingEngines
+
+    with _watchEnginesLock:
+        if _watchingEngines:
+            return
+
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, 'engine_connect', _engineConnected)
+        _watchingEngines = True
+
+
+def _engineConnected(connection, *args) -> None:
+    # SQLAlchemy before 2.0 passes a "branch" argument as well
+    engine = connection.engine
+
+    with _watchEnginesLock:
+        if getattr(engine.pool, '_peekDbPoolTelemetry', None) is not None:
+            return
+
+        # The url repr hides the password
+        engine.pool._peekDbPoolTelemetry = PeekDbPoolTelemetry.forEngine(
+            repr(engine.url), engine)
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+from peek_platform.PeekDbPool import PeekDbPoolTelemetry, autoDbEngineArgs, \
+    watchEnginePools
+
+
+class _StandInPool:
+    """ A pool stand in, that times out every second checkout """
+
+    class Timeout(Exception):
+        pass
+
+    def __init__(self):
+        self._gets = 0
+
+    def _do_get(self):
+        self._gets += 1
+        if not self._gets % 2:
+            raise self.Timeout()
+        return object()
+
+    def size(self):
+        return 1
+
+    def checkedout(self):
+        return self._gets
+
+
+class PeekDbPoolTest(unittest.TestCase):
+    def testAutoDbEngineArgs(self):
+        self.assertEqual(autoDbEngineArgs(1), {'pool_size': 1, 'max_overflow': 1})
+        self.assertEqual(autoDbEngineArgs(10), {'pool_size': 10, 'max_overflow': 5})
+        self.assertEqual(autoDbEngineArgs(0)['pool_size'], 1)
+
+    def testStandInPool(self):
+        pool = _StandInPool()
+        telemetry = PeekDbPoolTelemetry('standIn', pool,
+                                        timeoutExceptionType=_StandInPool.Timeout)
+
+        pool._do_get()
+        with self.assertRaises(_StandInPool.Timeout):
+            pool._do_get()
+
+        stats = telemetry.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['size'], 1)
+        self.assertIsNone(stats['overflow'])
+
+    def testSqlitePool(self):
+        fd, dbPath = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.addCleanup(os.remove, dbPath)
+
+        engine = create_engine('sqlite:///%s' % dbPath, poolclass=QueuePool,
+                               pool_size=1, max_overflow=0, pool_timeout=0.1)
+        self.addCleanup(engine.dispose)
+
+        telemetry = PeekDbPoolTelemetry.forEngine('sqlite', engine)
+
+        conn = engine.connect()
+        self.assertEqual(telemetry.stats()['checkedOut'], 1)
+
+        with self.assertRaises(TimeoutError):
+            engine.connect()
+
+        conn.close()
+
+        stats = telemetry.stats()
+        self.assertEqual(stats['checkedOut'], 0)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertGreaterEqual(stats['waitSecondsMax'], 0.1)
+        self.assertIn(stats, PeekDbPoolTelemetry.allStats())
+
+    def testWatchEnginePools(self):
+        watchEnginePools()
+
+        engine = create_engine('sqlite:///:memory:', poolclass=QueuePool)
+        self.addCleanup(engine.dispose)
+
+        with engine.connect():
+            pass
+        with engine.connect():
+            pass
+
+        telemetry = engine.pool._peekDbPoolTelemetry
+        self.assertEqual(telemetry.name, repr(engine.url))
+
+        # The first checkout happened before the telemetry was attached
+        self.assertEqual(telemetry.stats()['checkouts'], 1)
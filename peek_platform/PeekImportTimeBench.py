@@ -0,0 +1,120 @@
+""" Peek Import Time Benchmark
+
+Measures the cold start import cost of peek_platform and each of it's subpackages,
+using "python -X importtime". Each module is imported in a new interpreter, so the
+numbers don't depend on what was imported before it.
+
+Run with :
+
+    python -m peek_platform.PeekImportTimeBench [--budget-ms 150] [--top 5]
+
+It exits with 1 if a module takes longer than the budget to import.
+
+"""
+import argparse
+import subprocess
+import sys
+from collections import namedtuple
+
+MODULES = [
+    "peek_platform",
+    "peek_platform.file_config",
+    "peek_platform.plugin",
+    "peek_platform.sw_install",
+    "peek_platform.sw_version",
+    "peek_platform.CeleryApp",
+    "peek_platform.PeekVortexClient",
+    "peek_platform.PeekServerRestartWatchHandler",
+    "peek_platform.file_config.PeekFileConfigABC",
+    "peek_platform.plugin.PluginLoaderABC",
+    "peek_platform.sw_version.PeekSwVersionPollHandler",
+]
+
+_ImportTime = namedtuple("_ImportTime", ["selfUs", "cumulativeUs", "moduleName"])
+
+ModuleImportTime = namedtuple("ModuleImportTime",
+                              ["moduleName", "cumulativeMs", "topImports", "error"])
+
+
+def _parseImportTimes(stderr: str) -> [_ImportTime]:
+    """ Parse Import Times
+
+    The lines look like
+        import time: self [us] | cumulative | imported package
+        import time:       195 |        195 |   _io
+    """
+    importTimes = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        try:
+            selfUs, cumulativeUs, moduleName = line[len("import time:"):].split('|')
+            importTimes.append(_ImportTime(int(selfUs), int(cumulativeUs),
+                                           moduleName.strip()))
+        except ValueError:
+            pass  # The header line
+
+    return importTimes
+
+
+def measureImportTime(moduleName: str, top: int = 5) -> ModuleImportTime:
+    """ Measure Import Time
+
+    :param moduleName: The module to import, EG peek_platform.plugin
+    :param top: The number of the slowest imports, by self time, to return
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime",
+                           "-c", "import %s" % moduleName],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+
+    importTimes = _parseImportTimes(proc.stderr)
+
+    if proc.returncode:
+        error = proc.stderr.strip().splitlines()[-1]
+        return ModuleImportTime(moduleName, None, [], error)
+
+    # The top level import is the last line for the module
+    cumulativeUs = [t.cumulativeUs for t in importTimes
+                    if t.moduleName == moduleName][-1]
+
+    topImports = sorted(importTimes, key=lambda t: t.selfUs, reverse=True)[:top]
+
+    return ModuleImportTime(moduleName, cumulativeUs / 1000.0,
+                            [(t.moduleName, t.selfUs / 1000.0) for t in topImports],
+                            None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peek import time benchmark")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Fail if a module takes longer than this to import")
+    parser.add_argument("--top", type=int, default=5,
+                        help="Show the slowest imports for each module")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    overBudget = []
+
+    for moduleName in args.modules:
+        result = measureImportTime(moduleName, args.top)
+
+        if result.error:
+            print("%-52s    error : %s" % (moduleName, result.error))
+            continue
+
+        print("%-52s %8.1f ms" % (moduleName, result.cumulativeMs))
+        for name, selfMs in result.topImports:
+            print("    %-48s %8.1f ms self" % (name, selfMs))
+
+        if args.budget_ms is not None and result.cumulativeMs > args.budget_ms:
+            overBudget.append(moduleName)
+
+    if overBudget:
+        print("Over the %sms budget : %s" % (args.budget_ms, ', '.join(overBudget)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import importlib
+import sys
+import unittest
+from unittest import mock
+
+from vortex.PayloadIO import PayloadIO
+
+from peek_platform.PeekVortexClient import peekVortexClient
+
+
+class PeekServerRestartWatchHandlerTest(unittest.TestCase):
+    def testEndpointIsRegisteredOnImport(self):
+        moduleName = 'peek_platform.PeekServerRestartWatchHandler'
+        sys.modules.pop(moduleName, None)
+
+        with mock.patch.object(peekVortexClient,
+                               'addReconnectPayload') as addReconnectPayload:
+            module = importlib.import_module(moduleName)
+
+        handler = module.__dict__['__peekServerRestartWatchHandler']
+        self.addCleanup(PayloadIO().remove, handler._ep)
+
+        # The services import the module for it's endpoint, they don't start it
+        self.assertIn(handler._ep, PayloadIO().endpoints)
+        self.assertEqual(handler._ep.filt, module.agentEchoFilt)
+
+        # The server echoes back when the vortex reconnects
+        self.assertEqual(addReconnectPayload.call_count, 1)
+        self.assertEqual(addReconnectPayload.call_args[0][0].filt,
+                         module.agentEchoFilt)
@@ -18,15 +18,44 @@ class PeekVortexClient:
 
     def __init__(self):
         self._vortexClient = VortexClient()
+        self._watchingServerAddress = False
 
     def connect(self):
         from peek_platform import PeekPlatformConfig
         serverPort = PeekPlatformConfig.config.peekServerPort
         serverHost = PeekPlatformConfig.config.peekServerHost
 
+        # Reconnect to the new address when it's changed in config.json
+        if not self._watchingServerAddress:
+            PeekPlatformConfig.config.addChangeListener('peekServerHost', self._reconnect)
+            PeekPlatformConfig.config.addChangeListener('peekServerPort', self._reconnect)
+            self._watchingServerAddress = True
+
         logger.info('Connecting to Peek Server %s:%s', serverHost, serverPort)
         return self._vortexClient.connect(serverHost, serverPort)
 
+    def _reconnect(self):
+        logger.info("Peek Server address has changed, reconnecting")
+
+        try:
+            self._vortexClient.disconnect()
+        except AttributeError:
+            pass  # It never connected
+
+        from peek_platform import PeekPlatformConfig
+        serverPort = PeekPlatformConfig.config.peekServerPort
+        serverHost = PeekPlatformConfig.config.peekServerHost
+
+        logger.info('Connecting to Peek Server %s:%s', serverHost, serverPort)
+        try:
+            return self._vortexClient.connect(serverHost, serverPort)
+
+        except AssertionError:
+            # VortexClient.connect sets the new address, then starts the heart beat
+            # check, which is still running from the first connect. The heart beat
+            # check is left running, send the reconnect payloads to the new address.
+            return self._vortexClient.send()
+
     def disconnect(self):
         self._vortexClient.disconnect()
 
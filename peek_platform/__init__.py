@@ -27,4 +27,8 @@ class PeekPlatformConfig:
     peekSwInstallManager = None
 
     # The instance of the PluginLoaderABC
-    pluginLoader = None
\ No newline at end of file
+    pluginLoader = None
+
+    # The number of threads in this process that may use the database at once.
+    # None means the size of the reactors thread pool, see PeekDbPool
+    dbConcurrency = None
\ No newline at end of file
@@ -17,9 +17,13 @@ import logging
 
 import os
 from abc import ABCMeta
+from collections import defaultdict
 
-import jsoncfg
-from jsoncfg.functions import save_config, ConfigWithWrapper
+from peek_platform.file_config.PeekFileConfigSharedSnapshot import \
+    PeekFileConfigSharedSnapshot
+from peek_platform.file_config.PeekFileConfigSnapshot import PeekFileConfigSnapshot
+from peek_platform.file_config.PeekFileConfigWriteBehind import \
+    PeekFileConfigWriteBehind
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +36,10 @@ class PeekFileConfigABC(metaclass=ABCMeta):
     DEFAULT_FILE_CHMOD = 0o600
     DEFAULT_DIR_CHMOD = 0o700
 
+    # The number of seconds to collect config changes for before writing the file.
+    # Zero writes them on the next reactor tick.
+    SAVE_DELAY = 0.0
+
     __instance = None
 
     def __new__(cls):
@@ -63,12 +71,145 @@ class PeekFileConfigABC(metaclass=ABCMeta):
             with open(self._configFilePath, 'w') as fobj:
                 fobj.write('{}')
 
-        self._cfg = ConfigWithWrapper(self._configFilePath)
+        self._snapshot = PeekFileConfigSnapshot(self._configFilePath)
+        self._cfg = PeekFileConfigWriteBehind(self._configFilePath,
+                                              self.DEFAULT_FILE_CHMOD,
+                                              saveDelay=self.SAVE_DELAY,
+                                              savedCallback=self._snapshot.fileSaved)
+        self._sharedSnapshot = PeekFileConfigSharedSnapshot(self._homePath)
+        self._sharedSnapshotPublished = False
+
+        self._changeCallbacksByPropName = defaultdict(list)
+        self._changeLastValueByPropName = {}
+        self._changeWatchLoopingCall = None
 
         self._hp = '%(' + self._homePath + ')s'
 
     def _save(self):
-        save_config(self._configFilePath, self._cfg)
+        self._cfg.save()
+        self._snapshot.invalidate()
+
+    def _reloadConfig(self):
+        """ Reload Config
+
+        Reload the config from disk, this is called by the snapshot when the config file
+        has been changed by something other than this process.
+        """
+        self._cfg.reload()
+
+    def publishSharedSnapshot(self) -> None:
+        """ Publish Shared Snapshot
+
+        Read all the config properties and publish them for forked children,
+        call this in the parent before forking, and again to push changes to them.
+        """
+        self._primeSnapshot()
+        self._sharedSnapshot.publish(self._snapshot.values())
+        self._sharedSnapshotPublished = True
+
+    def attachSharedSnapshot(self) -> None:
+        """ Attach Shared Snapshot
+
+        Serve the config properties from the snapshot published by the parent,
+        call this in the child after it's forked.
+        """
+        self._sharedSnapshot.attach()
+        self._snapshot.attachShared(self._sharedSnapshot)
+
+    def addChangeListener(self, propName: str, callback) -> None:
+        """ Add Change Listener
+
+        Subscribe to changes of a config property, so the setting can be applied
+        without restarting the process.
+
+        :param propName: The name of the property, EG "loggingLevel"
+        :param callback: Called with no arguments after the property has changed.
+            A callback that's subscribed to several properties that change together
+            is only called once.
+        """
+        self._changeLastValueByPropName[propName] = getattr(self, propName)
+        self._changeCallbacksByPropName[propName].append(callback)
+
+    def removeChangeListener(self, propName: str, callback) -> None:
+        self._changeCallbacksByPropName[propName].remove(callback)
+
+    def checkForChanges(self) -> [str]:
+        """ Check For Changes
+
+        Compare the subscribed properties to their last values, and call the callbacks
+        for the ones that have changed. The properties are served from the snapshot,
+        so this is cheap unless config.json has changed.
+
+        :return: The names of the properties that changed
+        """
+        changedPropNames = []
+        callbacks = []
+
+        for propName, propCallbacks in list(self._changeCallbacksByPropName.items()):
+            newValue = getattr(self, propName)
+            if newValue == self._changeLastValueByPropName.get(propName):
+                continue
+
+            logger.info("Config %s has changed to %s", propName, newValue)
+            self._changeLastValueByPropName[propName] = newValue
+            changedPropNames.append(propName)
+            callbacks += [c for c in propCallbacks if c not in callbacks]
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Applying the config change failed")
+                logger.exception(e)
+
+        # Push the changes to any forked children
+        if changedPropNames and self._sharedSnapshotPublished:
+            self.publishSharedSnapshot()
+
+        return changedPropNames
+
+    def startChangeWatch(self, period: float = 5.0) -> None:
+        """ Start Change Watch
+
+        Check for config changes every period seconds, on the reactor.
+        """
+        from twisted.internet.task import LoopingCall
+
+        if self._changeWatchLoopingCall:
+            return
+
+        self._changeWatchLoopingCall = LoopingCall(self.checkForChanges)
+        d = self._changeWatchLoopingCall.start(period, now=False)
+        d.addErrback(lambda f: logger.error("Config change watch failed\n%s", f))
+
+    def startWatchingChanges(self) -> None:
+        """ Start Watching Changes
+
+        Apply the config changes without a restart. The services that run the reactor
+        call this once it's running, EG reactor.callWhenRunning(...), celery workers
+        and scripts don't, so they don't poll config.json.
+        """
+        if self._changeWatchLoopingCall:
+            return
+
+        # The logging level is in PeekFileConfigPlatformMixin
+        applyLoggingLevelChanges = getattr(self, 'applyLoggingLevelChanges', None)
+        if applyLoggingLevelChanges:
+            applyLoggingLevelChanges()
+
+        self.startChangeWatch()
+
+    def stopChangeWatch(self) -> None:
+        if self._changeWatchLoopingCall:
+            self._changeWatchLoopingCall.stop()
+            self._changeWatchLoopingCall = None
+
+    def _primeSnapshot(self) -> None:
+        for cls in type(self).__mro__:
+            for name, attr in cls.__dict__.items():
+                if (isinstance(attr, property)
+                        and getattr(attr.fget, 'snapshotCached', False)):
+                    getattr(self, name)
 
     def _chkDir(self, path):
         if not os.path.isdir(path):
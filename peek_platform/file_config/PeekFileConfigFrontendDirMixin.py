@@ -1,6 +1,10 @@
 import logging
 import os
 
+from jsoncfg.value_mappers import require_string, require_integer
+
+from peek_platform.file_config.PeekFileConfigSnapshot import snapshotCached
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,3 +55,40 @@ class PeekFileConfigFrontendDirMixin:
             logger.error("Frontend SRC folder does not yest exist : %s", dir)
 
         return dir
+
+    @property
+    @snapshotCached
+    def feDistCacheDir(self) -> str:
+        """ Frontend Dist Cache Directory
+
+        The directory where the dists of previous builds are kept, see
+        PluginFrontendDistCache
+
+        """
+        default = os.path.join(self._homePath, 'frontend_dist_cache')
+        with self._cfg as c:
+            return c.frontend.distCacheDir(default, require_string)
+
+    @property
+    @snapshotCached
+    def feDistCacheMaxBytes(self) -> int:
+        """ Frontend Dist Cache Max Bytes
+
+        The least recently used dists are removed when the cache is larger than this.
+        Zero disables the cache.
+
+        """
+        with self._cfg as c:
+            return c.frontend.distCacheMaxBytes(1024 * 1024 * 1024, require_integer)
+
+    @property
+    @snapshotCached
+    def feBuildMaxConcurrent(self) -> int:
+        """ Frontend Build Max Concurrent
+
+        The number of frontend builds that can run at once in this process, the
+        others wait for a build to finish.
+
+        """
+        with self._cfg as c:
+            return c.frontend.buildMaxConcurrent(2, require_integer)
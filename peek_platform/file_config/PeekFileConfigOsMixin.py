@@ -3,6 +3,7 @@ from abc import ABCMeta
 
 from jsoncfg.value_mappers import require_string, require_integer
 from peek_platform.WindowsPatch import isWindows
+from peek_platform.file_config.PeekFileConfigSnapshot import snapshotCached
 
 
 class PeekFileConfigOsMixin(metaclass=ABCMeta):
@@ -11,6 +12,7 @@ class PeekFileConfigOsMixin(metaclass=ABCMeta):
 
     ### SERVER SECTION ###
     @property
+    @snapshotCached
     def bashLocation(self):
         """ Bash Location
 
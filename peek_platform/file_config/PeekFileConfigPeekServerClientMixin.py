@@ -1,18 +1,41 @@
 from abc import ABCMeta
 
-from jsoncfg.value_mappers import require_string, require_integer
+from jsoncfg.value_mappers import require_string, require_integer, RequireType
+from peek_platform.file_config.PeekFileConfigSnapshot import snapshotCached
 
 
 class PeekFileConfigPeekServerClientMixin(metaclass=ABCMeta):
 
     ### SERVER SECTION ###
     @property
+    @snapshotCached
     def peekServerPort(self):
         with self._cfg as c:
             return c.peekServer.port(8011, require_integer)
 
 
     @property
+    @snapshotCached
     def peekServerHost(self):
         with self._cfg as c:
             return c.peekServer.host('127.0.0.1', require_string)
+
+    ### RELEASE RELAY SECTION ###
+    @property
+    @snapshotCached
+    def releaseServerHost(self):
+        """ Release Server Host
+
+        The host to download the releases from, the site release relay if
+        releaseRelay.host is set, otherwise the peek server, see PeekReleaseRelay
+        """
+        with self._cfg as c:
+            host = c.releaseRelay.host(None, RequireType(type(None), str))
+        return host if host else self.peekServerHost
+
+    @property
+    @snapshotCached
+    def releaseServerPort(self):
+        with self._cfg as c:
+            port = c.releaseRelay.port(None, RequireType(type(None), int))
+        return port if port else self.peekServerPort
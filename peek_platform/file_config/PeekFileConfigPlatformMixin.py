@@ -4,8 +4,10 @@ import os
 from abc import ABCMeta, abstractproperty
 from typing import Optional
 
-from jsoncfg.value_mappers import require_string, RequireType, require_list
+from jsoncfg.value_mappers import require_string, RequireType, require_list, \
+    require_integer, require_bool, require_number
 from peek_platform.file_config.PeekFileConfigABC import PeekFileConfigABC
+from peek_platform.file_config.PeekFileConfigSnapshot import snapshotCached
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +16,7 @@ class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
     # --- Platform Logging
 
     @property
+    @snapshotCached
     def loggingLevel(self):
         with self._cfg as c:
             lvl = c.logging.level.installed("INFO", require_string)
@@ -23,22 +26,46 @@ class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
             logger.warning("Logging level %s is not valid, defauling to INFO", lvl)
             return "INFO"
 
+    def applyLoggingLevelChanges(self) -> None:
+        """ Apply Logging Level Changes
+
+        Set the root loggers level when the logging level in config.json changes.
+        """
+
+        def apply():
+            logging.getLogger().setLevel(self.loggingLevel)
+
+        self.addChangeListener('loggingLevel', apply)
+
     # --- Platform Tmp Path
+    # The dir paths are snapshot cached, the dirs are checked on every read, in case
+    # they have been removed since.
     @property
     def tmpPath(self):
+        return self._chkDir(self._tmpPathConfigured)
+
+    @property
+    @snapshotCached
+    def _tmpPathConfigured(self):
         default = os.path.join(self._homePath, 'tmp')
         with self._cfg as c:
-            return self._chkDir(c.disk.tmp(default, require_string))
+            return c.disk.tmp(default, require_string)
 
     # --- Platform Software Path
     @property
     def platformSoftwarePath(self):
+        return self._chkDir(self._platformSoftwarePathConfigured)
+
+    @property
+    @snapshotCached
+    def _platformSoftwarePathConfigured(self):
         default = os.path.join(self._homePath, 'platform_software')
         with self._cfg as c:
-            return self._chkDir(c.platform.softwarePath(default, require_string))
+            return c.platform.softwarePath(default, require_string)
 
     # --- Platform Version
     @property
+    @snapshotCached
     def platformVersion(self):
         with self._cfg as c:
             return c.platform.version('0.0.0', require_string)
@@ -47,15 +74,22 @@ class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
     def platformVersion(self, value):
         with self._cfg as c:
             c.platform.version = value
+        self._snapshot.invalidate()
 
     # --- Plugin Software Path
     @property
     def pluginSoftwarePath(self):
+        return self._chkDir(self._pluginSoftwarePathConfigured)
+
+    @property
+    @snapshotCached
+    def _pluginSoftwarePathConfigured(self):
         default = os.path.join(self._homePath, 'plugin_software')
         with self._cfg as c:
-            return self._chkDir(c.plugin.softwarePath(default, require_string))
+            return c.plugin.softwarePath(default, require_string)
 
     # --- Plugin Software Version
+    @snapshotCached
     def pluginVersion(self, pluginName):
         """ Plugin Version
 
@@ -67,9 +101,26 @@ class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
     def setPluginVersion(self, pluginName, version):
         with self._cfg as c:
             c.plugin[pluginName].version = version
+        self._snapshot.invalidate()
+
+    # --- Plugin Software Dir
+    @snapshotCached
+    def pluginDir(self, pluginName):
+        """ Plugin Dir
+
+        The directory the plugin software was last installed to
+        """
+        with self._cfg as c:
+            return c.plugin[pluginName].dir(None, RequireType(type(None), str))
+
+    def setPluginDir(self, pluginName, dir):
+        with self._cfg as c:
+            c.plugin[pluginName].dir = dir
+        self._snapshot.invalidate()
 
     # --- Plugins Installed
     @property
+    @snapshotCached
     def pluginsEnabled(self):
         with self._cfg as c:
             return c.plugin.enabled([], require_list)
@@ -78,3 +129,129 @@ class PeekFileConfigPlatformMixin(metaclass=ABCMeta):
     def pluginsEnabled(self, value):
         with self._cfg as c:
             c.plugin.enabled = value
+        self._snapshot.invalidate()
+
+    # --- Plugin Load Threads
+    @property
+    @snapshotCached
+    def pluginLoadThreads(self):
+        """ Plugin Load Threads
+
+        The number of threads to import the plugin packages with, 1 loads them one
+        at a time.
+        """
+        with self._cfg as c:
+            return c.plugin.loadThreads(1, require_integer)
+
+    # --- Plugin Lazy Load
+    @property
+    @snapshotCached
+    def pluginLazyLoad(self):
+        """ Plugin Lazy Load
+
+        When True, the plugins are started when the first payload for them arrives,
+        or when they're warmed up, instead of when the service starts.
+        """
+        with self._cfg as c:
+            return c.plugin.lazyLoad(False, require_bool)
+
+    @property
+    def platformPipInstallStatePath(self):
+        """ Platform Pip Install State Path
+
+        The file that records the hash of each installed release package, see
+        PeekPipInstallPlanner
+        """
+        return os.path.join(self._homePath, 'pip_install_state.json')
+
+    @property
+    @snapshotCached
+    def platformDownloadSegments(self):
+        """ Platform Download Segments
+
+        The number of parts to download the large releases in, in parallel, see
+        PeekReleaseDownloader
+        """
+        with self._cfg as c:
+            return c.platform.downloadSegments(4, require_integer)
+
+    @property
+    @snapshotCached
+    def platformDeltaUpdates(self):
+        """ Platform Delta Updates
+
+        When True, the platform updates only download the files that changed since
+        the installed release, see PeekReleaseDelta. The peek server must support
+        the delta download.
+        """
+        with self._cfg as c:
+            return c.platform.deltaUpdates(False, require_bool)
+
+    @property
+    def platformReleaseCachePath(self):
+        """ Platform Release Cache Path
+
+        The dir that keeps the files of the installed release, see
+        PeekReleaseFileCache
+        """
+        return os.path.join(self._homePath, 'platform_release_cache')
+
+    # --- Release Tar Caches
+    @property
+    def platformReleaseTarCachePath(self):
+        """ Platform Release Tar Cache Path
+
+        The dir that keeps the downloaded platform releases, see PeekReleaseCache
+        """
+        return os.path.join(self.platformSoftwarePath, 'release_cache')
+
+    @property
+    def pluginReleaseTarCachePath(self):
+        """ Plugin Release Tar Cache Path
+
+        The dir that keeps the downloaded plugin releases, see PeekReleaseCache
+        """
+        return os.path.join(self.pluginSoftwarePath, 'release_cache')
+
+    @property
+    @snapshotCached
+    def platformReleaseRelayPort(self):
+        """ Platform Release Relay Port
+
+        The port to serve the cached releases to the other services on the site on,
+        see PeekReleaseRelay. The relay isn't started if this is None.
+        """
+        with self._cfg as c:
+            return c.platform.releaseRelayPort(None, RequireType(type(None), int))
+
+    # --- Plugin Manifest Cache
+    @property
+    def pluginManifestCachePath(self):
+        """ Plugin Manifest Cache Path
+
+        The file that caches the plugins package configs, see PluginManifestCache
+        """
+        return os.path.join(self._homePath, 'plugin_manifest_cache.json')
+
+    # --- Plugin Hot Swap
+    @property
+    @snapshotCached
+    def pluginHotSwap(self):
+        """ Plugin Hot Swap
+
+        When True, a new version of a plugin is started alongside the old version,
+        then the payloads are switched over to it, see PluginLoaderABC.swapPlugin
+        """
+        with self._cfg as c:
+            return c.plugin.hotSwap(False, require_bool)
+
+    @property
+    @snapshotCached
+    def pluginSwapDrainSeconds(self):
+        """ Plugin Swap Drain Seconds
+
+        The longest to wait for the old version to finish the payloads it has
+        in flight, before it's unloaded.
+        """
+        with self._cfg as c:
+            return c.plugin.swapDrainSeconds(5.0, require_number)
@@ -0,0 +1,94 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+_GENERATION_FORMAT = '!Q'
+_GENERATION_SIZE = struct.calcsize(_GENERATION_FORMAT)
+
+
+class PeekFileConfigSharedSnapshot:
+    """ Peek File Config Shared Snapshot
+
+    This class shares the config snapshot from a parent process with the children it
+    forks, EG, the celery prefork pool.
+
+    The parent publishes the snapshot values to two files in the home directory :
+
+     * config.snapshot.json : The values, this is replaced atomically on each publish.
+     * config.snapshot.gen : An 8 byte generation counter, updated in place.
+
+    The children mmap the generation file, checking it is just a read from memory.
+    When the generation changes, the children reload the values, this is how a
+    refreshed snapshot is pushed to the children without recycling them.
+
+    """
+
+    def __init__(self, homePath: str):
+        self._valuesFilePath = os.path.join(homePath, 'config.snapshot.json')
+        self._generationFilePath = os.path.join(homePath, 'config.snapshot.gen')
+        self._generation = 0
+        self._mmap = None
+
+    def publish(self, values: dict) -> int:
+        """ Publish (Parent)
+
+        :param values: The snapshot values, keyed by tuple
+        :return: The new generation
+        """
+        data = json.dumps([[list(key), value] for key, value in values.items()])
+
+        dirName = os.path.dirname(self._valuesFilePath)
+        fd, tmpFilePath = tempfile.mkstemp(dir=dirName, prefix='.config.snapshot.')
+        with os.fdopen(fd, 'w') as fobj:
+            fobj.write(data)
+        os.replace(tmpFilePath, self._valuesFilePath)
+
+        # Update the generation in place, the children have it mapped.
+        self._generation = self.generation() + 1
+        mode = 'r+b' if os.path.exists(self._generationFilePath) else 'w+b'
+        with open(self._generationFilePath, mode) as fobj:
+            fobj.write(struct.pack(_GENERATION_FORMAT, self._generation))
+
+        logger.debug("Published config snapshot generation %s with %s values",
+                     self._generation, len(values))
+        return self._generation
+
+    def attach(self) -> None:
+        """ Attach (Child)
+
+        Map the generation file, call this in the child after the fork.
+        """
+        with open(self._generationFilePath, 'rb') as fobj:
+            self._mmap = mmap.mmap(fobj.fileno(), _GENERATION_SIZE,
+                                   access=mmap.ACCESS_READ)
+
+    @property
+    def attached(self) -> bool:
+        return self._mmap is not None
+
+    def generation(self) -> int:
+        """ Generation
+
+        :return: The generation last published by the parent
+        """
+        if self._mmap is not None:
+            return struct.unpack_from(_GENERATION_FORMAT, self._mmap)[0]
+
+        if not os.path.exists(self._generationFilePath):
+            return 0
+
+        with open(self._generationFilePath, 'rb') as fobj:
+            return struct.unpack(_GENERATION_FORMAT, fobj.read(_GENERATION_SIZE))[0]
+
+    def load(self) -> dict:
+        """ Load (Child)
+
+        :return: The snapshot values published by the parent
+        """
+        with open(self._valuesFilePath, 'r') as fobj:
+            return {tuple(key): value for key, value in json.load(fobj)}
@@ -0,0 +1,150 @@
+import copy
+import logging
+import os
+import threading
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+
+class PeekFileConfigSnapshot:
+    """ Peek File Config Snapshot
+
+    This class holds the values returned by the config properties, so that reading a
+    property doesn't walk the jsoncfg tree and value mappers every time.
+
+    The snapshot is keyed by the property name (plus any arguments), it's populated on
+    the first read of each key and cleared when :
+
+     * A setter changes the config, see :meth:`invalidate`
+     * The config file on disk changes, (inode, size or mtime)
+
+    In a forked child, the snapshot can be attached to a
+    :class:`PeekFileConfigSharedSnapshot`, the values are then loaded from what the
+    parent published rather than being read from the config again.
+
+    """
+
+    def __init__(self, configFilePath: str):
+        self._configFilePath = configFilePath
+        self._lock = threading.RLock()
+        self._values = {}
+        self._fileSignature = self._statConfigFile()
+
+        self._shared = None
+        self._sharedGeneration = None
+
+        # Set this to False to bypass the snapshot, (Used for benchmarking)
+        self.enabled = True
+
+    def _statConfigFile(self):
+        try:
+            st = os.stat(self._configFilePath)
+        except FileNotFoundError:
+            return None
+
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def fileChanged(self) -> bool:
+        """ File Changed
+
+        :return: True if the config file has changed since the snapshot was last built
+        """
+        return self._fileSignature != self._statConfigFile()
+
+    def get(self, key, loader, reloader):
+        """ Get
+
+        :param key: The key of the value, EG ("platformVersion",)
+        :param loader: A callable that reads the value from the config
+        :param reloader: A callable that reloads the config from disk, this is called
+            when the file has been changed by something else.
+        :return: A copy of the value if it's mutable, otherwise the value.
+        """
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            if self._shared is not None:
+                generation = self._shared.generation()
+                if generation != self._sharedGeneration:
+                    self._values = self._shared.load()
+                    self._sharedGeneration = generation
+
+            elif self.fileChanged():
+                logger.debug("Config file %s has changed, reloading",
+                             self._configFilePath)
+                reloader()
+                self._values.clear()
+                self._fileSignature = self._statConfigFile()
+
+            try:
+                value = self._values[key]
+
+            except KeyError:
+                value = loader()
+                self._values[key] = value
+
+                # The jsoncfg loader will save the default if it's not set
+                self._fileSignature = self._statConfigFile()
+
+        # Don't let the caller modify our copy
+        if isinstance(value, (list, dict)):
+            return copy.deepcopy(value)
+
+        return value
+
+    def values(self) -> dict:
+        """ Values
+
+        :return: A copy of the values in the snapshot
+        """
+        with self._lock:
+            return copy.deepcopy(self._values)
+
+    def attachShared(self, shared) -> None:
+        """ Attach Shared
+
+        Serve the values from a snapshot published by the parent process.
+
+        :param shared: An attached PeekFileConfigSharedSnapshot
+        """
+        with self._lock:
+            self._shared = shared
+            self._sharedGeneration = None
+
+    def fileSaved(self) -> None:
+        """ File Saved
+
+        Call this after this process has written the config file, the values are still
+        valid, so only the file signature is updated.
+        """
+        with self._lock:
+            self._fileSignature = self._statConfigFile()
+
+    def invalidate(self) -> None:
+        """ Invalidate
+
+        Clear the snapshot, call this after the config has been changed.
+        """
+        with self._lock:
+            self._values.clear()
+            self._fileSignature = self._statConfigFile()
+
+
+def snapshotCached(getter):
+    """ Snapshot Cached
+
+    Decorate a config mixin getter with this to serve it from the configs snapshot.
+    This must be applied below the @property decorator.
+
+    """
+
+    @wraps(getter)
+    def wrapper(self, *args):
+        return self._snapshot.get((getter.__name__,) + args,
+                                  lambda: getter(self, *args),
+                                  self._reloadConfig)
+
+    wrapper.snapshotCached = True
+    return wrapper
@@ -0,0 +1,72 @@
+""" Peek File Config Snapshot Benchmark
+
+Measures the cost of reading config properties with and without the snapshot.
+
+Run with :
+
+    python -m peek_platform.file_config.PeekFileConfigSnapshotBench
+
+"""
+import os
+import shutil
+import timeit
+
+import peek_platform
+from peek_platform.file_config.PeekFileConfigABC import PeekFileConfigABC
+from peek_platform.file_config.PeekFileConfigOsMixin import PeekFileConfigOsMixin
+from peek_platform.file_config.PeekFileConfigPeekServerClientMixin import \
+    PeekFileConfigPeekServerClientMixin
+from peek_platform.file_config.PeekFileConfigPlatformMixin import \
+    PeekFileConfigPlatformMixin
+from peek_platform.file_config.PeekFileConfigSqlAlchemyMixin import \
+    PeekFileConfigSqlAlchemyMixin
+
+COMPONENT_NAME = "unit_bench"
+ITERATIONS = 2000
+
+
+class BenchFileConfig(PeekFileConfigABC,
+                      PeekFileConfigPeekServerClientMixin,
+                      PeekFileConfigPlatformMixin,
+                      PeekFileConfigSqlAlchemyMixin,
+                      PeekFileConfigOsMixin):
+    pass
+
+
+def _readAll(config):
+    config.platformVersion
+    config.pluginVersion('plugin_noop')
+    config.peekServerHost
+    config.peekServerPort
+    config.dbEngineArgs
+    config.bashLocation
+
+
+def _timeReads(config, enabled: bool) -> float:
+    config._snapshot.enabled = enabled
+    _readAll(config)  # Warm up
+    seconds = timeit.timeit(lambda: _readAll(config), number=ITERATIONS)
+    return seconds / ITERATIONS / 6 * 1e6
+
+
+def main():
+    peek_platform.PeekPlatformConfig.componentName = COMPONENT_NAME
+    homeDir = os.path.expanduser('~/%s.home' % COMPONENT_NAME)
+
+    try:
+        config = BenchFileConfig()
+        config.pluginsEnabled = ['plugin_noop'] + ['plugin_%s' % i for i in range(30)]
+
+        uncached = _timeReads(config, enabled=False)
+        cached = _timeReads(config, enabled=True)
+
+        print("Per property read, uncached : %8.2f us" % uncached)
+        print("Per property read, snapshot : %8.2f us" % cached)
+        print("Speedup                     : %8.1fx" % (uncached / cached))
+
+    finally:
+        shutil.rmtree(homeDir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
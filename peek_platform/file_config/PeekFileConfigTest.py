@@ -2,6 +2,7 @@ import logging
 import os
 import shutil
 import unittest
+from unittest import mock
 
 import peek_platform
 from jsoncfg.functions import config_to_json_str
@@ -10,6 +11,8 @@ from peek_platform.file_config.PeekFileConfigPeekServerClientMixin import \
     PeekFileConfigPeekServerClientMixin
 from peek_platform.file_config.PeekFileConfigPlatformMixin import \
     PeekFileConfigPlatformMixin
+from peek_platform.file_config.PeekFileConfigSharedSnapshot import \
+    PeekFileConfigSharedSnapshot
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -108,3 +111,110 @@ class PeekFileConfigTest(unittest.TestCase):
 
         self.assertEqual(bas.platformVersion, '4.4.4')
         self.assertEqual(bas.pluginVersion(pluginName), '2.5.6')
+
+    def testSnapshotInvalidation(self):
+        bas = TestFileConfig()
+
+        bas.platformVersion = '1.1.1'
+        self.assertEqual(bas.platformVersion, '1.1.1')
+
+        # Change the file from outside of the config class
+        newConfigFilePath = self.CONFIG_FILE_PATH + '.new'
+        with open(newConfigFilePath, 'w') as fobj:
+            fobj.write('{"platform":{"version":"2.2.2"}}')
+        os.replace(newConfigFilePath, self.CONFIG_FILE_PATH)
+
+        self.assertEqual(bas.platformVersion, '2.2.2')
+
+    def testRemovedDirIsRecreated(self):
+        bas = TestFileConfig()
+
+        tmpPath = bas.tmpPath
+        self.assertTrue(os.path.isdir(tmpPath))
+
+        shutil.rmtree(tmpPath)
+        self.assertEqual(bas.tmpPath, tmpPath)
+        self.assertTrue(os.path.isdir(tmpPath))
+
+    def testSnapshotReturnsCopies(self):
+        bas = TestFileConfig()
+
+        bas.pluginsEnabled = ['plugin_noop']
+        bas.pluginsEnabled.append('plugin_other')
+
+        self.assertEqual(bas.pluginsEnabled, ['plugin_noop'])
+
+    def testSaveSkippedWhenUnchanged(self):
+        bas = TestFileConfig()
+
+        bas.platformVersion = '3.3.3'
+        inode = os.stat(self.CONFIG_FILE_PATH).st_ino
+
+        # The file is replaced on each write, so the inode will change if it's written
+        bas.platformVersion = '3.3.3'
+        bas._save()
+        self.assertEqual(os.stat(self.CONFIG_FILE_PATH).st_ino, inode)
+
+        bas.setPluginDir('plugin_noop', '/tmp/plugin_noop')
+        self.assertNotEqual(os.stat(self.CONFIG_FILE_PATH).st_ino, inode)
+        self.assertEqual(bas.pluginDir('plugin_noop'), '/tmp/plugin_noop')
+
+    def testSharedSnapshot(self):
+        bas = TestFileConfig()
+        bas.platformVersion = '6.6.6'
+        bas.publishSharedSnapshot()
+
+        # This is what the forked child would have
+        childShared = PeekFileConfigSharedSnapshot(self.HOME_DIR)
+        childShared.attach()
+        generation = childShared.generation()
+        self.assertEqual(childShared.load()[('platformVersion',)], '6.6.6')
+
+        # Push a refreshed snapshot to the child
+        bas.platformVersion = '7.7.7'
+        bas.publishSharedSnapshot()
+
+        self.assertEqual(childShared.generation(), generation + 1)
+        self.assertEqual(childShared.load()[('platformVersion',)], '7.7.7')
+
+    def testChangeListeners(self):
+        bas = TestFileConfig()
+        calls = []
+
+        def changed():
+            calls.append((bas.peekServerHost, bas.peekServerPort))
+
+        bas.addChangeListener('peekServerHost', changed)
+        bas.addChangeListener('peekServerPort', changed)
+        self.assertEqual(bas.checkForChanges(), [])
+
+        # Change the file from outside of the config class
+        newConfigFilePath = self.CONFIG_FILE_PATH + '.new'
+        with open(newConfigFilePath, 'w') as fobj:
+            fobj.write('{"peekServer":{"host":"10.1.1.1", "port":9000}}')
+        os.replace(newConfigFilePath, self.CONFIG_FILE_PATH)
+
+        self.assertEqual(sorted(bas.checkForChanges()),
+                         ['peekServerHost', 'peekServerPort'])
+        self.assertEqual(calls, [('10.1.1.1', 9000)])
+        self.assertEqual(bas.checkForChanges(), [])
+
+    def testChangeWatchIsOptIn(self):
+        from twisted.internet import reactor
+
+        # Creating the config doesn't schedule anything on the reactor
+        with mock.patch.object(reactor, 'callWhenRunning') as callWhenRunning, \
+                mock.patch.object(reactor, 'callLater') as callLater:
+            bas = TestFileConfig()
+
+        self.assertFalse(callWhenRunning.called)
+        self.assertFalse(callLater.called)
+        self.assertIsNone(bas._changeWatchLoopingCall)
+
+        with mock.patch('twisted.internet.task.LoopingCall') as loopingCall:
+            bas.startWatchingChanges()
+            bas.startWatchingChanges()
+            self.addCleanup(bas.stopChangeWatch)
+
+        loopingCall.assert_called_once_with(bas.checkForChanges)
+        self.assertEqual(len(bas._changeCallbacksByPropName['loggingLevel']), 1)
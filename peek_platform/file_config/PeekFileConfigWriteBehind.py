@@ -0,0 +1,207 @@
+import atexit
+import logging
+import os
+import tempfile
+import threading
+
+from jsoncfg.functions import load_config, config_to_json_str
+
+logger = logging.getLogger(__name__)
+
+
+class PeekFileConfigWriteBehind:
+    """ Peek File Config Write Behind
+
+    This class replaces jsoncfgs ConfigWithWrapper, it's used the same way, EG
+
+        with self._cfg as c:
+            c.platform.version = value
+
+    Rather than saving the whole config file at the end of every with block, the
+    changes are coalesced and written once :
+
+     * On the next reactor tick, or after ``saveDelay`` seconds if it's set.
+     * Immediately if the reactor isn't running, EG, in a celery worker.
+     * When the reactor shuts down, or the process exits.
+
+    The file is written to a temp file then moved into place with os.replace, so it's
+    never left half written. The write is skipped if nothing has changed.
+
+    Only a with block that changes the config marks it dirty, and the save is done,
+    and savedCallback called, after the lock is released. The snapshot holds it's own
+    lock while it reads the config, so calling back into it with our lock held could
+    deadlock.
+
+    """
+
+    def __init__(self, configFilePath: str, fileChmod: int, saveDelay: float = 0.0,
+                 savedCallback=None):
+        """ Constructor
+
+        :param configFilePath: The path of the config.json file
+        :param fileChmod: The permissions to create the file with
+        :param saveDelay: The number of seconds to wait for more changes before saving
+        :param savedCallback: Called after the file has been written
+        """
+        self.__configFilePath = configFilePath
+        self.__fileChmod = fileChmod
+        self.__saveDelay = saveDelay
+        self.__savedCallback = savedCallback
+
+        self.__lock = threading.RLock()
+        self.__depth = 0
+        self.__dirty = False
+        self.__flushCall = None
+        self.__shutdownTriggerAdded = False
+
+        self.__config = load_config(configFilePath)
+        self.__savedStr = config_to_json_str(self.__config)
+
+        atexit.register(self.flush)
+
+    def __getattr__(self, item):
+        """ For direct usage, with out the with bock """
+        if item.startswith('_PeekFileConfigWriteBehind__'):
+            raise AttributeError(item)
+
+        return getattr(self.__config, item)
+
+    def __getitem__(self, item):
+        """ For direct usage, with out the with bock """
+        return self.__config[item]
+
+    def __setattr__(self, item, value):
+        """ For direct usage, with out the with bock """
+        if item.startswith('_PeekFileConfigWriteBehind__'):
+            self.__dict__[item] = value
+            return
+
+        setattr(self.__config, item, value)
+
+    def __call__(self, *args, **kwargs):
+        """ For direct usage, with out the with bock """
+        return self.__config(*args, **kwargs)
+
+    def __contains__(self, item):
+        """ For direct usage, with out the with bock """
+        return item in self.__config
+
+    def __enter__(self):
+        self.__lock.acquire()
+        self.__depth += 1
+        return self.__config
+
+    def __exit__(self, type, value, tb):
+        changed = False
+        try:
+            self.__depth -= 1
+
+            # Compare when the outer most block exits. Reading a value that's not set
+            # also changes the config, jsoncfg sets the default.
+            if type is None and not self.__depth:
+                changed = config_to_json_str(self.__config) != self.__savedStr
+                if changed:
+                    self.__dirty = True
+
+        finally:
+            self.__lock.release()
+
+        if changed:
+            self._scheduleFlush()
+
+    def reload(self) -> None:
+        """ Reload
+
+        Reload the config from disk, unless there are changes that haven't been
+        written yet, in which case, our changes win.
+
+        """
+        with self.__lock:
+            if self.__dirty:
+                logger.warning("%s was changed on disk while there are unsaved"
+                               " changes, the changes on disk will be overwritten",
+                               self.__configFilePath)
+                return
+
+            self.__config = load_config(self.__configFilePath)
+            self.__savedStr = config_to_json_str(self.__config)
+
+    def save(self) -> None:
+        """ Save
+
+        Write the config to disk now, if it's changed.
+
+        """
+        with self.__lock:
+            self.__dirty = True
+
+        self.flush()
+
+    def flush(self) -> bool:
+        """ Flush
+
+        Write any pending changes to disk.
+
+        :return: True if the file was written
+        """
+        with self.__lock:
+            if not self.__dirty:
+                return False
+
+            self.__dirty = False
+
+            newStr = config_to_json_str(self.__config)
+            if newStr == self.__savedStr:
+                return False
+
+            self._writeAtomic(newStr)
+            self.__savedStr = newStr
+
+        if self.__savedCallback:
+            self.__savedCallback()
+
+        return True
+
+    def _writeAtomic(self, data: str) -> None:
+        dirName = os.path.dirname(self.__configFilePath)
+        baseName = os.path.basename(self.__configFilePath)
+
+        fd, tmpFilePath = tempfile.mkstemp(dir=dirName, prefix='.%s.' % baseName)
+        try:
+            with os.fdopen(fd, 'w') as fobj:
+                fobj.write(data)
+                fobj.flush()
+                os.fsync(fobj.fileno())
+
+            os.chmod(tmpFilePath, self.__fileChmod)
+            os.replace(tmpFilePath, self.__configFilePath)
+
+        except Exception:
+            if os.path.exists(tmpFilePath):
+                os.remove(tmpFilePath)
+            raise
+
+    def _scheduleFlush(self) -> None:
+        from twisted.internet import reactor
+        from twisted.python.threadable import isInIOThread
+
+        if not reactor.running:
+            self.flush()
+            return
+
+        if isInIOThread():
+            self._scheduleFlushInReactor()
+        else:
+            reactor.callFromThread(self._scheduleFlushInReactor)
+
+    def _scheduleFlushInReactor(self) -> None:
+        from twisted.internet import reactor
+
+        if not self.__shutdownTriggerAdded:
+            reactor.addSystemEventTrigger('before', 'shutdown', self.flush)
+            self.__shutdownTriggerAdded = True
+
+        if self.__flushCall and self.__flushCall.active():
+            return
+
+        self.__flushCall = reactor.callLater(self.__saveDelay, self.flush)
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from peek_platform.file_config.PeekFileConfigWriteBehind import \
+    PeekFileConfigWriteBehind
+
+
+class PeekFileConfigWriteBehindTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.configFilePath = os.path.join(self._dir.name, 'config.json')
+        self._writeExternal('{"platform":{"version":"1.0.0"}}')
+
+    def _writeExternal(self, data):
+        newPath = self.configFilePath + '.new'
+        with open(newPath, 'w') as f:
+            f.write(data)
+        os.replace(newPath, self.configFilePath)
+
+    def testReadOnlyBlockIsNotDirty(self):
+        cfg = PeekFileConfigWriteBehind(self.configFilePath, 0o600)
+
+        # As if the reactor is running, and the flush is still pending
+        with mock.patch.object(PeekFileConfigWriteBehind,
+                               '_scheduleFlush') as scheduleFlush:
+            with cfg as c:
+                self.assertEqual(c.platform.version('0.0.0'), '1.0.0')
+
+            self.assertFalse(scheduleFlush.called)
+
+            self._writeExternal('{"platform":{"version":"2.0.0"}}')
+            cfg.reload()
+
+            with cfg as c:
+                self.assertEqual(c.platform.version('0.0.0'), '2.0.0')
+
+            # A change is still scheduled to be saved
+            with cfg as c:
+                c.platform.version = '3.0.0'
+            self.assertEqual(scheduleFlush.call_count, 1)
+
+        self.assertTrue(cfg.flush())
+
+    def testSavedCallbackIsCalledWithoutTheLock(self):
+        acquiredFromOtherThread = []
+
+        def savedCallback():
+            # The snapshot takes it's lock, then the config lock, so the config lock
+            # must be free by the time we call back into it
+            def acquire():
+                acquired = cfg._PeekFileConfigWriteBehind__lock.acquire(timeout=1)
+                if acquired:
+                    cfg._PeekFileConfigWriteBehind__lock.release()
+                acquiredFromOtherThread.append(acquired)
+
+            thread = threading.Thread(target=acquire)
+            thread.start()
+            thread.join()
+
+        cfg = PeekFileConfigWriteBehind(self.configFilePath, 0o600,
+                                        savedCallback=savedCallback)
+
+        # The reactor isn't running, so this is flushed as the block exits
+        with cfg as c:
+            c.platform.version = '2.0.0'
+
+        cfg.platform.version = '3.0.0'
+        cfg.save()
+
+        self.assertEqual(acquiredFromOtherThread, [True, True])
@@ -0,0 +1,95 @@
+import logging
+
+from twisted.internet.defer import Deferred
+
+logger = logging.getLogger(__name__)
+
+
+class PluginEndpointDrain:
+    """ Plugin Endpoint Drain
+
+    This class waits for the payloads that are still in flight on the endpoints of
+    a plugin, after the endpoints have been removed from PayloadIO.
+
+    PayloadIO schedules each payload to each endpoint with callLater(0), so
+    payloads it accepted before the endpoints were removed still arrive on the
+    next reactor tick. The endpoints process methods are wrapped so the Deferreds
+    they return are tracked until they fire.
+
+    The drain finishes when nothing is in flight, or after timeoutSeconds.
+
+    """
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self, pluginName: str, endpoints: [], timeoutSeconds: float,
+                 clock=None):
+        """
+        :param pluginName: The name of the plugin, for logging
+        :param endpoints: The PayloadEndpoints that are no longer in PayloadIO
+        :param timeoutSeconds: The longest to wait for the in flight payloads
+        :param clock: The IReactorTime to use, EG twisted.internet.task.Clock
+        """
+        if clock is None:
+            from twisted.internet import reactor
+            clock = reactor
+
+        self._pluginName = pluginName
+        self._endpoints = list(endpoints)
+        self._timeoutSeconds = timeoutSeconds
+        self._clock = clock
+
+        self._inFlight = 0
+        self._elapsedSeconds = 0.0
+        self._deferred = None
+
+        for endpoint in self._endpoints:
+            self._wrapProcess(endpoint)
+
+    @property
+    def inFlight(self) -> int:
+        return self._inFlight
+
+    def _wrapProcess(self, endpoint) -> None:
+        process = endpoint.process
+
+        def drainProcess(payload, **kwargs):
+            result = process(payload, **kwargs)
+            if isinstance(result, Deferred):
+                self._inFlight += 1
+                result.addBoth(self._inFlightFinished)
+            return result
+
+        # Set on the instance, so calls that are already scheduled use it
+        endpoint.process = drainProcess
+
+    def _inFlightFinished(self, result):
+        self._inFlight -= 1
+        return result
+
+    def start(self) -> Deferred:
+        """ Start
+
+        :return: A Deferred that fires with True if the endpoints drained, or False
+            if the drain timed out.
+        """
+        self._deferred = Deferred()
+
+        # Let the payloads that PayloadIO already scheduled arrive
+        self._clock.callLater(0, self._check)
+        return self._deferred
+
+    def _check(self) -> None:
+        if not self._inFlight:
+            self._deferred.callback(True)
+            return
+
+        if self._elapsedSeconds >= self._timeoutSeconds:
+            logger.warning("Plugin %s still had %s payloads in flight after %ss,"
+                           " it's being unloaded anyway",
+                           self._pluginName, self._inFlight, self._timeoutSeconds)
+            self._deferred.callback(False)
+            return
+
+        self._elapsedSeconds += self.POLL_SECONDS
+        self._clock.callLater(self.POLL_SECONDS, self._check)
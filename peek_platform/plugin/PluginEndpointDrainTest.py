@@ -0,0 +1,53 @@
+import unittest
+
+from twisted.internet.defer import Deferred
+from twisted.internet.task import Clock
+
+from peek_platform.plugin.PluginEndpointDrain import PluginEndpointDrain
+
+
+class _Endpoint:
+    def __init__(self):
+        self.deferreds = []
+
+    def process(self, payload, **kwargs):
+        d = Deferred()
+        self.deferreds.append(d)
+        return d
+
+
+class PluginEndpointDrainTest(unittest.TestCase):
+    def _results(self, d):
+        results = []
+        d.addCallback(results.append)
+        return results
+
+    def testDrainsInFlightPayloads(self):
+        clock = Clock()
+        endpoint = _Endpoint()
+
+        drain = PluginEndpointDrain('plugin_noop', [endpoint], 5.0, clock=clock)
+        results = self._results(drain.start())
+
+        # A payload scheduled before the cut over arrives
+        endpoint.process('payload')
+        self.assertEqual(drain.inFlight, 1)
+
+        clock.advance(0)
+        clock.advance(1.0)
+        self.assertEqual(results, [])
+
+        endpoint.deferreds[0].callback(None)
+        clock.advance(drain.POLL_SECONDS)
+        self.assertEqual(results, [True])
+
+    def testDrainTimesOut(self):
+        clock = Clock()
+        endpoint = _Endpoint()
+
+        drain = PluginEndpointDrain('plugin_noop', [endpoint], 1.0, clock=clock)
+        results = self._results(drain.start())
+        endpoint.process('payload')
+
+        clock.pump([drain.POLL_SECONDS] * 30)
+        self.assertEqual(results, [False])
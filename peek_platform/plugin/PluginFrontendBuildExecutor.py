@@ -0,0 +1,207 @@
+import logging
+import os
+import signal
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+from twisted.internet.defer import Deferred, CancelledError
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+
+logger = logging.getLogger(__name__)
+
+
+class PluginFrontendBuildJob:
+    """ Plugin Frontend Build Job
+
+    This is passed to the build callable, which runs in a build thread.
+
+    The build registers the process it runs with setProcess, so a cancel can kill
+    it, and calls checkCancelled between it's steps.
+
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cancelled = False
+        self._process = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def checkCancelled(self) -> None:
+        if self._cancelled:
+            raise CancelledError("The frontend build %s was cancelled" % self.name)
+
+    def setProcess(self, process) -> None:
+        """ Set Process
+
+        :param process: The subprocess.Popen running the build, or None when it's
+            finished
+        """
+        with self._lock:
+            self._process = process
+            if process is None or not self._cancelled:
+                return
+
+        # The job was cancelled before the process was started
+        self._killProcess(process)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            process = self._process
+
+        if process:
+            self._killProcess(process)
+
+    def _killProcess(self, process) -> None:
+        if process.poll() is not None:
+            return
+
+        logger.info("Killing the frontend build %s", self.name)
+        try:
+            # The builds are started in their own session, kill ng and it's children
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGTERM)
+            else:
+                process.kill()
+
+        except OSError as e:
+            logger.debug("Failed to kill the frontend build %s, %s", self.name, e)
+
+
+class PluginFrontendBuildExecutor:
+    """ Plugin Frontend Build Executor
+
+    The frontend builds run ng build for minutes, this class runs them in a thread
+    pool of their own, so the reactor, and the reactors thread pool, aren't blocked.
+
+    At most maxConcurrentBuilds run at once, the others wait in the order they were
+    submitted. The server and client frontends can build in parallel.
+
+    Cancelling the Deferred from submit removes a waiting job, or cancels a running
+    one, killing it's process. The slot is freed when the build thread returns.
+
+    """
+
+    def __init__(self, maxConcurrentBuilds: int = 2, reactor=None, threadPool=None):
+        if reactor is None:
+            from twisted.internet import reactor
+
+        self._maxConcurrentBuilds = max(1, maxConcurrentBuilds)
+        self._reactor = reactor
+        self._threadPool = threadPool
+
+        self._queue = deque()
+        self._runningJobs = set()
+
+    @property
+    def maxConcurrentBuilds(self) -> int:
+        return self._maxConcurrentBuilds
+
+    @maxConcurrentBuilds.setter
+    def maxConcurrentBuilds(self, value: int) -> None:
+        self._maxConcurrentBuilds = max(1, value)
+        self._startQueued()
+
+    @property
+    def runningCount(self) -> int:
+        return len(self._runningJobs)
+
+    @property
+    def queuedCount(self) -> int:
+        return len(self._queue)
+
+    def submit(self, name: str, buildCallable: Callable, *args, **kwargs) -> Deferred:
+        """ Submit
+
+        :param name: The name of the build, for logging
+        :param buildCallable: Called in a build thread with the PluginFrontendBuildJob,
+            then the args
+        :return: A Deferred that fires with the result of the buildCallable
+        """
+        job = PluginFrontendBuildJob(name)
+
+        def cancel(d):
+            if entry in self._queue:
+                self._queue.remove(entry)
+            job.cancel()
+
+        d = Deferred(cancel)
+        entry = (job, d, buildCallable, args, kwargs)
+        self._queue.append(entry)
+
+        self._startQueued()
+        return d
+
+    def _startQueued(self) -> None:
+        while self._queue and len(self._runningJobs) < self._maxConcurrentBuilds:
+            job, d, buildCallable, args, kwargs = self._queue.popleft()
+            self._runningJobs.add(job)
+
+            logger.debug("Starting frontend build %s, %s running",
+                         job.name, len(self._runningJobs))
+
+            threadD = deferToThreadPool(self._reactor, self._getThreadPool(),
+                                        buildCallable, job, *args, **kwargs)
+            threadD.addBoth(self._jobFinished, job, d)
+
+    def _jobFinished(self, result, job: PluginFrontendBuildJob, d: Deferred) -> None:
+        self._runningJobs.discard(job)
+
+        # The Deferred has already failed with a CancelledError if it was cancelled,
+        # the result of the killed build is dropped
+        if not d.called:
+            d.callback(result)
+
+        self._startQueued()
+
+    def _getThreadPool(self) -> ThreadPool:
+        if self._threadPool is None:
+            self._threadPool = ThreadPool(minthreads=0,
+                                          maxthreads=self._maxConcurrentBuilds,
+                                          name="PluginFrontendBuild")
+            self._threadPool.start()
+            self._reactor.addSystemEventTrigger('during', 'shutdown', self.shutdown)
+
+        # The pool grows if the limit is raised
+        if self._threadPool.max < self._maxConcurrentBuilds:
+            self._threadPool.adjustPoolsize(maxthreads=self._maxConcurrentBuilds)
+
+        return self._threadPool
+
+    def shutdown(self) -> None:
+        """ Shutdown
+
+        Cancel the waiting and running builds, and stop the build threads.
+        """
+        while self._queue:
+            self._queue[0][1].cancel()
+
+        for job in list(self._runningJobs):
+            job.cancel()
+
+        if self._threadPool is not None:
+            self._threadPool.stop()
+            self._threadPool = None
+
+
+_buildExecutor = None  # type: Optional[PluginFrontendBuildExecutor]
+
+
+def pluginFrontendBuildExecutor() -> PluginFrontendBuildExecutor:
+    """ Plugin Frontend Build Executor
+
+    :return: The build executor shared by the frontend installers in this process
+    """
+    global _buildExecutor
+    if _buildExecutor is None:
+        from peek_platform import PeekPlatformConfig
+        _buildExecutor = PluginFrontendBuildExecutor(
+            PeekPlatformConfig.config.feBuildMaxConcurrent)
+
+    return _buildExecutor
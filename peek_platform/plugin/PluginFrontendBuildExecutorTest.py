@@ -0,0 +1,124 @@
+import os
+import unittest
+from unittest import mock
+
+from twisted.internet.defer import CancelledError
+
+from peek_platform.plugin.PluginFrontendBuildExecutor import \
+    PluginFrontendBuildExecutor
+
+
+class _FakeReactor:
+    def callFromThread(self, f, *args, **kwargs):
+        f(*args, **kwargs)
+
+
+class _FakeThreadPool:
+    """ Runs the calls when the test says so, rather than in threads """
+
+    max = 2
+
+    def __init__(self):
+        self.calls = []
+
+    def callInThreadWithCallback(self, onResult, f, *args, **kwargs):
+        self.calls.append((onResult, f, args, kwargs))
+
+    def runNext(self):
+        onResult, f, args, kwargs = self.calls.pop(0)
+        try:
+            onResult(True, f(*args, **kwargs))
+        except Exception as e:
+            onResult(False, e)
+
+
+class _FakeProcess:
+    pid = 12345
+
+    def __init__(self):
+        self.killed = False
+
+    def poll(self):
+        return 0 if self.killed else None
+
+    def kill(self):
+        self.killed = True
+
+
+def _fakeKillpg(process):
+    def killpg(pid, sig):
+        assert pid == process.pid
+        process.killed = True
+
+    return killpg
+
+
+class PluginFrontendBuildExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = _FakeThreadPool()
+        self.executor = PluginFrontendBuildExecutor(maxConcurrentBuilds=2,
+                                                    reactor=_FakeReactor(),
+                                                    threadPool=self.pool)
+
+    def _build(self, job, name):
+        job.checkCancelled()
+        return name
+
+    def testConcurrencyLimit(self):
+        results = []
+        for name in ('server', 'client', 'third'):
+            self.executor.submit(name, self._build, name).addCallback(results.append)
+
+        self.assertEqual(self.executor.runningCount, 2)
+        self.assertEqual(self.executor.queuedCount, 1)
+
+        self.pool.runNext()
+        self.assertEqual(results, ['server'])
+        self.assertEqual(self.executor.runningCount, 2)
+        self.assertEqual(self.executor.queuedCount, 0)
+
+        self.pool.runNext()
+        self.pool.runNext()
+        self.assertEqual(results, ['server', 'client', 'third'])
+        self.assertEqual(self.executor.runningCount, 0)
+
+    def testCancelQueued(self):
+        self.executor.maxConcurrentBuilds = 1
+        self.executor.submit('server', self._build, 'server')
+        d = self.executor.submit('client', self._build, 'client')
+
+        failures = []
+        d.addErrback(failures.append)
+        d.cancel()
+
+        self.assertTrue(failures[0].check(CancelledError))
+        self.assertEqual(self.executor.queuedCount, 0)
+
+        self.pool.runNext()
+        self.assertEqual(self.pool.calls, [])
+
+    def testCancelRunning(self):
+        process = _FakeProcess()
+
+        def build(job):
+            job.setProcess(process)
+
+        d = self.executor.submit('server', build)
+        failures = []
+        d.addErrback(failures.append)
+
+        # The build has started, then the Deferred is cancelled
+        self.pool.calls[0][1](*self.pool.calls[0][2])
+        if hasattr(os, 'killpg'):
+            with mock.patch.object(os, 'killpg', _fakeKillpg(process)):
+                d.cancel()
+        else:
+            d.cancel()
+
+        self.assertTrue(process.killed)
+        self.assertTrue(failures[0].check(CancelledError))
+
+        # The slot is held until the build thread returns
+        self.assertEqual(self.executor.runningCount, 1)
+        self.pool.runNext()
+        self.assertEqual(self.executor.runningCount, 0)
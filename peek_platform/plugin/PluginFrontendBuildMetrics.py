@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from vortex.Payload import Payload
+from vortex.PayloadEndpoint import PayloadEndpoint
+
+from peek_platform.plugin.PluginFrontendBuildMetricsTuple import \
+    PluginFrontendBuildMetricsTuple
+from peek_platform.plugin.PluginFrontendPtyOutParser import PtyOutEvent, \
+    EVENT_ERROR, EVENT_SUMMARY_LINE
+
+logger = logging.getLogger(__name__)
+
+# The filter we listen on, the platformService is added to it
+pluginFrontendBuildMetricsFilt = {
+    'plugin': 'peek_platform',
+    'key': "peek_platform.plugin.frontendBuildMetrics"
+}  # LISTEN / SEND
+
+# EG chunk {2} main.bundle.js, main.bundle.js.map (main) 412 kB {5} [initial] [rendered]
+_CHUNK_RE = re.compile(r'^chunk \{(?P<id>[^}]+)\} (?P<files>.+?)'
+                       r'(?: \((?P<name>[^)]+)\))?'
+                       r' (?P<size>\d+(?:\.\d+)?) (?P<unit>bytes|kB|KiB|MB|MiB|GB|GiB)\b'
+                       r'(?P<flags>.*)$')
+
+_TIME_RE = re.compile(r'^Time: (\d+)ms')
+
+# webpack formats the sizes with powers of 1024
+_UNIT_BYTES = {
+    'bytes': 1,
+    'kB': 1024, 'KiB': 1024,
+    'MB': 1024 ** 2, 'MiB': 1024 ** 2,
+    'GB': 1024 ** 3, 'GiB': 1024 ** 3,
+}
+
+
+class PluginFrontendBuildMetricsCollector:
+    """ Plugin Frontend Build Metrics Collector
+
+    This class parses the webpack summary from the PtyOutEvents of a
+    PluginFrontendPtyOutParser, into a PluginFrontendBuildMetricsTuple.
+
+    The summary looks like
+
+        Hash: 3b7d5b0c1e4b7a1c2f5e
+        Time: 52314ms
+        chunk {0} 0.chunk.js, 0.chunk.js.map 1.58 MB {5} [rendered]
+        chunk {2} main.bundle.js, main.bundle.js.map (main) 412 kB {5} [initial]
+        WARNING in ./src/app/app.module.ts
+
+    Only the first MAX_MESSAGES warnings and errors are kept.
+
+    """
+
+    MAX_MESSAGES = 50
+
+    def __init__(self, platformService: str):
+        self._platformService = platformService
+        self._startTime = time.time()
+
+        self._hash = None
+        self._webpackMs = None
+        self._chunks = []
+        self._warnings = []
+        self._warningCount = 0
+        self._errors = []
+        self._errorCount = 0
+
+    def processEvent(self, event: PtyOutEvent) -> None:
+        if event.kind == EVENT_ERROR:
+            self._errorCount += 1
+            if len(self._errors) < self.MAX_MESSAGES:
+                self._errors.append(event.line)
+            return
+
+        if event.kind != EVENT_SUMMARY_LINE:
+            return
+
+        line = event.line
+
+        if line.startswith("chunk {"):
+            self._processChunkLine(line)
+
+        elif line.startswith("WARNING"):
+            self._warningCount += 1
+            if len(self._warnings) < self.MAX_MESSAGES:
+                self._warnings.append(line)
+
+        elif line.startswith("Hash: "):
+            self._hash = line[len("Hash: "):].strip()
+
+        elif line.startswith("Time: "):
+            match = _TIME_RE.match(line)
+            if match:
+                self._webpackMs = int(match.group(1))
+
+    def _processChunkLine(self, line: str) -> None:
+        match = _CHUNK_RE.match(line)
+        if not match:
+            logger.debug("Unrecognised webpack chunk line : %s", line)
+            return
+
+        files = [f.strip() for f in match.group('files').split(',')]
+        flags = match.group('flags')
+
+        self._chunks.append({
+            'id': match.group('id'),
+            'name': match.group('name') or match.group('id'),
+            'files': files,
+            'bytes': int(float(match.group('size')) * _UNIT_BYTES[match.group('unit')]),
+            'initial': '[initial]' in flags or '[entry]' in flags
+        })
+
+    def finish(self, succeeded: bool) -> PluginFrontendBuildMetricsTuple:
+        finishedTime = time.time()
+
+        return PluginFrontendBuildMetricsTuple(
+            platformService=self._platformService,
+            finishedTime=finishedTime,
+            succeeded=succeeded,
+            seconds=finishedTime - self._startTime,
+            webpackMs=self._webpackMs,
+            hash=self._hash,
+            chunks=self._chunks,
+            totalBytes=sum(c['bytes'] for c in self._chunks),
+            initialBytes=sum(c['bytes'] for c in self._chunks if c['initial']),
+            warningCount=self._warningCount,
+            errorCount=self._errorCount,
+            warnings=self._warnings,
+            errors=self._errors)
+
+
+class PluginFrontendBuildMetricsStore:
+    """ Plugin Frontend Build Metrics Store
+
+    This class keeps the metrics of the last maxBuilds builds in a json file.
+
+    A warning is logged when a successful build is growthWarnRatio bigger, or
+    slower, than the last successful build, naming the chunk that grew the most.
+
+    """
+
+    def __init__(self, filePath: str, maxBuilds: int = 100,
+                 growthWarnRatio: float = 1.1):
+        self._filePath = filePath
+        self._maxBuilds = maxBuilds
+        self._growthWarnRatio = growthWarnRatio
+        self._lock = threading.Lock()
+        self._builds = None
+
+    @property
+    def builds(self) -> [PluginFrontendBuildMetricsTuple]:
+        with self._lock:
+            return list(self._loadBuilds())
+
+    def _loadBuilds(self) -> [PluginFrontendBuildMetricsTuple]:
+        if self._builds is not None:
+            return self._builds
+
+        self._builds = []
+        try:
+            with open(self._filePath) as f:
+                data = json.load(f)
+
+            fieldNames = PluginFrontendBuildMetricsTuple.__fieldNames__
+            for build in data:
+                self._builds.append(PluginFrontendBuildMetricsTuple(
+                    **{name: build.get(name) for name in fieldNames}))
+
+        except FileNotFoundError:
+            pass
+
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Failed to read the frontend build metrics %s, %s",
+                           self._filePath, e)
+
+        return self._builds
+
+    def record(self, metrics: PluginFrontendBuildMetricsTuple) -> None:
+        with self._lock:
+            builds = self._loadBuilds()
+
+            if metrics.succeeded:
+                lastSucceeded = [b for b in builds if b.succeeded]
+                if lastSucceeded:
+                    self._checkGrowth(lastSucceeded[-1], metrics)
+
+            builds.append(metrics)
+            del builds[:-self._maxBuilds]
+
+            self._save(builds)
+
+    def _checkGrowth(self, last: PluginFrontendBuildMetricsTuple,
+                     metrics: PluginFrontendBuildMetricsTuple) -> None:
+        if last.totalBytes and metrics.totalBytes > last.totalBytes * self._growthWarnRatio:
+            lastBytesByName = {c['name']: c['bytes'] for c in last.chunks}
+            grewMost = max(metrics.chunks,
+                           key=lambda c: c['bytes'] - lastBytesByName.get(c['name'], 0))
+
+            logger.warning("The %s frontend grew from %s to %s bytes, chunk %s grew"
+                           " the most, from %s to %s bytes",
+                           metrics.platformService, last.totalBytes,
+                           metrics.totalBytes, grewMost['name'],
+                           lastBytesByName.get(grewMost['name'], 0),
+                           grewMost['bytes'])
+
+        if (last.webpackMs and metrics.webpackMs
+                and metrics.webpackMs > last.webpackMs * self._growthWarnRatio):
+            logger.warning("The %s frontend build took %sms, the last took %sms",
+                           metrics.platformService, metrics.webpackMs, last.webpackMs)
+
+    def _save(self, builds: [PluginFrontendBuildMetricsTuple]) -> None:
+        data = [{name: getattr(build, name) for name in build.__fieldNames__}
+                for build in builds]
+
+        dirName = os.path.dirname(os.path.abspath(self._filePath))
+        fd, tmpPath = tempfile.mkstemp(dir=dirName, prefix='.buildMetrics.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmpPath, self._filePath)
+
+
+class PluginFrontendBuildMetricsHandler:
+    """ Plugin Frontend Build Metrics Handler
+
+    Responds to requests for the frontend build metrics with a
+    PluginFrontendBuildMetricsTuple for each recorded build.
+
+    """
+
+    def __init__(self, frontendInstaller, platformService: str):
+        self._frontendInstaller = frontendInstaller
+        self._filt = dict(pluginFrontendBuildMetricsFilt,
+                          platformService=platformService)
+        self._ep = None
+
+    def start(self):
+        self._ep = PayloadEndpoint(self._filt, self._process)
+
+    def shutdown(self):
+        if self._ep:
+            self._ep.shutdown()
+            self._ep = None
+
+    def _process(self, payload, vortexUuid=None, **kwargs):
+        from vortex.Vortex import vortexSendPayload
+
+        vortexSendPayload(Payload(filt=self._filt,
+                                  tuples=self._frontendInstaller.frontendBuildMetrics),
+                          vortexUuid)
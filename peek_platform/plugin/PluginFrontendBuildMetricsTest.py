@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+from peek_platform.plugin.PluginFrontendBuildMetrics import \
+    PluginFrontendBuildMetricsStore
+from peek_platform.plugin.PluginFrontendPtyOutBench import replay, sampleOutput
+
+
+class PluginFrontendBuildMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.filePath = os.path.join(self._dir.name, 'buildMetrics.json')
+
+    def testCollect(self):
+        metrics = replay(sampleOutput(100), readSize=1000).finish(succeeded=True)
+
+        self.assertEqual(metrics.hash, '3b7d5b0c1e4b7a1c2f5e')
+        self.assertEqual(metrics.webpackMs, 52314)
+        self.assertEqual([c['name'] for c in metrics.chunks],
+                         ['0', '1', '2', 'polyfills', 'main', 'styles', 'vendor',
+                          'inline'])
+
+        main = metrics.chunks[4]
+        self.assertEqual(main['files'], ['main.bundle.js', 'main.bundle.js.map'])
+        self.assertEqual(main['bytes'], 412 * 1024)
+        self.assertTrue(main['initial'])
+        self.assertFalse(metrics.chunks[0]['initial'])
+
+        self.assertEqual(metrics.initialBytes,
+                         sum(c['bytes'] for c in metrics.chunks[3:]))
+        self.assertEqual(metrics.warningCount, 1)
+        self.assertEqual(metrics.errorCount, 0)
+
+    def testStore(self):
+        store = PluginFrontendBuildMetricsStore(self.filePath, maxBuilds=2)
+
+        for moduleCount in (10, 20, 30):
+            store.record(replay(sampleOutput(moduleCount), 1000).finish(True))
+
+        loaded = PluginFrontendBuildMetricsStore(self.filePath).builds
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(loaded[-1].chunks, store.builds[-1].chunks)
+
+    def testGrowthWarning(self):
+        store = PluginFrontendBuildMetricsStore(self.filePath)
+        store.record(replay(sampleOutput(10), 1000).finish(True))
+
+        bloated = replay(sampleOutput(10), 1000).finish(True)
+        bloated.chunks[1]['bytes'] *= 100
+        bloated.totalBytes = sum(c['bytes'] for c in bloated.chunks)
+
+        with self.assertLogs('peek_platform.plugin.PluginFrontendBuildMetrics',
+                             'WARNING') as logs:
+            store.record(bloated)
+
+        self.assertIn('chunk 1 grew the most', logs.output[0])
@@ -0,0 +1,28 @@
+from vortex.Tuple import addTupleType, Tuple, TupleField
+
+
+@addTupleType
+class PluginFrontendBuildMetricsTuple(Tuple):
+    """ Plugin Frontend Build Metrics Tuple
+
+    The metrics of one ng build, parsed from the webpack summary.
+
+    """
+    __tupleType__ = "peek_platform.PluginFrontendBuildMetricsTuple"
+
+    platformService = TupleField(comment="The service built, server or client")
+    finishedTime = TupleField(comment="When the build finished, seconds since epoch")
+    succeeded = TupleField(comment="False if the build failed")
+    seconds = TupleField(comment="Seconds taken by the build, including ng starting")
+    webpackMs = TupleField(comment="The Time: reported by webpack, None if missing")
+    hash = TupleField(comment="The Hash: reported by webpack, None if missing")
+
+    chunks = TupleField(comment="A dict for each chunk, with the keys"
+                                " id, name, files, bytes and initial")
+    totalBytes = TupleField(comment="The size of all the chunks")
+    initialBytes = TupleField(comment="The size of the chunks loaded at startup")
+
+    warningCount = TupleField(comment="The number of WARNING in lines")
+    errorCount = TupleField(comment="The number of ERROR in lines")
+    warnings = TupleField(comment="The first of the WARNING in lines")
+    errors = TupleField(comment="The first of the ERROR in lines")
@@ -0,0 +1,26 @@
+from vortex.Tuple import addTupleType, Tuple, TupleField
+
+
+@addTupleType
+class PluginFrontendBuildStateTuple(Tuple):
+    """ Plugin Frontend Build State Tuple
+
+    Sent to the frontend build state listeners, so the UI can show the progress.
+
+    """
+    __tupleType__ = "peek_platform.PluginFrontendBuildStateTuple"
+
+    # The states, in the order they happen
+    STATE_PENDING = "pending"
+    STATE_LINKING = "linking"
+    STATE_CHECKING = "checking"
+    STATE_BUILDING = "building"
+    STATE_UNCHANGED = "unchanged"
+    STATE_BUILT = "built"
+    STATE_FAILED = "failed"
+
+    platformService = TupleField(comment="The service building, server or client")
+    state = TupleField(comment="One of the STATE_ constants")
+    changedPathCount = TupleField(comment="The number of paths that changed")
+    seconds = TupleField(comment="The seconds since the build started")
+    error = TupleField(comment="The exception, if the build failed")
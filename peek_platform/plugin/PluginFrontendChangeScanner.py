@@ -0,0 +1,281 @@
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict
+
+logger = logging.getLogger(__name__)
+
+FileState = namedtuple("FileState", ["size", "mtimeNs", "digest"])
+
+FileChanges = namedtuple("FileChanges", ["added", "removed", "modified"])
+
+# The manifest is
+#   magic, count, length of the paths, the paths separated by \0,
+#   then one record per path
+_MAGIC = b'PFM1'
+_HEADER = struct.Struct('<4sII')
+_RECORD = struct.Struct('<Qq16s')
+
+_NO_DIGEST = b'\0' * 16
+
+
+def fileDigest(path: str) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def readManifest(manifestPath: str) -> {str: FileState}:
+    """ Read Manifest
+
+    :return: The file states by relative path, empty if there is no manifest or
+        it's not valid.
+    """
+    try:
+        with open(manifestPath, 'rb') as f:
+            data = f.read()
+
+        magic, count, pathsLen = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Unknown manifest format")
+
+        pathsStart = _HEADER.size
+        recordsStart = pathsStart + pathsLen
+        if len(data) != recordsStart + count * _RECORD.size:
+            raise ValueError("The manifest is truncated")
+
+        paths = data[pathsStart:recordsStart].decode().split('\0') if count else []
+        records = _RECORD.iter_unpack(data[recordsStart:])
+        return {path: FileState(*record) for path, record in zip(paths, records)}
+
+    except FileNotFoundError:
+        return {}
+
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning("Ignoring the frontend manifest %s, %s", manifestPath, e)
+        return {}
+
+
+def writeManifest(manifestPath: str, fileStates: {str: FileState}) -> None:
+    """ Write Manifest
+
+    The file is replaced atomically.
+    """
+    paths = sorted(fileStates)
+    pathsData = '\0'.join(paths).encode()
+
+    parts = [_HEADER.pack(_MAGIC, len(paths), len(pathsData)), pathsData]
+    parts.extend(_RECORD.pack(*fileStates[path]) for path in paths)
+
+    fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(manifestPath),
+                                   prefix='.manifest.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b''.join(parts))
+        os.replace(tmpPath, manifestPath)
+
+    except Exception:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        raise
+
+
+class PluginFrontendChangeScanner:
+    """ Plugin Frontend Change Scanner
+
+    This class decides if the frontend needs rebuilding, by comparing the files in
+    the frontend source dir against the manifest written by the last check.
+
+    The symlinks are followed, so the plugin frontend dirs linked into the source
+    dir are scanned, each top level dir is scanned on it's own thread.
+
+    Only the files with a different size or mtime are read, a file is only changed
+    if it's content digest is different, so touching a file doesn't rebuild.
+
+    """
+
+    IGNORE_DIR_NAMES = (".git", ".idea", "dist", "node_modules")
+
+    def __init__(self, manifestPath: str, scanThreads: int = 8):
+        self._manifestPath = manifestPath
+        self._scanThreads = scanThreads
+
+    def _scanDir(self, rootDir: str, relDir: str) -> {str: (int, int)}:
+        """ Scan Dir
+
+        :return: The (size, mtimeNs) of each file under relDir, by relative path
+        """
+        stats = {}
+        visitedDirs = set()
+        pending = [relDir]
+
+        while pending:
+            relDir = pending.pop()
+            path = os.path.join(rootDir, relDir)
+
+            try:
+                dirStat = os.stat(path)
+                dirKey = (dirStat.st_dev, dirStat.st_ino)
+                if dirKey in visitedDirs:
+                    logger.debug("Skipping symlink loop at %s", path)
+                    continue
+                visitedDirs.add(dirKey)
+
+                with os.scandir(path) as it:
+                    entries = list(it)
+
+            except OSError as e:
+                logger.debug("Can not scan %s, %s", path, e)
+                continue
+
+            prefix = relDir + os.sep
+            for entry in entries:
+                relPath = prefix + entry.name
+                try:
+                    if entry.is_dir():
+                        if entry.name not in self.IGNORE_DIR_NAMES:
+                            pending.append(relPath)
+                        continue
+
+                    stat = entry.stat()
+
+                except OSError:
+                    continue  # EG a broken symlink
+
+                stats[relPath] = (stat.st_size, stat.st_mtime_ns)
+
+        return stats
+
+    def scan(self, rootDir: str) -> {str: (int, int)}:
+        """ Scan
+
+        :return: The (size, mtimeNs) of each file under rootDir, by relative path
+        """
+        topFiles = {}
+        topDirs = []
+
+        with os.scandir(rootDir) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if entry.name not in self.IGNORE_DIR_NAMES:
+                            topDirs.append(entry.name)
+                    else:
+                        stat = entry.stat()
+                        topFiles[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+                except OSError:
+                    continue
+
+        stats = dict(topFiles)
+        with ThreadPoolExecutor(max_workers=self._scanThreads) as executor:
+            for dirStats in executor.map(lambda d: self._scanDir(rootDir, d), topDirs):
+                stats.update(dirStats)
+
+        return stats
+
+    def changes(self, rootDir: str) -> (FileChanges, {str: FileState}):
+        """ Changes
+
+        :return: The changes since the last manifest, and the new file states
+        """
+        return self._compare(rootDir, readManifest(self._manifestPath))
+
+    def _compare(self, rootDir: str,
+                 oldStates: {str: FileState}) -> (FileChanges, {str: FileState}):
+        stats = self.scan(rootDir)
+
+        newStates = {}
+        added = []
+        modified = []
+
+        for relPath, (size, mtimeNs) in stats.items():
+            oldState = oldStates.get(relPath)
+
+            if oldState and oldState.size == size and oldState.mtimeNs == mtimeNs:
+                newStates[relPath] = oldState
+                continue
+
+            try:
+                digest = fileDigest(os.path.join(rootDir, relPath))
+            except OSError:
+                digest = _NO_DIGEST
+
+            newStates[relPath] = FileState(size, mtimeNs, digest)
+
+            if not oldState:
+                added.append(relPath)
+            elif oldState.digest != digest:
+                modified.append(relPath)
+
+        removed = [relPath for relPath in oldStates if relPath not in stats]
+
+        return FileChanges(added, removed, modified), newStates
+
+    def check(self, rootDir: str) -> bool:
+        """ Check
+
+        Compare the files to the manifest, and update the manifest.
+
+        :return: True if a file was added, removed or it's content changed
+        """
+        newStates = self.pendingChanges(rootDir)
+        if newStates is None:
+            return False
+
+        self.save(newStates)
+        return True
+
+    def pendingChanges(self, rootDir: str) -> Optional[Dict[str, FileState]]:
+        """ Pending Changes
+
+        Compare the files to the manifest, the manifest is only updated if the
+        content hasn't changed. Call save with the file states once the changes
+        are built.
+
+        :return: The new file states if a file was added, removed or it's content
+            changed, otherwise None
+        """
+        oldStates = readManifest(self._manifestPath)
+        changes, newStates = self._compare(rootDir, oldStates)
+
+        for relPath in changes.removed:
+            logger.debug("Removed %s", relPath)
+
+        for relPath in changes.added:
+            logger.debug("Added %s", relPath)
+
+        for relPath in changes.modified:
+            logger.debug("Modified %s", relPath)
+
+        if changes.added or changes.removed or changes.modified:
+            return newStates
+
+        # Write the manifest if only the metadata changed, so the files aren't read
+        # again next time.
+        if newStates != oldStates:
+            self.save(newStates)
+
+        return None
+
+    def save(self, fileStates: {str: FileState}) -> None:
+        """ Save
+
+        Record the file states as built, the next check compares against them.
+        """
+        writeManifest(self._manifestPath, fileStates)
+
+    def reset(self) -> None:
+        """ Reset
+
+        Remove the manifest, so the next check reports changes, EG after a failed
+        build.
+        """
+        if os.path.exists(self._manifestPath):
+            os.remove(self._manifestPath)
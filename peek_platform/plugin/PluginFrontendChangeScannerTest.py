@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from peek_platform.plugin.PluginFrontendChangeScanner import \
+    PluginFrontendChangeScanner, readManifest
+
+
+class PluginFrontendChangeScannerTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.srcDir = os.path.join(self._dir.name, 'src')
+        self.pluginDir = os.path.join(self._dir.name, 'plugin_noop_fe')
+        self.manifestPath = os.path.join(self._dir.name, '.lastHash')
+
+        self._write(os.path.join(self.srcDir, 'app', 'app.module.ts'), 'app')
+        self._write(os.path.join(self.pluginDir, 'plugin-noop.module.ts'), 'noop')
+
+        # Plugins are symlinked into the source dir
+        os.symlink(self.pluginDir, os.path.join(self.srcDir, 'plugin_noop'),
+                   target_is_directory=True)
+
+        self.scanner = PluginFrontendChangeScanner(self.manifestPath)
+
+    def _write(self, path, content, mtimeNs=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+        if mtimeNs is not None:
+            os.utime(path, ns=(mtimeNs, mtimeNs))
+
+    def testChanges(self):
+        self.assertTrue(self.scanner.check(self.srcDir))
+        self.assertEqual(sorted(readManifest(self.manifestPath)),
+                         ['app/app.module.ts', 'plugin_noop/plugin-noop.module.ts'])
+        self.assertFalse(self.scanner.check(self.srcDir))
+
+        # Touching a file isn't a change
+        os.utime(os.path.join(self.pluginDir, 'plugin-noop.module.ts'))
+        self.assertFalse(self.scanner.check(self.srcDir))
+
+        # An edit with the same size is
+        self._write(os.path.join(self.pluginDir, 'plugin-noop.module.ts'), 'NOOP',
+                    mtimeNs=10 ** 9)
+        changes, _ = self.scanner.changes(self.srcDir)
+        self.assertEqual(changes.modified, ['plugin_noop/plugin-noop.module.ts'])
+        self.assertTrue(self.scanner.check(self.srcDir))
+
+        os.remove(os.path.join(self.srcDir, 'app', 'app.module.ts'))
+        changes, _ = self.scanner.changes(self.srcDir)
+        self.assertEqual(changes.removed, ['app/app.module.ts'])
+
+    def testIgnoredDirs(self):
+        self.scanner.check(self.srcDir)
+
+        self._write(os.path.join(self.srcDir, 'app', '.git', 'HEAD'), 'ref')
+        self.assertFalse(self.scanner.check(self.srcDir))
+
+    def testReset(self):
+        self.scanner.check(self.srcDir)
+        self.scanner.reset()
+        self.assertTrue(self.scanner.check(self.srcDir))
+
+    def testPendingChangesAreSavedOnceBuilt(self):
+        fileStates = self.scanner.pendingChanges(self.srcDir)
+        self.assertIsNotNone(fileStates)
+
+        # The changes are pending until they're saved
+        self.assertFalse(os.path.exists(self.manifestPath))
+        self.assertEqual(self.scanner.pendingChanges(self.srcDir), fileStates)
+
+        self.scanner.save(fileStates)
+        self.assertIsNone(self.scanner.pendingChanges(self.srcDir))
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+from peek_platform.plugin.PluginFrontendChangeScanner import FileState, fileDigest
+
+logger = logging.getLogger(__name__)
+
+# The files in the frontend project dir that change the build output
+BUILD_CONFIG_FILE_NAMES = ("package.json", "package-lock.json", "npm-shrinkwrap.json",
+                           "yarn.lock", "angular.json", ".angular-cli.json")
+
+
+def _buildConfigDigests(projectDir: str) -> {str: bytes}:
+    """ Build Config Digests
+
+    :return: The content digests of the build config files in the project dir, the
+        package.json, the lockfiles, the angular cli config and the tsconfigs.
+    """
+    digests = {}
+    for fileName in sorted(os.listdir(projectDir)):
+        isTsConfig = fileName.startswith("tsconfig") and fileName.endswith(".json")
+        filePath = os.path.join(projectDir, fileName)
+        if (fileName in BUILD_CONFIG_FILE_NAMES or isTsConfig) \
+                and os.path.isfile(filePath):
+            digests[fileName] = fileDigest(filePath)
+    return digests
+
+
+def sourceKey(fileStates: {str: FileState}, projectDir: Optional[str] = None) -> str:
+    """ Source Key
+
+    :param fileStates: The source manifest, see PluginFrontendChangeScanner
+    :param projectDir: The frontend project dir, the dir above the source dir, the
+        build config files in it are part of the key
+    :return: A key for the content of the source files, the sizes and times are
+        ignored.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for path in sorted(fileStates):
+        digest.update(path.encode())
+        digest.update(b'\0')
+        digest.update(fileStates[path].digest)
+
+    if projectDir:
+        for fileName, fileDigestBytes in sorted(_buildConfigDigests(projectDir).items()):
+            digest.update(b'../' + fileName.encode())
+            digest.update(b'\0')
+            digest.update(fileDigestBytes)
+
+    return digest.hexdigest()
+
+
+def _linkTree(srcDir: str, dstDir: str, hardlink: bool = True) -> int:
+    """ Link Tree
+
+    Recreate srcDir at dstDir, with the files hardlinked, or copied if they can't be
+    linked, EG across file systems.
+
+    :return: The total size of the files
+    """
+    totalSize = 0
+
+    for dirPath, dirNames, fileNames in os.walk(srcDir):
+        relDir = os.path.relpath(dirPath, srcDir)
+        os.makedirs(os.path.join(dstDir, relDir), exist_ok=True)
+
+        for fileName in fileNames:
+            srcPath = os.path.join(dirPath, fileName)
+            dstPath = os.path.join(dstDir, relDir, fileName)
+            try:
+                if not hardlink:
+                    raise OSError("Copy")
+                os.link(srcPath, dstPath)
+
+            except OSError:
+                shutil.copy2(srcPath, dstPath)
+
+            totalSize += os.path.getsize(srcPath)
+
+    return totalSize
+
+
+class PluginFrontendDistCache:
+    """ Plugin Frontend Dist Cache
+
+    This class stores the frontend dist dir of each successful build, against the
+    content of the source dir that built it. Building a set of plugins that's been
+    built before restores the dist from the cache, rather than running ng build.
+
+    The entries are copies of the built dist, the restored dists are hardlinked to
+    the entries. Call removeDist before building, so the build doesn't write to
+    the cached files.
+
+    The least recently used entries are removed when the cache is larger than
+    maxBytes.
+
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cacheDir: str, maxBytes: int):
+        self._cacheDir = cacheDir
+        self._maxBytes = maxBytes
+        os.makedirs(cacheDir, exist_ok=True)
+
+    def _entryDir(self, key: str) -> str:
+        return os.path.join(self._cacheDir, key)
+
+    def _loadIndex(self) -> {str: dict}:
+        try:
+            with open(os.path.join(self._cacheDir, self.INDEX_FILE)) as f:
+                index = json.load(f)
+
+        except (OSError, ValueError):
+            index = {}
+
+        # Drop the entries that aren't there any more
+        return {key: entry for key, entry in index.items()
+                if os.path.isdir(self._entryDir(key))}
+
+    def _saveIndex(self, index: {str: dict}) -> None:
+        fd, tmpPath = tempfile.mkstemp(dir=self._cacheDir, prefix='.index.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        os.replace(tmpPath, os.path.join(self._cacheDir, self.INDEX_FILE))
+
+    def has(self, key: str) -> bool:
+        return key in self._loadIndex()
+
+    def restore(self, key: str, distDir: str) -> bool:
+        """ Restore
+
+        Replace distDir with the cached dist for this key.
+
+        :return: True if the dist was restored, False if it's not cached
+        """
+        index = self._loadIndex()
+        if key not in index:
+            return False
+
+        startTime = time.time()
+        parentDir = os.path.dirname(os.path.abspath(distDir))
+        newDir = tempfile.mkdtemp(dir=parentDir, prefix='.dist.restore.')
+
+        try:
+            _linkTree(self._entryDir(key), newDir)
+        except Exception:
+            shutil.rmtree(newDir, ignore_errors=True)
+            raise
+
+        # Swap the directories, the old dist is there until the new one is
+        oldDir = self._moveAside(distDir)
+        os.rename(newDir, distDir)
+
+        if oldDir:
+            shutil.rmtree(oldDir, ignore_errors=True)
+
+        index[key]["lastUsed"] = time.time()
+        self._saveIndex(index)
+
+        logger.info("Restored the frontend dist %s from the cache in %.1fs",
+                    key, time.time() - startTime)
+        return True
+
+    @staticmethod
+    def _moveAside(distDir: str) -> Optional[str]:
+        if not os.path.exists(distDir):
+            return None
+
+        parentDir = os.path.dirname(os.path.abspath(distDir))
+        oldDir = tempfile.mkdtemp(dir=parentDir, prefix='.dist.old.')
+        os.rmdir(oldDir)
+        os.rename(distDir, oldDir)
+        return oldDir
+
+    def removeDist(self, distDir: str) -> None:
+        """ Remove Dist
+
+        Remove the dist dir before a build, the files may be hardlinked to the
+        cache entries.
+        """
+        oldDir = self._moveAside(distDir)
+        if oldDir:
+            shutil.rmtree(oldDir, ignore_errors=True)
+
+    def store(self, key: str, distDir: str) -> None:
+        """ Store
+
+        Add the dist built for this key to the cache, then remove the least
+        recently used entries if the cache is too big.
+        """
+        index = self._loadIndex()
+        if key in index:
+            index[key]["lastUsed"] = time.time()
+            self._saveIndex(index)
+            return
+
+        tmpDir = tempfile.mkdtemp(dir=self._cacheDir, prefix='.store.')
+        try:
+            size = _linkTree(distDir, tmpDir, hardlink=False)
+            os.rename(tmpDir, self._entryDir(key))
+
+        except Exception:
+            shutil.rmtree(tmpDir, ignore_errors=True)
+            raise
+
+        index[key] = {"size": size, "lastUsed": time.time()}
+        self._evict(index, keepKey=key)
+        self._saveIndex(index)
+
+    def _evict(self, index: {str: dict}, keepKey: Optional[str] = None) -> None:
+        totalSize = sum(entry["size"] for entry in index.values())
+
+        for key in sorted(index, key=lambda k: index[k]["lastUsed"]):
+            if totalSize <= self._maxBytes:
+                break
+
+            if key == keepKey:
+                continue
+
+            logger.debug("Evicting frontend dist %s from the cache", key)
+            shutil.rmtree(self._entryDir(key), ignore_errors=True)
+            totalSize -= index.pop(key)["size"]
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from peek_platform.plugin.PluginFrontendChangeScanner import FileState
+from peek_platform.plugin.PluginFrontendDistCache import PluginFrontendDistCache, \
+    sourceKey
+
+
+class PluginFrontendDistCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.distDir = os.path.join(self._dir.name, 'dist')
+        self.cacheDir = os.path.join(self._dir.name, 'cache')
+
+    def _writeDist(self, content):
+        os.makedirs(self.distDir, exist_ok=True)
+        with open(os.path.join(self.distDir, 'main.bundle.js'), 'w') as f:
+            f.write(content)
+
+    def _readDist(self):
+        with open(os.path.join(self.distDir, 'main.bundle.js')) as f:
+            return f.read()
+
+    def testSourceKey(self):
+        states = {'app.ts': FileState(1, 1, b'a' * 16)}
+        touched = {'app.ts': FileState(1, 2, b'a' * 16)}
+        edited = {'app.ts': FileState(1, 2, b'b' * 16)}
+
+        self.assertEqual(sourceKey(states), sourceKey(touched))
+        self.assertNotEqual(sourceKey(states), sourceKey(edited))
+
+    def testSourceKeyIncludesTheBuildConfig(self):
+        projectDir = os.path.join(self._dir.name, 'project')
+        os.mkdir(projectDir)
+        states = {'app.ts': FileState(1, 1, b'a' * 16)}
+
+        def write(fileName, content):
+            with open(os.path.join(projectDir, fileName), 'w') as f:
+                f.write(content)
+
+        write('package.json', '{"dependencies": {"@angular/core": "4.0.0"}}')
+        write('README.md', 'The readme')
+        key = sourceKey(states, projectDir)
+        self.assertNotEqual(key, sourceKey(states))
+
+        write('README.md', 'Not part of the build')
+        self.assertEqual(sourceKey(states, projectDir), key)
+
+        for fileName in ('package.json', 'package-lock.json', 'yarn.lock',
+                         '.angular-cli.json', 'tsconfig.json', 'tsconfig.app.json'):
+            write(fileName, '{"changed": "%s"}' % fileName)
+            newKey = sourceKey(states, projectDir)
+            self.assertNotEqual(newKey, key, fileName)
+            key = newKey
+
+    def testStoreAndRestore(self):
+        cache = PluginFrontendDistCache(self.cacheDir, maxBytes=1000)
+        self.assertFalse(cache.restore('one', self.distDir))
+
+        self._writeDist('one')
+        cache.store('one', self.distDir)
+
+        self._writeDist('two')
+        cache.store('two', self.distDir)
+        self._writeDist('edited in place')
+
+        self.assertTrue(cache.restore('one', self.distDir))
+        self.assertEqual(self._readDist(), 'one')
+        self.assertEqual(os.listdir(self._dir.name), ['cache', 'dist'])
+
+    def testEvictLeastRecentlyUsed(self):
+        cache = PluginFrontendDistCache(self.cacheDir, maxBytes=15)
+
+        for key in ('one', 'two', 'three'):
+            self._writeDist(key.ljust(5))
+            cache.store(key, self.distDir)
+
+        # one was used more recently than two
+        cache.restore('one', self.distDir)
+
+        cache.removeDist(self.distDir)
+        self._writeDist('four'.ljust(5))
+        cache.store('four', self.distDir)
+
+        self.assertTrue(cache.has('one'))
+        self.assertFalse(cache.has('two'))
+        self.assertTrue(cache.has('three'))
+        self.assertTrue(cache.has('four'))
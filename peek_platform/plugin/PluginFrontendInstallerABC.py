@@ -1,21 +1,34 @@
 import logging
 import os
 import subprocess
+import time
 from collections import namedtuple
-from subprocess import PIPE
+from typing import Optional, Dict
+from subprocess import PIPE, STDOUT
 
-<<<<<<< HEAD
-
-=======
->>>>>>> isWindows variable wasn't doing anything.  It's been removed.
-from jsoncfg.value_mappers import require_string
+from twisted.internet.defer import Deferred, DeferredLock
 
 from peek_platform.WindowsPatch import isWindows
-from peek_plugin_base.PluginPackageFileConfig import PluginPackageFileConfig
 from peek_platform import PeekPlatformConfig
 from peek_platform.file_config.PeekFileConfigFrontendDirMixin import \
     PeekFileConfigFrontendDirMixin
 from peek_platform.file_config.PeekFileConfigOsMixin import PeekFileConfigOsMixin
+from peek_platform.plugin.PluginFrontendBuildExecutor import \
+    PluginFrontendBuildJob, pluginFrontendBuildExecutor
+from peek_platform.plugin.PluginFrontendBuildMetrics import \
+    PluginFrontendBuildMetricsCollector, PluginFrontendBuildMetricsHandler, \
+    PluginFrontendBuildMetricsStore
+from peek_platform.plugin.PluginFrontendBuildMetricsTuple import \
+    PluginFrontendBuildMetricsTuple
+from peek_platform.plugin.PluginFrontendBuildStateTuple import \
+    PluginFrontendBuildStateTuple
+from peek_platform.plugin.PluginFrontendChangeScanner import \
+    PluginFrontendChangeScanner, FileState
+from peek_platform.plugin.PluginFrontendDistCache import PluginFrontendDistCache, \
+    sourceKey
+from peek_platform.plugin.PluginFrontendPtyOutParser import \
+    PluginFrontendPtyOutParser, PtyOutEvent, EVENT_PROGRESS
+from peek_platform.plugin.PluginFrontendWatcher import PluginFrontendWatcher
 
 logger = logging.getLogger(__name__)
 
@@ -24,57 +37,6 @@ PluginDetail = namedtuple("PluginDetail",
                          "angularMainModule"])
 
 
-class _PtyOutParser:
-    """ PTY Out Parser
-
-    The node tools require a tty, so we run it with
-
-        parser = _PtyOutParser()
-        import pty
-        pty.spawn(*args, parser.read)
-
-    The only problem being that the output is sent to stdout, to solve this we intercept
-    the output, return a . for every read, which it sends to stdout, and then only log
-    the summary at the end of the webpack build.
-
-    """
-
-    def __init__(self):
-        self.data = ''
-        self.startLogging = False  # Ignore all the stuff before the final summary
-        self.allData = ''
-
-    def read(self, fd):
-        data = os.read(fd, 1024)
-        self.data += data.decode()
-        self.allData += data.decode()
-        self.splitData()
-
-        # Silence all the output
-        if len(data):
-            return b'.'
-
-        # If there is no output, return the EOF data
-        return data
-
-    def splitData(self):
-        lines = self.data.splitlines(True)
-        lines.reverse()
-        while lines:
-            line = lines.pop()
-            if not line.endswith(os.linesep):
-                self.data = line
-                break
-            self.logData(line.strip(os.linesep))
-
-    def logData(self, line):
-        self.startLogging = self.startLogging or line.startswith("Hash: ")
-        if not (line and self.startLogging):
-            return
-
-        logger.debug(line)
-
-
 class PluginFrontendInstallerABC(object):
     """ Peek App Frontend Installer Mixin
 
@@ -84,15 +46,25 @@ class PluginFrontendInstallerABC(object):
      * Linking in the frontend angular components to the frontend project
      * Compiling the frontend project
 
-    :TODO: Use find/sort to generate a string of the files when this was last run.
-    Only run it again if anything has changed.
-
     """
 
     def __init__(self, platformService: str):
         assert platformService in ("server", "client")
         self._platformService = platformService
 
+        self._frontendWatcher = None
+        self._frontendWatchPluginDetails = None
+        self._buildStateListeners = []
+
+        # The builds of this frontend run one at a time, they share the workspace
+        self._frontendBuildLock = DeferredLock()
+        self._frontendBuildDeferreds = set()
+
+        self._buildMetricsStore = None
+        self._buildMetricsHandler = PluginFrontendBuildMetricsHandler(
+            self, platformService)
+        self._buildMetricsHandler.start()
+
     @property
     def pluginFrontendTitleUrls(self):
         """ Plugin Admin Name Urls
@@ -105,8 +77,11 @@ class PluginFrontendInstallerABC(object):
 
         return data
 
-    def buildFrontend(self) -> None:
+    def _checkFrontendConfig(self) -> str:
+        """ Check Frontend Config
 
+        :return: The frontend source dir
+        """
         from peek_platform.plugin.PluginLoaderABC import PluginLoaderABC
         assert isinstance(self, PluginLoaderABC)
 
@@ -125,24 +100,214 @@ class PluginFrontendInstallerABC(object):
 
         self._hashFileName = os.path.join(os.path.dirname(feSrcDir), ".lastHash")
 
+        if self._buildMetricsStore is None:
+            self._buildMetricsStore = PluginFrontendBuildMetricsStore(
+                os.path.join(os.path.dirname(feSrcDir), ".buildMetrics.json"))
+
+        return feSrcDir
+
+    @property
+    def frontendBuildMetrics(self) -> [PluginFrontendBuildMetricsTuple]:
+        """ Frontend Build Metrics
+
+        :return: The metrics of the recent ng builds, oldest first
+        """
+        self._checkFrontendConfig()
+        return self._buildMetricsStore.builds
+
+    def buildFrontend(self) -> Deferred:
+        """ Build Frontend
+
+        Link the plugins into the frontend and build it, in the frontend build
+        executor, see PluginFrontendBuildExecutor.
+
+        :return: A Deferred that fires when the build is finished, cancel it to
+            cancel the build
+        """
+        feSrcDir = self._checkFrontendConfig()
         pluginDetails = self._loadPluginConfigs()
 
-        self._writePluginRouteLazyLoads(feSrcDir, pluginDetails)
-        self._relinkPluginDirs(feSrcDir, pluginDetails)
-        self._compileFrontend(feSrcDir)
+        return self._submitFrontendBuild(self._buildFrontendJob,
+                                         feSrcDir, pluginDetails)
+
+    def _buildFrontendJob(self, job: PluginFrontendBuildJob, feSrcDir: str,
+                          pluginDetails: [PluginDetail]) -> None:
+        self._syncFrontendWorkspace(feSrcDir, pluginDetails)
+        job.checkCancelled()
+        self._compileFrontend(feSrcDir, job)
+
+    def _submitFrontendBuild(self, buildCallable, *args) -> Deferred:
+        """ Submit Frontend Build
+
+        Run the buildCallable in the build executor, after the other builds of this
+        frontend have finished.
+        """
+        name = "%s frontend" % self._platformService
+
+        def run():
+            return pluginFrontendBuildExecutor().submit(name, buildCallable, *args)
+
+        d = self._frontendBuildLock.run(run)
+
+        self._frontendBuildDeferreds.add(d)
+
+        def finished(result):
+            self._frontendBuildDeferreds.discard(d)
+            return result
+
+        d.addBoth(finished)
+        return d
+
+    def cancelFrontendBuild(self) -> None:
+        """ Cancel Frontend Build
+
+        Cancel the running and waiting builds of this frontend.
+        """
+        for d in list(self._frontendBuildDeferreds):
+            d.cancel()
+
+    def addBuildStateListener(self, callback) -> None:
+        """ Add Build State Listener
+
+        :param callback: Called with a PluginFrontendBuildStateTuple as the watch
+            mode builds progress
+        """
+        self._buildStateListeners.append(callback)
+
+    def removeBuildStateListener(self, callback) -> None:
+        self._buildStateListeners.remove(callback)
+
+    def _notifyBuildState(self, state: str, startTime: float,
+                          changedPathCount: int = 0, error=None) -> None:
+        stateTuple = PluginFrontendBuildStateTuple(
+            platformService=self._platformService,
+            state=state,
+            changedPathCount=changedPathCount,
+            seconds=time.time() - startTime,
+            error=str(error) if error else None)
+
+        for callback in list(self._buildStateListeners):
+            try:
+                callback(stateTuple)
+
+            except Exception as e:
+                logger.error("A frontend build state listener failed")
+                logger.exception(e)
+
+    def startFrontendWatch(self, debounceSeconds: float = 0.5) -> None:
+        """ Start Frontend Watch
+
+        Watch the frontend source dir and the plugin frontend dirs, relink and
+        rebuild the frontend when they change. The first build is run straight away.
+
+        Call requestFrontendBuild when the loaded plugins change.
+
+        """
+        if self._frontendWatcher:
+            return
+
+        feSrcDir = self._checkFrontendConfig()
+        self._frontendWatchPluginDetails = None
+
+        self._frontendWatcher = PluginFrontendWatcher(self._frontendWatchBuild,
+                                                      debounceSeconds=debounceSeconds)
+        self._frontendWatcher.start([feSrcDir])
+        self._frontendWatcher.notify()
+
+    def stopFrontendWatch(self) -> None:
+        if self._frontendWatcher:
+            self._frontendWatcher.stop()
+            self._frontendWatcher = None
+            self.cancelFrontendBuild()
+
+    def requestFrontendBuild(self) -> None:
+        """ Request Frontend Build
+
+        Rebuild the frontend in watch mode, EG after a plugin is loaded or updated.
+        """
+        if self._frontendWatcher:
+            self._frontendWatcher.notify()
+
+    def _frontendWatchBuild(self, changedPaths: set):
+        """ Frontend Watch Build
+
+        The plugins are only relinked and the routes rewritten if the plugins have
+        changed. The build is only run if the change scanner finds a change.
+
+        :return: A Deferred that fires when the build is finished
+        """
+        from twisted.internet import reactor
+
+        startTime = time.time()
+        changedPathCount = len(changedPaths)
+        feSrcDir = self._checkFrontendConfig()
+
+        self._notifyBuildState(PluginFrontendBuildStateTuple.STATE_PENDING,
+                               startTime, changedPathCount)
+
+        pluginDetails = self._loadPluginConfigs()
+        relink = pluginDetails != self._frontendWatchPluginDetails
+
+        def notifyFromThread(state):
+            reactor.callFromThread(self._notifyBuildState, state,
+                                   startTime, changedPathCount)
+
+        def build(job: PluginFrontendBuildJob) -> bool:
+            if relink:
+                notifyFromThread(PluginFrontendBuildStateTuple.STATE_LINKING)
+                self._syncFrontendWorkspace(feSrcDir, pluginDetails)
+
+            notifyFromThread(PluginFrontendBuildStateTuple.STATE_CHECKING)
+            fileStates = self._recompileRequiredCheck(feSrcDir)
+            if fileStates is None:
+                return False
+
+            job.checkCancelled()
+            notifyFromThread(PluginFrontendBuildStateTuple.STATE_BUILDING)
+            self._buildFrontendDist(feSrcDir, job, fileStates)
+            return True
+
+        def built(changed):
+            if relink:
+                self._frontendWatchPluginDetails = pluginDetails
+                if self._frontendWatcher:
+                    self._frontendWatcher.setDirs(
+                        [feSrcDir] + [os.path.join(p.pluginRootDir, p.angularFrontendDir)
+                                      for p in pluginDetails])
+
+            self._notifyBuildState(PluginFrontendBuildStateTuple.STATE_BUILT
+                                   if changed else
+                                   PluginFrontendBuildStateTuple.STATE_UNCHANGED,
+                                   startTime, changedPathCount)
+
+        def failed(failure):
+            self._notifyBuildState(PluginFrontendBuildStateTuple.STATE_FAILED,
+                                   startTime, changedPathCount, failure.value)
+            return failure
+
+        d = self._submitFrontendBuild(build)
+        d.addCallbacks(built, failed)
+        return d
 
     def _loadPluginConfigs(self) -> [PluginDetail]:
         pluginDetails = []
 
         for plugin in self._loadedPlugins.values():
-            assert isinstance(plugin.packageCfg, PluginPackageFileConfig)
-            pluginPackageConfig = plugin.packageCfg.config
-
-            angularFrontendDir = (pluginPackageConfig[self._platformService]
-                                  .angularFrontendDir(require_string))
-
-            angularMainModule = (pluginPackageConfig[self._platformService]
-                                 .angularMainModule(require_string))
+            # The package configs are read from the loaders manifest cache
+            manifest = self._manifestCache.get(plugin.name)
+            if not manifest or manifest.pluginRootDir != plugin.rootDir:
+                manifest = self._manifestCache.update(plugin.name, plugin.rootDir)
+
+            serviceConfig = manifest.packageConfig.get(self._platformService, {})
+            angularFrontendDir = serviceConfig.get("angularFrontendDir")
+            angularMainModule = serviceConfig.get("angularMainModule")
+
+            for name, value in (("angularFrontendDir", angularFrontendDir),
+                                ("angularMainModule", angularMainModule)):
+                if not isinstance(value, str):
+                    raise Exception("Plugin %s package config %s.%s must be a string"
+                                    ", got %s"
+                                    % (plugin.name, self._platformService, name, value))
 
             pluginDetails.append(
                 PluginDetail(pluginRootDir=plugin.rootDir,
@@ -153,7 +318,65 @@ class PluginFrontendInstallerABC(object):
 
         return pluginDetails
 
-    def _writePluginRouteLazyLoads(self, feSrcDir: str, pluginDetails: [PluginDetail]) -> None:
+    def _syncFrontendWorkspace(self, feSrcDir: str,
+                               pluginDetails: [PluginDetail]) -> bool:
+        """ Sync Frontend Workspace
+
+        Make the plugin symlinks and PluginRoutes.ts match the plugin details, only
+        the differences are written, so a sync with no changes writes nothing.
+
+        The links are added before the routes are written, and removed after, so the
+        routes never refer to a plugin dir that isn't linked.
+
+        :return: True if anything was changed
+        """
+        desiredLinks = {p.pluginName: os.path.join(p.pluginRootDir, p.angularFrontendDir)
+                        for p in pluginDetails}
+        existingLinks = self._pluginLinks(feSrcDir)
+
+        changed = False
+        for pluginName, srcDir in desiredLinks.items():
+            if existingLinks.get(pluginName) != srcDir:
+                self._replaceSymlink(srcDir, os.path.join(feSrcDir, pluginName))
+                changed = True
+
+        changed |= self._writePluginRouteLazyLoads(feSrcDir, pluginDetails)
+
+        for pluginName in set(existingLinks) - set(desiredLinks):
+            logger.debug("Removing frontend link for %s", pluginName)
+            os.remove(os.path.join(feSrcDir, pluginName))
+            changed = True
+
+        return changed
+
+    def _pluginLinks(self, feSrcDir: str) -> {str: str}:
+        """ Plugin Links
+
+        :return: The targets of the plugin symlinks in the source dir, by name
+        """
+        links = {}
+        with os.scandir(feSrcDir) as it:
+            for entry in it:
+                if entry.name.startswith("plugin_") and entry.is_symlink():
+                    links[entry.name] = os.readlink(entry.path)
+        return links
+
+    def _replaceSymlink(self, srcDir: str, linkPath: str) -> None:
+        """ Replace Symlink
+
+        Create the link with a temporary name, then rename it over the old link, so
+        the link is never missing.
+        """
+        logger.debug("Linking %s to %s", linkPath, srcDir)
+        tmpLinkPath = "%s.%s.tmp" % (linkPath, os.getpid())
+        if os.path.lexists(tmpLinkPath):
+            os.remove(tmpLinkPath)
+
+        os.symlink(srcDir, tmpLinkPath, target_is_directory=True)
+        os.replace(tmpLinkPath, linkPath)
+
+    def _writePluginRouteLazyLoads(self, feSrcDir: str,
+                                   pluginDetails: [PluginDetail]) -> bool:
         """
         export const pluginRoutes = [
             {
@@ -161,6 +384,8 @@ class PluginFrontendInstallerABC(object):
                 loadChildren: "plugin-noop/plugin-noop.module#default"
             }
         ];
+
+        :return: True if the file was written
         """
         routes = []
         for pluginDetail in pluginDetails:
@@ -183,130 +408,205 @@ class PluginFrontendInstallerABC(object):
 
         # Since writing the file again changes the date/time,
         # this messes with the self._recompileRequiredCheck
-        with open(pluginRoutesTs, 'r') as f:
-            if routeData == f.read():
-                logger.debug("PluginRoutes.ts is up to date")
-                return
+        if os.path.isfile(pluginRoutesTs):
+            with open(pluginRoutesTs, 'r') as f:
+                if routeData == f.read():
+                    logger.debug("PluginRoutes.ts is up to date")
+                    return False
 
         logger.debug("Writing new PluginRoutes.ts")
-        with open(pluginRoutesTs, 'w') as f:
+        tmpRoutesTs = "%s.%s.tmp" % (pluginRoutesTs, os.getpid())
+        with open(tmpRoutesTs, 'w') as f:
             f.write(routeData)
+        os.replace(tmpRoutesTs, pluginRoutesTs)
+        return True
 
-    def _relinkPluginDirs(self, feSrcDir: str, pluginDetails: [PluginDetail]) -> None:
-        # Remove all the old symlinks
-
-        for item in os.listdir(feSrcDir):
-            path = os.path.join(feSrcDir, item)
-            if item.startswith("plugin_") and os.path.islink(path):
-                os.remove(path)
-
-        for pluginDetail in pluginDetails:
-            srcDir = os.path.join(pluginDetail.pluginRootDir,
-                                  pluginDetail.angularFrontendDir)
-            linkPath = os.path.join(feSrcDir, pluginDetail.pluginName)
-            os.symlink(srcDir, linkPath, target_is_directory=True)
-
-    def _recompileRequiredCheck(self, feSrcDir: str) -> bool:
+    def _recompileRequiredCheck(self, feSrcDir: str) -> Optional[Dict[str, FileState]]:
         """ Recompile Check
 
-        This command lists the details of the source dir to see if a recompile is needed
-
-        The find command outputs the following
+        This checks the files in the source dir, and the plugin dirs linked into it,
+        against the manifest of the last build, see PluginFrontendChangeScanner.
 
-        543101    0 -rw-r--r--   1 peek     sudo            0 Nov 29 17:27 ./src/app/environment/environment.component.css
-        543403    4 drwxr-xr-x   2 peek     sudo         4096 Dec  2 17:37 ./src/app/environment/env-worker
-        543446    4 -rw-r--r--   1 peek     sudo         1531 Dec  2 17:37 ./src/app/environment/env-worker/env-worker.component.html
+        The manifest isn't updated for the changes until they're built, see
+        _buildFrontendDist.
 
+        :return: The new file states if a rebuild is required, otherwise None
         """
-        ignore = (".git", ".idea", "dist")
-        ignore = ["'%s'" % i for i in ignore]  # Surround with quotes
-        grep = "grep -v -e %s " % ' -e '.join(ignore)  # Xreate the grep command
-        cmd = "find -L %s -type f -ls | %s" % (feSrcDir, grep)
-        commandComplete = subprocess.run(cmd,
-                                         executable=PeekPlatformConfig.config.bashLocation,
-                                         stdout=PIPE, stderr=PIPE, shell=True)
-
-        if commandComplete.returncode:
-            for line in commandComplete.stdout.splitlines():
-                logger.error(line)
-            for line in commandComplete.stderr.splitlines():
-                logger.error(line)
-            raise Exception("Frontend compile diff check failed")
-
+        fileStates = PluginFrontendChangeScanner(self._hashFileName) \
+            .pendingChanges(feSrcDir)
         logger.debug("Frontend compile diff check ran ok")
+        return fileStates
 
-        newHash = commandComplete.stdout
-        fileHash = ""
+    def _compileFrontend(self, feSrcDir: str, job: PluginFrontendBuildJob) -> None:
+        """ Compile the frontend
 
-        if os.path.isfile(self._hashFileName):
-            with open(self._hashFileName, 'rb') as f:
-                fileHash = f.read()
+        this runs `ng build`
 
-        fileHashLines = set(fileHash.splitlines())
-        newHashLines = set(newHash.splitlines())
-        changes = False
+        We need to use a pty otherwise webpack doesn't run.
 
-        for line in fileHashLines - newHashLines:
-            changes = True
-            logger.debug("Removed %s" % line)
+        """
 
-        for line in newHashLines - fileHashLines:
-            changes = True
-            logger.debug("Added %s" % line)
+        fileStates = self._recompileRequiredCheck(feSrcDir)
+        if fileStates is None:
+            logger.info("Frondend has not changed, recompile not required.")
+            return
 
-        if changes:
-            with open(self._hashFileName, 'wb') as f:
-                f.write(newHash)
+        job.checkCancelled()
+        self._buildFrontendDist(feSrcDir, job, fileStates)
 
-        return changes
+    def _buildFrontendDist(self, feSrcDir: str, job: PluginFrontendBuildJob,
+                           fileStates: {str: FileState}) -> None:
+        """ Build Frontend Dist
 
+        Build the dist for the file states from _recompileRequiredCheck, then save
+        them to the manifest. If the build fails or is cancelled the manifest is
+        removed, so the next check builds again.
 
-    def _compileFrontend(self, feSrcDir: str) -> None:
-        """ Compile the frontend
+        """
+        scanner = PluginFrontendChangeScanner(self._hashFileName)
+        try:
+            self._restoreOrBuildFrontendDist(feSrcDir, job, fileStates)
 
-        this runs `ng build`
+        except Exception:
+            # Build again next time, even if the sources haven't changed
+            scanner.reset()
+            raise
 
-        We need to use a pty otherwise webpack doesn't run.
+        scanner.save(fileStates)
+
+    def _restoreOrBuildFrontendDist(self, feSrcDir: str, job: PluginFrontendBuildJob,
+                                    fileStates: {str: FileState}) -> None:
+        """ Restore or Build Frontend Dist
+
+        Restore the dist from the cache if these sources have been built before,
+        otherwise build it and add it to the cache.
 
         """
+        from peek_platform import PeekPlatformConfig
+        feDistDir = PeekPlatformConfig.config.feDistDir
 
-        if not self._recompileRequiredCheck(feSrcDir):
-            logger.info("Frondend has not changed, recompile not required.")
+        distCache = None
+        if PeekPlatformConfig.config.feDistCacheMaxBytes:
+            distCache = PluginFrontendDistCache(
+                PeekPlatformConfig.config.feDistCacheDir,
+                PeekPlatformConfig.config.feDistCacheMaxBytes)
+
+        key = sourceKey(fileStates, os.path.dirname(feSrcDir))
+        if distCache and distCache.restore(key, feDistDir):
             return
 
         logger.info("Rebuilding frontend distribution")
 
-        if isWindows:
-            self._compileFrontendWin(feSrcDir)
-        else:
-            self._compileFrontendPosix(feSrcDir)
-
-    def _compileFrontendWin(self, feSrcDir: str) -> None:
-        commandComplete = subprocess.run("(cd %s && ng build)" % feSrcDir,
-                                         executable=PeekPlatformConfig.config.bashLocation,
-                                         stdout=PIPE, stderr=PIPE, shell=True)
-
-        if commandComplete.returncode:
-            for line in commandComplete.stdout.splitlines():
-                logger.error(line)
-            for line in commandComplete.stderr.splitlines():
+        # The dist may be hardlinked to the cache
+        if distCache:
+            distCache.removeDist(feDistDir)
+
+        metrics = PluginFrontendBuildMetricsCollector(self._platformService)
+
+        try:
+            if isWindows:
+                self._compileFrontendWin(feSrcDir, job, metrics)
+            else:
+                self._compileFrontendPosix(feSrcDir, job, metrics)
+
+        except Exception:
+            if not job.cancelled:
+                self._recordBuildMetrics(metrics.finish(succeeded=False))
+            raise
+
+        self._recordBuildMetrics(metrics.finish(succeeded=True))
+
+        if distCache:
+            try:
+                distCache.store(key, feDistDir)
+
+            except Exception as e:
+                logger.warning("Failed to add the frontend dist to the cache, %s", e)
+
+    def _recordBuildMetrics(self, metrics: PluginFrontendBuildMetricsTuple) -> None:
+        logger.info("Frontend build took %.1fs, %s bytes in %s chunks,"
+                    " %s warnings, %s errors",
+                    metrics.seconds, metrics.totalBytes, len(metrics.chunks),
+                    metrics.warningCount, metrics.errorCount)
+        try:
+            self._buildMetricsStore.record(metrics)
+
+        except Exception as e:
+            logger.warning("Failed to save the frontend build metrics, %s", e)
+
+    def _compileFrontendWin(self, feSrcDir: str, job: PluginFrontendBuildJob,
+                            metrics: PluginFrontendBuildMetricsCollector) -> None:
+        process = subprocess.Popen("(cd %s && ng build)" % feSrcDir,
+                                   executable=PeekPlatformConfig.config.bashLocation,
+                                   stdout=PIPE, stderr=STDOUT, shell=True)
+        job.setProcess(process)
+        try:
+            stdout, _ = process.communicate()
+        finally:
+            job.setProcess(None)
+
+        job.checkCancelled()
+
+        parser = PluginFrontendPtyOutParser(eventCallback=metrics.processEvent)
+        parser.feed(stdout)
+        parser.feed(b'')
+
+        if process.returncode:
+            for line in parser.recentLines:
                 logger.error(line)
             raise Exception("The angular frontend failed to build.")
 
         logger.info("Frontend distribution rebuild complete.")
 
-    def _compileFrontendPosix(self, feSrcDir: str) -> None:
+    def _compileFrontendPosix(self, feSrcDir: str, job: PluginFrontendBuildJob,
+                              metrics: PluginFrontendBuildMetricsCollector) -> None:
+        """ Compile Frontend Posix
+
+        ng needs a tty, so it's run with a pty, in a session of it's own so a cancel
+        can kill it and it's children.
 
+        """
         import pty
 
-        parser = _PtyOutParser()
+        def processEvent(event: PtyOutEvent):
+            if event.kind == EVENT_PROGRESS and event.percent % 10 == 0:
+                logger.debug("Frontend build %s%% %s", event.percent, event.line)
+            metrics.processEvent(event)
+
+        parser = PluginFrontendPtyOutParser(eventCallback=processEvent)
+
+        masterFd, slaveFd = pty.openpty()
+        try:
+            process = subprocess.Popen(
+                ["bash", "-l", "-c", "cd %s && ng build" % feSrcDir],
+                stdin=slaveFd, stdout=slaveFd, stderr=slaveFd,
+                start_new_session=True)
+        finally:
+            os.close(slaveFd)
+
+        job.setProcess(process)
+        try:
+            while True:
+                try:
+                    data = os.read(masterFd, parser.READ_SIZE)
+                except OSError:
+                    # Linux raises EIO when the last process closes the pty
+                    data = b''
+
+                parser.feed(data)
+                if not data:
+                    break
+
+            returnCode = process.wait()
+
+        finally:
+            job.setProcess(None)
+            os.close(masterFd)
 
-        returnCode = pty.spawn(["bash", "-l", "-c", "cd %s && ng build" % feSrcDir],
-                               parser.read)
+        job.checkCancelled()
 
         if returnCode:
-            os.remove(self._hashFileName)
-            [logger.error(l) for l in parser.allData.splitlines()]
+            [logger.error(l) for l in parser.recentLines]
             raise Exception("The angular frontend failed to build.")
         else:
             logger.info("Frontend distribution rebuild complete.")
@@ -0,0 +1,208 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from twisted.internet.defer import CancelledError
+
+from peek_platform.plugin import PluginFrontendInstallerABC as installerModule
+from peek_platform.plugin.PluginFrontendBuildExecutor import PluginFrontendBuildJob
+from peek_platform.plugin.PluginFrontendInstallerABC import \
+    PluginFrontendInstallerABC, PluginDetail
+
+
+class PluginFrontendInstallerABCTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.feSrcDir = os.path.join(self._dir.name, 'peek_server_fe', 'src')
+        os.makedirs(self.feSrcDir)
+
+        # Not a plugin link, the sync leaves it alone
+        os.mkdir(os.path.join(self.feSrcDir, 'app'))
+
+        self.installer = PluginFrontendInstallerABC("server")
+        self.addCleanup(self.installer._buildMetricsHandler.shutdown)
+
+    def _pluginDetail(self, pluginName, version='1'):
+        pluginRootDir = os.path.join(self._dir.name, version, pluginName)
+        os.makedirs(os.path.join(pluginRootDir, 'frontend'), exist_ok=True)
+        return PluginDetail(pluginRootDir=pluginRootDir,
+                            pluginName=pluginName,
+                            angularFrontendDir='frontend',
+                            angularMainModule='%s.module' % pluginName)
+
+    def _links(self):
+        return self.installer._pluginLinks(self.feSrcDir)
+
+    def _routesTs(self):
+        with open(os.path.join(self.feSrcDir, 'PluginRoutes.ts')) as f:
+            return f.read()
+
+    def testSyncAddedRemovedAndChangedPlugins(self):
+        noop = self._pluginDetail('plugin_noop')
+        other = self._pluginDetail('plugin_other')
+
+        self.assertTrue(self.installer._syncFrontendWorkspace(self.feSrcDir,
+                                                              [noop, other]))
+        self.assertEqual(self._links(),
+                         {'plugin_noop': os.path.join(noop.pluginRootDir, 'frontend'),
+                          'plugin_other': os.path.join(other.pluginRootDir, 'frontend')})
+        self.assertIn("plugin_noop/plugin_noop.module#default", self._routesTs())
+        self.assertIn("plugin_other/plugin_other.module#default", self._routesTs())
+
+        # Nothing changed, nothing is written
+        with mock.patch.object(installerModule.os, 'replace') as replace:
+            self.assertFalse(self.installer._syncFrontendWorkspace(self.feSrcDir,
+                                                                   [noop, other]))
+        self.assertFalse(replace.called)
+
+        # A new version of plugin_other, and plugin_noop is removed
+        newOther = self._pluginDetail('plugin_other', version='2')
+        self.assertTrue(self.installer._syncFrontendWorkspace(self.feSrcDir,
+                                                              [newOther]))
+
+        self.assertEqual(self._links(),
+                         {'plugin_other': os.path.join(newOther.pluginRootDir,
+                                                       'frontend')})
+        self.assertNotIn("plugin_noop", self._routesTs())
+        self.assertEqual(sorted(os.listdir(self.feSrcDir)),
+                         ['PluginRoutes.ts', 'app', 'plugin_other'])
+
+    def testSyncOrder(self):
+        noop = self._pluginDetail('plugin_noop')
+        other = self._pluginDetail('plugin_other')
+        self.installer._syncFrontendWorkspace(self.feSrcDir, [noop])
+
+        calls = []
+        installer = self.installer
+
+        def replaceSymlink(srcDir, linkPath):
+            calls.append(('link', os.path.basename(linkPath)))
+            return PluginFrontendInstallerABC._replaceSymlink(installer, srcDir,
+                                                              linkPath)
+
+        def writeRoutes(feSrcDir, pluginDetails):
+            # The links the routes refer to are all there
+            calls.append(('routes', sorted(self._links())))
+            return PluginFrontendInstallerABC._writePluginRouteLazyLoads(
+                installer, feSrcDir, pluginDetails)
+
+        with mock.patch.object(installer, '_replaceSymlink', replaceSymlink), \
+                mock.patch.object(installer, '_writePluginRouteLazyLoads', writeRoutes):
+            installer._syncFrontendWorkspace(self.feSrcDir, [other])
+
+        # The new link is added before the routes, the old one removed after
+        self.assertEqual(calls, [('link', 'plugin_other'),
+                                 ('routes', ['plugin_noop', 'plugin_other'])])
+        self.assertEqual(list(self._links()), ['plugin_other'])
+
+    def testReplaceSymlink(self):
+        linkPath = os.path.join(self.feSrcDir, 'plugin_noop')
+        oldDir = self._pluginDetail('plugin_noop').pluginRootDir
+        newDir = self._pluginDetail('plugin_noop', version='2').pluginRootDir
+        os.symlink(oldDir, linkPath)
+
+        # A temp link left by a process that died
+        tmpLinkPath = "%s.%s.tmp" % (linkPath, os.getpid())
+        os.symlink(oldDir, tmpLinkPath)
+
+        realReplace = os.replace
+
+        def replace(src, dst):
+            # The old link is still there until it's replaced
+            self.assertEqual(os.readlink(dst), oldDir)
+            self.assertEqual(os.readlink(src), newDir)
+            realReplace(src, dst)
+
+        with mock.patch.object(installerModule.os, 'replace', replace):
+            self.installer._replaceSymlink(newDir, linkPath)
+
+        self.assertEqual(os.readlink(linkPath), newDir)
+        self.assertFalse(os.path.lexists(tmpLinkPath))
+
+    def testWritePluginRoutesReplacesTheFile(self):
+        noop = self._pluginDetail('plugin_noop')
+        routesTs = os.path.join(self.feSrcDir, 'PluginRoutes.ts')
+
+        with open(routesTs, 'w') as f:
+            f.write("The old routes")
+
+        realReplace = os.replace
+        replaced = []
+
+        def replace(src, dst):
+            # The routes are written to a temp file, the old routes are still there
+            replaced.append((os.path.basename(src), os.path.basename(dst)))
+            with open(dst) as f:
+                self.assertEqual(f.read(), "The old routes")
+            realReplace(src, dst)
+
+        with mock.patch.object(installerModule.os, 'replace', replace):
+            self.assertTrue(self.installer._writePluginRouteLazyLoads(self.feSrcDir,
+                                                                      [noop]))
+
+        self.assertEqual(replaced,
+                         [('PluginRoutes.ts.%s.tmp' % os.getpid(), 'PluginRoutes.ts')])
+        self.assertIn("path: 'plugin_noop'", self._routesTs())
+
+        # The same routes don't touch the file
+        mtimeNs = os.stat(routesTs).st_mtime_ns
+        self.assertFalse(self.installer._writePluginRouteLazyLoads(self.feSrcDir,
+                                                                   [noop]))
+        self.assertEqual(os.stat(routesTs).st_mtime_ns, mtimeNs)
+        self.assertEqual(sorted(os.listdir(self.feSrcDir)),
+                         ['PluginRoutes.ts', 'app'])
+
+    def _writeSource(self, content):
+        with open(os.path.join(self.feSrcDir, 'app', 'app.ts'), 'w') as f:
+            f.write(content)
+
+    def testCancelBetweenCheckAndBuild(self):
+        self.installer._hashFileName = os.path.join(self._dir.name, '.lastHash')
+        self._writeSource('one')
+
+        job = PluginFrontendBuildJob("server frontend")
+        realCheck = self.installer._recompileRequiredCheck
+
+        def checkThenCancel(feSrcDir):
+            fileStates = realCheck(feSrcDir)
+            job.cancel()
+            return fileStates
+
+        with mock.patch.object(self.installer, '_recompileRequiredCheck',
+                               checkThenCancel), \
+                mock.patch.object(self.installer,
+                                  '_restoreOrBuildFrontendDist') as build:
+            with self.assertRaises(CancelledError):
+                self.installer._compileFrontend(self.feSrcDir, job)
+
+        self.assertFalse(build.called)
+
+        # The next build runs, and records the sources once it succeeds
+        job = PluginFrontendBuildJob("server frontend")
+        with mock.patch.object(self.installer, '_restoreOrBuildFrontendDist') as build:
+            self.installer._compileFrontend(self.feSrcDir, job)
+            self.assertEqual(build.call_count, 1)
+
+            self.installer._compileFrontend(self.feSrcDir, job)
+            self.assertEqual(build.call_count, 1)
+
+    def testCancelDuringBuild(self):
+        self.installer._hashFileName = os.path.join(self._dir.name, '.lastHash')
+        self._writeSource('one')
+
+        job = PluginFrontendBuildJob("server frontend")
+        with mock.patch.object(self.installer, '_restoreOrBuildFrontendDist'):
+            self.installer._compileFrontend(self.feSrcDir, job)
+
+        # The sources change, then the build is cancelled, EG in the dist restore
+        self._writeSource('two')
+        cancelled = CancelledError("The frontend build was cancelled")
+        with mock.patch.object(self.installer, '_restoreOrBuildFrontendDist',
+                               side_effect=cancelled):
+            with self.assertRaises(CancelledError):
+                self.installer._compileFrontend(self.feSrcDir, job)
+
+        self.assertIsNotNone(self.installer._recompileRequiredCheck(self.feSrcDir))
@@ -0,0 +1,130 @@
+""" Plugin Frontend PTY Output Benchmark
+
+Measures the throughput of the PluginFrontendPtyOutParser and the
+PluginFrontendBuildMetricsCollector, by replaying the output of an ng build.
+
+The default output is a sample of an ng build of a frontend with a few plugins,
+record a real build with :
+
+    script -q -c "ng build" ng_build.log
+
+Run with :
+
+    python -m peek_platform.plugin.PluginFrontendPtyOutBench \\
+        [--file ng_build.log] [--repeat 20] [--min-mb-per-sec 20]
+
+It exits with 1 if the throughput is below the minimum.
+
+"""
+import argparse
+import sys
+import time
+
+from peek_platform.plugin.PluginFrontendBuildMetrics import \
+    PluginFrontendBuildMetricsCollector
+from peek_platform.plugin.PluginFrontendPtyOutParser import \
+    PluginFrontendPtyOutParser
+
+
+def sampleOutput(moduleCount: int = 3000) -> bytes:
+    """ Sample Output
+
+    :return: The output of an ng build, webpack redraws the progress line with \\r
+        and colours it.
+    """
+    lines = []
+    for i in range(moduleCount):
+        percent = 10 + (i * 60 // moduleCount)
+        lines.append("\x1b[2K\x1b[1G%s%% building modules %s/%s modules %s active"
+                     " .../node_modules/@angular/core/@angular/core.es5.js\r"
+                     % (percent, i, moduleCount + 100, i % 7))
+
+    for percent, step in ((70, "building modules"), (91, "additional asset processing"),
+                          (92, "chunk asset optimization"), (94, "asset optimization"),
+                          (95, "emitting")):
+        lines.append("\x1b[2K\x1b[1G%s%% %s\r" % (percent, step))
+
+    lines.append("\x1b[2K\x1b[1GHash: 3b7d5b0c1e4b7a1c2f5e\n")
+    lines.append("Time: 52314ms\n")
+
+    chunks = [
+        "chunk {0} 0.chunk.js, 0.chunk.js.map 1.58 MB {5} [rendered]",
+        "chunk {1} 1.chunk.js, 1.chunk.js.map 321 kB {5} [rendered]",
+        "chunk {2} 2.chunk.js, 2.chunk.js.map 88.4 kB {5} [rendered]",
+        "chunk {3} polyfills.bundle.js, polyfills.bundle.js.map (polyfills)"
+        " 183 kB {7} [initial] [rendered]",
+        "chunk {4} main.bundle.js, main.bundle.js.map (main) 412 kB {6} [initial]"
+        " [rendered]",
+        "chunk {5} styles.bundle.js, styles.bundle.js.map (styles) 10.5 kB {7}"
+        " [initial] [rendered]",
+        "chunk {6} vendor.bundle.js, vendor.bundle.js.map (vendor) 4.64 MB"
+        " [initial] [rendered]",
+        "chunk {7} inline.bundle.js, inline.bundle.js.map (inline) 0 bytes"
+        " [entry] [rendered]",
+    ]
+    lines.extend("\x1b[1m\x1b[33m%s\x1b[39m\x1b[22m\n" % c for c in chunks)
+
+    lines.append("\n\x1b[1m\x1b[33mWARNING in ./src/app/plugin_noop/noop.module.ts\n")
+    lines.append("There are multiple modules with names that only differ in casing.\n")
+
+    return ''.join(lines).encode()
+
+
+def replay(output: bytes, readSize: int) -> PluginFrontendBuildMetricsCollector:
+    metrics = PluginFrontendBuildMetricsCollector("bench")
+    parser = PluginFrontendPtyOutParser(eventCallback=metrics.processEvent)
+
+    for offset in range(0, len(output), readSize):
+        parser.feed(output[offset:offset + readSize])
+    parser.feed(b'')
+
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peek frontend build output benchmark")
+    parser.add_argument("--file", default=None,
+                        help="A recorded ng build output, the sample is used if unset")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="The number of times to replay the output")
+    parser.add_argument("--read-size", type=int,
+                        default=PluginFrontendPtyOutParser.READ_SIZE,
+                        help="The size of each read from the pty")
+    parser.add_argument("--min-mb-per-sec", type=float, default=None,
+                        help="Fail if the throughput is below this")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'rb') as f:
+            output = f.read()
+    else:
+        output = sampleOutput()
+
+    lineCount = output.count(b'\n') + output.count(b'\r')
+
+    bestSeconds = None
+    for _ in range(args.repeat):
+        startTime = time.perf_counter()
+        metrics = replay(output, args.read_size)
+        seconds = time.perf_counter() - startTime
+        bestSeconds = seconds if bestSeconds is None else min(bestSeconds, seconds)
+
+    result = metrics.finish(succeeded=True)
+    mbPerSec = len(output) / bestSeconds / 1024 / 1024
+
+    print("Output            %10.2f MB, %s lines" % (len(output) / 1024 / 1024,
+                                                     lineCount))
+    print("Best replay       %10.2f ms" % (bestSeconds * 1000))
+    print("Throughput        %10.2f MB/s, %.0f lines/s"
+          % (mbPerSec, lineCount / bestSeconds))
+    print("Parsed            %10s chunks, %s bytes, %s warnings, %s errors"
+          % (len(result.chunks), result.totalBytes, result.warningCount,
+             result.errorCount))
+
+    if args.min_mb_per_sec is not None and mbPerSec < args.min_mb_per_sec:
+        print("Below the %s MB/s minimum" % args.min_mb_per_sec)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import codecs
+import logging
+import os
+import re
+from collections import deque, namedtuple
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PtyOutEvent = namedtuple("PtyOutEvent", ["kind", "percent", "line"])
+
+# The kinds of events
+EVENT_PROGRESS = "progress"
+EVENT_ERROR = "error"
+EVENT_SUMMARY_LINE = "summaryLine"
+EVENT_FINISHED = "finished"
+
+_ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+_PROGRESS_RE = re.compile(r'^\s*(\d{1,3})% (.*)$')
+
+
+class PluginFrontendPtyOutParser:
+    """ PTY Out Parser
+
+    The node tools require a tty, so we run it with a pty, and feed the parser what
+    is read from the pty master, or with
+
+        parser = PluginFrontendPtyOutParser()
+        import pty
+        pty.spawn(*args, parser.read)
+
+    The only problem with pty.spawn being that the output is sent to stdout, to solve
+    this we intercept the output, return a . for every read, which it sends to
+    stdout, and then only log the summary at the end of the webpack build.
+
+    The output is decoded and split into lines as it arrives, only the last
+    maxLines lines are kept, for reporting errors. Lines split on \\r as well, so
+    the webpack progress updates are lines.
+
+    The eventCallback is called with a PtyOutEvent for the progress, each error and
+    summary line, and when the output is finished.
+
+    """
+
+    READ_SIZE = 64 * 1024
+
+    # A line longer than this is split, so the partial line can't grow forever
+    MAX_LINE_LENGTH = 64 * 1024
+
+    def __init__(self, maxLines: int = 500,
+                 eventCallback: Optional[Callable[[PtyOutEvent], None]] = None):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._partialLine = ''
+        self._recentLines = deque(maxlen=maxLines)
+        self._eventCallback = eventCallback
+
+        self.startLogging = False  # Ignore all the stuff before the final summary
+        self.lastPercent = None
+        self.errorCount = 0
+        self.finished = False
+
+    @property
+    def recentLines(self) -> [str]:
+        """ Recent Lines
+
+        :return: The last maxLines lines of output
+        """
+        lines = list(self._recentLines)
+        if self._partialLine:
+            lines.append(self._partialLine)
+        return lines
+
+    def read(self, fd) -> bytes:
+        data = os.read(fd, self.READ_SIZE)
+        self.feed(data)
+
+        # Silence all the output
+        if len(data):
+            return b'.'
+
+        # If there is no output, return the EOF data
+        return data
+
+    def feed(self, data: bytes) -> None:
+        """ Feed
+
+        :param data: The next bytes of output, empty bytes when the output is finished
+        """
+        if not data:
+            self._finish()
+            return
+
+        text = self._partialLine + self._decoder.decode(data)
+        lines = text.splitlines(True)
+
+        self._partialLine = ''
+        if lines and not lines[-1].endswith(('\n', '\r')):
+            self._partialLine = lines.pop()
+
+        for line in lines:
+            self._processLine(line.rstrip('\r\n'))
+
+        if len(self._partialLine) > self.MAX_LINE_LENGTH:
+            self._processLine(self._partialLine)
+            self._partialLine = ''
+
+    def _finish(self) -> None:
+        if self.finished:
+            return
+
+        text = self._partialLine + self._decoder.decode(b'', final=True)
+        self._partialLine = ''
+        for line in text.splitlines():
+            self._processLine(line)
+
+        self.finished = True
+        self._emit(EVENT_FINISHED, line=None)
+
+    def _emit(self, kind: str, percent: Optional[int] = None,
+              line: Optional[str] = None) -> None:
+        if self._eventCallback:
+            self._eventCallback(PtyOutEvent(kind, percent, line))
+
+    def _processLine(self, line: str) -> None:
+        line = _ANSI_ESCAPE_RE.sub('', line).strip()
+        if not line:
+            return
+
+        self._recentLines.append(line)
+
+        progress = _PROGRESS_RE.match(line)
+        if progress:
+            percent = int(progress.group(1))
+            if percent != self.lastPercent:
+                self.lastPercent = percent
+                self._emit(EVENT_PROGRESS, percent=percent, line=progress.group(2))
+            return
+
+        if line.startswith("ERROR"):
+            self.errorCount += 1
+            self._emit(EVENT_ERROR, line=line)
+
+        self.startLogging = self.startLogging or line.startswith("Hash: ")
+        if not self.startLogging:
+            return
+
+        logger.debug(line)
+        self._emit(EVENT_SUMMARY_LINE, line=line)
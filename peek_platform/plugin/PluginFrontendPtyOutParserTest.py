@@ -0,0 +1,46 @@
+import unittest
+
+from peek_platform.plugin.PluginFrontendPtyOutParser import \
+    PluginFrontendPtyOutParser, EVENT_PROGRESS, EVENT_ERROR, EVENT_SUMMARY_LINE, \
+    EVENT_FINISHED
+
+
+class PluginFrontendPtyOutParserTest(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.parser = PluginFrontendPtyOutParser(maxLines=3,
+                                                 eventCallback=self.events.append)
+
+    def testStreamingLines(self):
+        output = ("10% building modules 1/2 modules\r"
+                  "10% building modules 2/2 modules\r"
+                  "92% chunk asset optimization\r\n"
+                  "Hash: 1234\n"
+                  "chunk {0} main.bundle.js (main) 4 kB ✔\n"
+                  "ERROR in plugin-noop.module.ts\n").encode()
+
+        # Split the output, including in the middle of the multi byte character
+        for i in range(0, len(output), 7):
+            self.parser.feed(output[i:i + 7])
+        self.parser.feed(b'')
+
+        self.assertEqual([(e.kind, e.percent) for e in self.events],
+                         [(EVENT_PROGRESS, 10), (EVENT_PROGRESS, 92),
+                          (EVENT_SUMMARY_LINE, None), (EVENT_SUMMARY_LINE, None),
+                          (EVENT_ERROR, None), (EVENT_SUMMARY_LINE, None),
+                          (EVENT_FINISHED, None)])
+
+        # Only the recent lines are kept
+        self.assertEqual(self.parser.recentLines,
+                         ["Hash: 1234",
+                          "chunk {0} main.bundle.js (main) 4 kB ✔",
+                          "ERROR in plugin-noop.module.ts"])
+        self.assertEqual(self.parser.errorCount, 1)
+
+    def testPartialLineAtEof(self):
+        self.parser.feed(b'Hash: 1\nno newline')
+        self.assertEqual(self.parser.recentLines, ['Hash: 1', 'no newline'])
+
+        self.parser.feed(b'')
+        self.assertEqual(self.parser.recentLines, ['Hash: 1', 'no newline'])
+        self.assertTrue(self.parser.finished)
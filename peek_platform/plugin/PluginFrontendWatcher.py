@@ -0,0 +1,171 @@
+import logging
+import os
+from typing import Callable
+
+from twisted.internet.defer import maybeDeferred
+from twisted.internet.task import LoopingCall
+
+logger = logging.getLogger(__name__)
+
+try:
+    from twisted.internet import inotify
+    from twisted.python.filepath import FilePath
+
+except ImportError:
+    # inotify is only available on linux, the watcher polls instead
+    inotify = None
+
+
+class PluginFrontendWatcher:
+    """ Plugin Frontend Watcher
+
+    This class watches the frontend source dir and the plugin frontend dirs, and
+    calls the build callable once a burst of changes has settled.
+
+    The build callable is called with the set of changed paths, if it returns a
+    Deferred, the changes that arrive while it runs are collected and it's called
+    again when it finishes. Builds never overlap.
+
+    inotify is used where it's available, otherwise the build callable is called
+    every pollSeconds, with no changed paths, and it has to check for changes
+    it's self.
+
+    """
+
+    IGNORE_DIR_NAMES = (".git", ".idea", "dist", "node_modules")
+
+    def __init__(self, buildCallable: Callable, debounceSeconds: float = 0.5,
+                 pollSeconds: float = 5.0, clock=None):
+        if clock is None:
+            from twisted.internet import reactor
+            clock = reactor
+
+        self._buildCallable = buildCallable
+        self._debounceSeconds = debounceSeconds
+        self._pollSeconds = pollSeconds
+        self._clock = clock
+
+        self._notifier = None
+        self._pollLoopingCall = None
+        self._watchedDirs = set()
+
+        self._changedPaths = set()
+        self._buildRequested = False
+        self._debounceCall = None
+        self._building = False
+        self._running = False
+
+    @property
+    def building(self) -> bool:
+        return self._building
+
+    def start(self, dirs: [str], useInotify: bool = True) -> None:
+        self._running = True
+
+        if inotify and useInotify:
+            self._notifier = inotify.INotify()
+            self._notifier.startReading()
+            self.setDirs(dirs)
+            return
+
+        logger.info("Polling the frontend for changes every %ss", self._pollSeconds)
+        self._pollLoopingCall = LoopingCall(self.notify)
+        self._pollLoopingCall.clock = self._clock
+        self._pollLoopingCall.start(self._pollSeconds, now=False)
+
+    def stop(self) -> None:
+        self._running = False
+
+        if self._debounceCall and self._debounceCall.active():
+            self._debounceCall.cancel()
+        self._debounceCall = None
+
+        if self._pollLoopingCall and self._pollLoopingCall.running:
+            self._pollLoopingCall.stop()
+        self._pollLoopingCall = None
+
+        if self._notifier:
+            self._notifier.stopReading()
+            self._notifier.loseConnection()
+            self._notifier = None
+
+        self._watchedDirs = set()
+
+    def setDirs(self, dirs: [str]) -> None:
+        """ Set Dirs
+
+        Watch these dirs, EG after the plugin dirs have been relinked.
+        """
+        dirs = set(os.path.realpath(d) for d in dirs if os.path.isdir(d))
+
+        if not self._notifier:
+            self._watchedDirs = dirs
+            return
+
+        mask = (inotify.IN_MODIFY | inotify.IN_CLOSE_WRITE | inotify.IN_CREATE
+                | inotify.IN_DELETE | inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO)
+
+        for path in self._watchedDirs - dirs:
+            self._notifier.ignore(FilePath(path))
+
+        for path in dirs - self._watchedDirs:
+            self._notifier.watch(FilePath(path), mask=mask, autoAdd=True,
+                                 recursive=True, callbacks=[self._inotifyEvent])
+
+        self._watchedDirs = dirs
+
+    def _inotifyEvent(self, ignored, filePath, mask) -> None:
+        path = os.fsdecode(filePath.path)
+        if set(path.split(os.sep)) & set(self.IGNORE_DIR_NAMES):
+            return
+
+        self.notify(path)
+
+    def notify(self, path: str = None) -> None:
+        """ Notify
+
+        Record a change, the build is called once there have been no changes for
+        debounceSeconds.
+
+        :param path: The path that changed, or None to just request a build
+        """
+        if not self._running:
+            return
+
+        self._buildRequested = True
+        if path:
+            self._changedPaths.add(path)
+
+        if self._debounceCall and self._debounceCall.active():
+            self._debounceCall.reset(self._debounceSeconds)
+            return
+
+        self._debounceCall = self._clock.callLater(self._debounceSeconds,
+                                                   self._build)
+
+    def _build(self) -> None:
+        self._debounceCall = None
+
+        # Changes that arrive during the build are built when it's finished
+        if self._building:
+            return
+
+        changedPaths = self._changedPaths
+        self._changedPaths = set()
+        self._buildRequested = False
+        self._building = True
+
+        d = maybeDeferred(self._buildCallable, changedPaths)
+        d.addErrback(self._buildFailed)
+        d.addBoth(self._buildFinished)
+
+    def _buildFailed(self, failure):
+        logger.error("The frontend watch build failed")
+        logger.error(failure.getTraceback())
+
+    def _buildFinished(self, _):
+        self._building = False
+
+        # A build was requested while this one ran, EG by the poll
+        if (self._buildRequested or self._changedPaths) and self._running:
+            self.notify()
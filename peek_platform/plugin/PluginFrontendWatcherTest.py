@@ -0,0 +1,72 @@
+import unittest
+
+from twisted.internet.defer import Deferred
+from twisted.internet.task import Clock
+
+from peek_platform.plugin.PluginFrontendWatcher import PluginFrontendWatcher
+
+
+class PluginFrontendWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.builds = []
+        self.watcher = PluginFrontendWatcher(self._build, debounceSeconds=0.5,
+                                             pollSeconds=60, clock=self.clock)
+        self.watcher.start([], useInotify=False)
+        self.addCleanup(self.watcher.stop)
+
+    def _build(self, changedPaths):
+        d = Deferred()
+        self.builds.append((changedPaths, d))
+        return d
+
+    def testDebounce(self):
+        self.watcher.notify('/src/a.ts')
+        self.clock.advance(0.4)
+        self.watcher.notify('/src/b.ts')
+        self.clock.advance(0.4)
+        self.assertEqual(self.builds, [])
+
+        self.clock.advance(0.1)
+        self.assertEqual([paths for paths, _ in self.builds],
+                         [{'/src/a.ts', '/src/b.ts'}])
+
+    def testChangesDuringBuild(self):
+        self.watcher.notify('/src/a.ts')
+        self.clock.advance(0.5)
+        self.assertTrue(self.watcher.building)
+
+        # This waits for the build that's running
+        self.watcher.notify('/src/b.ts')
+        self.clock.advance(5)
+        self.assertEqual(len(self.builds), 1)
+
+        self.builds[0][1].callback(None)
+        self.clock.advance(0.5)
+        self.assertEqual([paths for paths, _ in self.builds],
+                         [{'/src/a.ts'}, {'/src/b.ts'}])
+
+    def testBuildRequestedDuringBuild(self):
+        self.watcher.notify('/src/a.ts')
+        self.clock.advance(0.5)
+        self.assertTrue(self.watcher.building)
+
+        # A request with no path, EG the poll, is built when the build finishes
+        self.watcher.notify()
+        self.clock.advance(5)
+        self.assertEqual(len(self.builds), 1)
+
+        self.builds[0][1].callback(None)
+        self.clock.advance(0.5)
+        self.assertEqual([paths for paths, _ in self.builds],
+                         [{'/src/a.ts'}, set()])
+
+        # Nothing else was requested
+        self.builds[1][1].callback(None)
+        self.clock.advance(5)
+        self.assertEqual(len(self.builds), 2)
+
+    def testPolling(self):
+        self.clock.advance(60)
+        self.clock.advance(0.5)
+        self.assertEqual([paths for paths, _ in self.builds], [set()])
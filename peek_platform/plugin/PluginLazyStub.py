@@ -0,0 +1,60 @@
+import logging
+from copy import copy
+from typing import Callable
+
+from vortex.PayloadIO import PayloadIO
+
+logger = logging.getLogger(__name__)
+
+
+class PluginLazyStub:
+    """ Plugin Lazy Stub
+
+    This is a lightweight stand in for the endpoints of a plugin that hasn't been
+    started yet. It's added to PayloadIO like a PayloadEndpoint, when a payload
+    matches one of the plugins declared filters, the activate callable is called
+    with the payload, so the plugin can be loaded and the payload passed on to it.
+
+    Unlike a PayloadEndpoint the filters don't need a 'key', the default filter for
+    a plugin is just {'plugin': pluginName}.
+
+    There is one stub per plugin, so a payload that matches several of the filters
+    only activates the plugin once.
+
+    """
+
+    def __init__(self, pluginName: str, filts: [dict],
+                 activateCallable: Callable):
+        """
+        :param pluginName: The name of the plugin this stub stands in for
+        :param filts: The filters to match against payloads
+        :param activateCallable: Called with (pluginName, payload, **kwargs)
+        """
+        self.pluginName = pluginName
+        self._filts = [dict(filt) for filt in filts]
+        self._activateCallable = activateCallable
+        PayloadIO().add(self)
+
+    @property
+    def filts(self) -> [dict]:
+        return copy(self._filts)
+
+    def check(self, payload) -> bool:
+        items = set()
+        for key, value in list(payload.filt.items()):
+            # We don't compare complex structures
+            if isinstance(value, dict) or isinstance(value, list):
+                continue
+            items.add((key, value))
+
+        return any(set(filt.items()).issubset(items) for filt in self._filts)
+
+    def process(self, payload, **kwargs):
+        if self.check(payload):
+            return self._activateCallable(self.pluginName, payload, **kwargs)
+
+    def shutdown(self):
+        PayloadIO().remove(self)
+
+    def __repr__(self):
+        return "PluginLazyStub plugin=%s\nfilts=%s" % (self.pluginName, self._filts)
@@ -0,0 +1,43 @@
+import unittest
+
+from vortex.Payload import Payload
+from vortex.PayloadIO import PayloadIO
+
+from peek_platform.plugin.PluginLazyStub import PluginLazyStub
+
+
+class PluginLazyStubTest(unittest.TestCase):
+    def setUp(self):
+        self.activations = []
+
+    def _activate(self, pluginName, payload, **kwargs):
+        self.activations.append((pluginName, payload.filt, kwargs))
+
+    def testActivateOnMatchingPayload(self):
+        stub = PluginLazyStub('plugin_one', [{'plugin': 'plugin_one'}],
+                              self._activate)
+        self.addCleanup(stub.shutdown)
+        self.assertIn(stub, PayloadIO().endpoints)
+
+        stub.process(Payload(filt={'plugin': 'plugin_two', 'key': 'a'}),
+                     vortexUuid='uuid')
+        self.assertEqual(self.activations, [])
+
+        stub.process(Payload(filt={'plugin': 'plugin_one', 'key': 'a'}),
+                     vortexUuid='uuid')
+        self.assertEqual(self.activations,
+                         [('plugin_one', {'plugin': 'plugin_one', 'key': 'a'},
+                           {'vortexUuid': 'uuid'})])
+
+        stub.shutdown()
+        self.assertNotIn(stub, PayloadIO().endpoints)
+
+    def testAnyFilterMatches(self):
+        stub = PluginLazyStub('plugin_one',
+                              [{'plugin': 'plugin_one', 'key': 'a'},
+                               {'plugin': 'plugin_one', 'key': 'b'}],
+                              self._activate)
+        self.addCleanup(stub.shutdown)
+
+        self.assertTrue(stub.check(Payload(filt={'plugin': 'plugin_one', 'key': 'b'})))
+        self.assertFalse(stub.check(Payload(filt={'plugin': 'plugin_one', 'key': 'c'})))
@@ -0,0 +1,142 @@
+import gc
+import logging
+import types
+import weakref
+from collections import defaultdict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _attrName(namespace, obj) -> str:
+    for name, value in namespace.items():
+        if value is obj:
+            return "%s " % name
+    return ""
+
+
+def _describeReferrer(referrer, obj) -> str:
+    if isinstance(referrer, types.ModuleType):
+        return "module %s" % referrer.__name__
+
+    if isinstance(referrer, dict):
+        # Find what the dict is the __dict__ of
+        attrName = _attrName(referrer, obj)
+        for owner in gc.get_referrers(referrer):
+            if getattr(owner, '__dict__', None) is referrer:
+                if isinstance(owner, types.ModuleType):
+                    return "global %sin module %s" % (attrName, owner.__name__)
+                if isinstance(owner, type):
+                    return "attribute %sof class %s" % (attrName, owner.__qualname__)
+                return "attribute %sof %s instance" % (attrName, type(owner).__qualname__)
+        return "dict key %s" % attrName
+
+    if isinstance(referrer, (types.FunctionType, types.MethodType)):
+        return "%s %s" % (type(referrer).__name__, referrer.__qualname__)
+
+    if isinstance(referrer, (list, tuple, set)):
+        return "%s with %s items" % (type(referrer).__name__, len(referrer))
+
+    # Newer pythons keep instance attributes inline, rather than in a __dict__
+    namespace = getattr(referrer, '__dict__', None)
+    if isinstance(namespace, dict):
+        return "attribute %sof %s instance" % (_attrName(namespace, obj),
+                                               type(referrer).__qualname__)
+
+    return "%s instance" % type(referrer).__qualname__
+
+
+class PluginLeakDetector:
+    """ Plugin Leak Detector
+
+    This class holds weak references to the objects of unloaded plugins. If they're
+    still alive after a garbage collect, something still references the old plugin,
+    and it's memory will never be freed.
+
+    A garbage collect walks the whole heap, so unloading only watches the objects,
+    they are checked once after a batch of unloads, see checkAll and scheduleCheck.
+
+    """
+
+    # The seconds to wait after an unload before checking, so the unloads of a
+    # reload or swap are checked together
+    CHECK_DELAY_SECONDS = 5.0
+
+    def __init__(self, reactor=None):
+        self._refsByPluginName = defaultdict(list)
+        self._reactor = reactor
+        self._checkCall = None
+
+    def watch(self, pluginName: str, objs) -> None:
+        """ Watch
+
+        :param pluginName: The name of the plugin that was unloaded
+        :param objs: The objects that should be freed, EG the plugin and it's package
+        """
+        for obj in objs:
+            try:
+                self._refsByPluginName[pluginName].append(weakref.ref(obj))
+            except TypeError:
+                pass  # It doesn't support weak references
+
+    def check(self, pluginName: str) -> [str]:
+        """ Check
+
+        Collect the garbage and log what still refers to the plugins objects.
+
+        :return: The descriptions of the leaked objects and what refers to them
+        """
+        return self._check([pluginName])
+
+    def checkAll(self) -> [str]:
+        """ Check All
+
+        Check every watched plugin, with one garbage collect.
+
+        :return: The descriptions of the leaked objects and what refers to them
+        """
+        return self._check(list(self._refsByPluginName))
+
+    def scheduleCheck(self, delay: Optional[float] = None) -> None:
+        """ Schedule Check
+
+        Call checkAll once, after delay seconds. The checks scheduled before it runs
+        are combined into it.
+        """
+        if self._checkCall and self._checkCall.active():
+            return
+
+        if self._reactor is None:
+            from twisted.internet import reactor
+            self._reactor = reactor
+
+        self._checkCall = self._reactor.callLater(
+            self.CHECK_DELAY_SECONDS if delay is None else delay, self.checkAll)
+
+    def _check(self, pluginNames: [str]) -> [str]:
+        refsByPluginName = {name: self._refsByPluginName.pop(name)
+                            for name in pluginNames if name in self._refsByPluginName}
+        if not refsByPluginName:
+            return []
+
+        gc.collect()
+
+        leaks = []
+        for pluginName, refs in refsByPluginName.items():
+            for ref in refs:
+                obj = ref()
+                if obj is None:
+                    continue
+
+                referrers = [_describeReferrer(r, obj)
+                             for r in gc.get_referrers(obj)
+                             if not isinstance(r, types.FrameType)]
+                leak = ("%s is referenced by %s"
+                        % (type(obj).__qualname__, ', '.join(referrers) or 'nothing'))
+                del obj
+
+                logger.warning("Plugin %s is still in memory after unloading, %s",
+                               pluginName, leak)
+                leaks.append(leak)
+
+        return leaks
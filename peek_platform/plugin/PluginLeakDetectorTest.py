@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+from twisted.internet.task import Clock
+
+from peek_platform.plugin.PluginLeakDetector import PluginLeakDetector
+
+
+class _OldPlugin:
+    pass
+
+
+class _Holder:
+    pass
+
+
+class PluginLeakDetectorTest(unittest.TestCase):
+    def testNoLeak(self):
+        detector = PluginLeakDetector()
+        detector.watch('plugin_noop', [_OldPlugin()])
+
+        self.assertEqual(detector.check('plugin_noop'), [])
+
+    def testLeakIsReported(self):
+        detector = PluginLeakDetector()
+        holder = _Holder()
+        holder.plugin = _OldPlugin()
+
+        detector.watch('plugin_noop', [holder.plugin, None])
+        leaks = detector.check('plugin_noop')
+
+        self.assertEqual(len(leaks), 1)
+        self.assertIn('_OldPlugin', leaks[0])
+        self.assertIn('attribute plugin of _Holder instance', leaks[0])
+
+        # Each unload is only checked once
+        self.assertEqual(detector.check('plugin_noop'), [])
+
+    def testCheckAllCollectsOnce(self):
+        detector = PluginLeakDetector()
+        holder = _Holder()
+        holder.plugin = _OldPlugin()
+
+        detector.watch('plugin_noop', [_OldPlugin()])
+        detector.watch('plugin_other', [holder.plugin])
+
+        with mock.patch('gc.collect') as collect:
+            leaks = detector.checkAll()
+
+        self.assertEqual(collect.call_count, 1)
+        self.assertEqual(len(leaks), 1)
+        self.assertEqual(detector.checkAll(), [])
+
+    def testScheduleCheck(self):
+        clock = Clock()
+        detector = PluginLeakDetector(reactor=clock)
+        detector.watch('plugin_noop', [_OldPlugin()])
+
+        with mock.patch.object(detector, 'checkAll') as checkAll:
+            detector.scheduleCheck()
+            detector.scheduleCheck()
+            self.assertFalse(checkAll.called)
+
+            clock.advance(PluginLeakDetector.CHECK_DELAY_SECONDS)
+            self.assertEqual(checkAll.call_count, 1)
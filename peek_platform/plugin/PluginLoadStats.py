@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional
+
+from vortex.Payload import Payload
+from vortex.PayloadEndpoint import PayloadEndpoint
+
+from peek_platform.plugin.PluginLoadStatsTuple import PluginLoadStatsTuple
+
+logger = logging.getLogger(__name__)
+
+# The filter we listen on
+pluginLoadStatsFilt = {
+    'plugin': 'peek_platform',
+    'key': "peek_platform.plugin.loadStats"
+}  # LISTEN / SEND
+
+
+def processRssBytes() -> Optional[int]:
+    """ Process RSS Bytes
+
+    :return: The current resident memory of this process, None if it's not available
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _tracemallocBytes() -> Optional[int]:
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[0]
+
+
+class PluginLoadStatsRecorder:
+    """ Plugin Load Stats Recorder
+
+    This class records how long each phase of a plugin load takes, and how much
+    memory the plugin added.
+
+    The traced memory is only recorded if tracemalloc is tracing, start the service
+    with PYTHONTRACEMALLOC=1 to record it.
+
+    When the plugins are imported in parallel the process memory can't be split
+    between them, so recordMemory is False and only the times are recorded.
+
+    """
+
+    def __init__(self, pluginName: str, recordMemory: bool = True):
+        self.stats = PluginLoadStatsTuple(pluginName=pluginName, loaded=False)
+        self._rssBytesStart = processRssBytes() if recordMemory else None
+        self._tracemallocBytesStart = _tracemallocBytes() if recordMemory else None
+
+    @contextmanager
+    def phase(self, fieldName: str):
+        """ Phase
+
+        Time the code in the with block, and store it in the stats field.
+        """
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self.stats, fieldName, time.perf_counter() - startTime)
+
+    def finish(self, loaded: bool, error: Optional[Exception] = None) -> None:
+        self.stats.loaded = loaded
+        self.stats.error = str(error) if error else None
+
+        rssBytes = processRssBytes()
+        if rssBytes is not None and self._rssBytesStart is not None:
+            self.stats.rssBytes = rssBytes - self._rssBytesStart
+
+        tracemallocBytes = _tracemallocBytes()
+        if tracemallocBytes is not None and self._tracemallocBytesStart is not None:
+            self.stats.tracemallocBytes = tracemallocBytes - self._tracemallocBytesStart
+
+
+def dumpPluginLoadStats(filePath: str, statsTuples: [PluginLoadStatsTuple]) -> None:
+    """ Dump Plugin Load Stats
+
+    Write the stats to a json file, as a list of dicts, one per plugin.
+    """
+    data = [{name: getattr(stats, name) for name in stats.__fieldNames__}
+            for stats in statsTuples]
+
+    with open(filePath, 'w') as f:
+        json.dump(data, f, indent=4, sort_keys=True)
+
+
+class PluginLoadStatsHandler:
+    """ Plugin Load Stats Handler
+
+    Responds to requests for the plugin load stats with a PluginLoadStatsTuple for
+    each plugin.
+
+    """
+
+    def __init__(self, pluginLoader):
+        self._pluginLoader = pluginLoader
+        self._ep = None
+
+    def start(self):
+        self._ep = PayloadEndpoint(pluginLoadStatsFilt, self._process)
+
+    def shutdown(self):
+        if self._ep:
+            self._ep.shutdown()
+            self._ep = None
+
+    def _process(self, payload, vortexUuid=None, **kwargs):
+        from vortex.Vortex import vortexSendPayload
+
+        vortexSendPayload(Payload(filt=pluginLoadStatsFilt,
+                                  tuples=self._pluginLoader.pluginLoadStats),
+                          vortexUuid)
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from peek_platform.plugin import PluginLoadStats
+from peek_platform.plugin.PluginLoadStats import PluginLoadStatsRecorder, \
+    dumpPluginLoadStats
+
+
+class PluginLoadStatsTest(unittest.TestCase):
+    def testPhases(self):
+        recorder = PluginLoadStatsRecorder("plugin_noop")
+
+        with mock.patch.object(PluginLoadStats.time, 'perf_counter',
+                               side_effect=[10.0, 10.5, 20.0, 22.0]):
+            with recorder.phase('importSeconds'):
+                pass
+
+            # The phase is recorded when it raises as well
+            with self.assertRaises(ValueError):
+                with recorder.phase('loadSeconds'):
+                    raise ValueError("Load failed")
+
+        self.assertEqual(recorder.stats.importSeconds, 0.5)
+        self.assertEqual(recorder.stats.loadSeconds, 2.0)
+        self.assertIsNone(recorder.stats.sanityCheckSeconds)
+
+    def testFinish(self):
+        with mock.patch.object(PluginLoadStats, 'processRssBytes',
+                               side_effect=[1000, 5000]):
+            recorder = PluginLoadStatsRecorder("plugin_noop")
+            recorder.finish(loaded=True)
+
+        self.assertTrue(recorder.stats.loaded)
+        self.assertIsNone(recorder.stats.error)
+        self.assertEqual(recorder.stats.rssBytes, 4000)
+
+        recorder = PluginLoadStatsRecorder("plugin_noop")
+        recorder.finish(loaded=False, error=Exception("It broke"))
+
+        self.assertFalse(recorder.stats.loaded)
+        self.assertEqual(recorder.stats.error, "It broke")
+
+    def testFinishWithoutMemory(self):
+        with mock.patch.object(PluginLoadStats, 'processRssBytes',
+                               return_value=1000) as rssBytes:
+            recorder = PluginLoadStatsRecorder("plugin_noop", recordMemory=False)
+            recorder.finish(loaded=True)
+
+        self.assertIsNone(recorder.stats.rssBytes)
+        self.assertIsNone(recorder.stats.tracemallocBytes)
+        self.assertEqual(rssBytes.call_count, 1)
+
+    def testDumpPluginLoadStats(self):
+        recorder = PluginLoadStatsRecorder("plugin_noop", recordMemory=False)
+        with recorder.phase('importSeconds'):
+            pass
+        recorder.finish(loaded=True)
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filePath = os.path.join(tmpDir, 'stats.json')
+            dumpPluginLoadStats(filePath, [recorder.stats])
+
+            with open(filePath) as f:
+                data = json.load(f)
+
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["pluginName"], "plugin_noop")
+        self.assertTrue(data[0]["loaded"])
+        self.assertIsInstance(data[0]["importSeconds"], float)
+        self.assertIsNone(data[0]["rssBytes"])
+        self.assertEqual(set(data[0]), set(recorder.stats.__fieldNames__))
@@ -0,0 +1,22 @@
+from vortex.Tuple import addTupleType, Tuple, TupleField
+
+
+@addTupleType
+class PluginLoadStatsTuple(Tuple):
+    __tupleType__ = "peek_platform.PluginLoadStatsTuple"
+
+    pluginName = TupleField(comment="The name of the plugin, EG plugin_noop")
+    loaded = TupleField(comment="False if the load failed or wasn't required")
+    error = TupleField(comment="The exception, if the load failed")
+
+    findSpecSeconds = TupleField(comment="Seconds taken to find the plugin package")
+    importSeconds = TupleField(comment="Seconds taken to import the plugin package")
+    packageConfigSeconds = TupleField(comment="Seconds taken to read plugin_package.json")
+    loadSeconds = TupleField(comment="Seconds taken by _loadPluginThrows")
+    sanityCheckSeconds = TupleField(comment="Seconds taken by sanityCheckServerPlugin")
+
+    rssBytes = TupleField(comment="The resident memory added, None if unavailable"
+                                  " or the plugins were loaded in parallel")
+    tracemallocBytes = TupleField(comment="The traced memory added,"
+                                          " None if tracemalloc isn't tracing"
+                                          " or the plugins were loaded in parallel")
@@ -1,21 +1,38 @@
 import logging
 import os
 import sys
+import time
 from abc import ABCMeta, abstractmethod, abstractproperty
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
 from importlib.util import find_spec
-from typing import Type
+from typing import Type, Optional
+
+from twisted.internet.defer import Deferred, inlineCallbacks
 
-from jsoncfg.value_mappers import require_string, require_array
 from peek_plugin_base.PluginCommonEntryHookABC import PluginCommonEntryHookABC
-from peek_plugin_base.PluginPackageFileConfig import PluginPackageFileConfig
 from peek_platform import PeekPlatformConfig
+from peek_platform.plugin.PluginLoadStats import PluginLoadStatsRecorder, \
+    PluginLoadStatsHandler, dumpPluginLoadStats, processRssBytes
+from peek_platform.plugin.PluginLoadStatsTuple import PluginLoadStatsTuple
+from peek_platform.plugin.PluginEndpointDrain import PluginEndpointDrain
+from peek_platform.plugin.PluginLazyStub import PluginLazyStub
+from peek_platform.plugin.PluginLeakDetector import PluginLeakDetector
+from peek_platform.plugin.PluginManifestCache import PluginManifestCache, \
+    PluginManifest
+from peek_platform.plugin.PluginModuleIndex import PluginModuleIndex
+from peek_platform.plugin.PluginRegistrationCapture import PluginRegistrationCapture
 from vortex.PayloadIO import PayloadIO
-from vortex.Tuple import removeTuplesForTupleNames, registeredTupleNames, \
-    tupleForTupleName
+from vortex import Tuple as vortexTuple
+from vortex.Tuple import removeTuplesForTupleNames, tupleForTupleName
 
 logger = logging.getLogger(__name__)
 
+_PluginImport = namedtuple("_PluginImport",
+                           ["pluginName", "pluginRootDir", "pluginVersion",
+                            "requiresPlugins", "EntryHookClass", "importSeconds"])
+
 
 class PluginLoaderABC(metaclass=ABCMeta):
     _instance = None
@@ -31,6 +48,22 @@ class PluginLoaderABC(metaclass=ABCMeta):
         self._vortexEndpointInstancesByPluginName = defaultdict(list)
         self._vortexTupleNamesByPluginName = defaultdict(list)
 
+        self._loadStatsRecorderByPluginName = {}
+        self._loadStatsHandler = PluginLoadStatsHandler(self)
+        self._loadStatsHandler.start()
+
+        self._moduleIndex = PluginModuleIndex()
+        self._leakDetector = PluginLeakDetector()
+
+        self._manifestCache = PluginManifestCache(
+            PeekPlatformConfig.config.pluginManifestCachePath)
+
+        self._lazyStubsByPluginName = {}
+        self._lazyRequiresPluginsByPluginName = {}
+
+        # The tuple types registered for the lazy plugins before they're loaded
+        self._lazyTupleNamesByPluginName = {}
+
     @abstractproperty
     def _entryHookFuncName(self) -> str:
         """ Entry Hook Func Name.
@@ -55,65 +88,183 @@ class PluginLoaderABC(metaclass=ABCMeta):
 
         """
 
+    @property
+    def pluginLoadStats(self) -> [PluginLoadStatsTuple]:
+        """ Plugin Load Stats
+
+        :return: The timings and memory of the last load of each plugin
+        """
+        return [r.stats for r in self._loadStatsRecorderByPluginName.values()]
+
+    def dumpPluginLoadStats(self, filePath: str) -> None:
+        dumpPluginLoadStats(filePath, self.pluginLoadStats)
+
     def loadPlugin(self, pluginName):
         try:
+            self._loadPlugin(pluginName)
+
+        finally:
+            self._saveManifestCache()
+
+    def _loadPlugin(self, pluginName):
+        """ Load Plugin
+
+        The same as loadPlugin, without saving the manifest cache, so a batch of loads
+        saves it once.
+        """
+        loadStats = PluginLoadStatsRecorder(pluginName)
+        self._loadStatsRecorderByPluginName[pluginName] = loadStats
+
+        try:
+            self._removeLazyStub(pluginName)
             self.unloadPlugin(pluginName)
 
-            # Make note of the initial registrations for this plugin
-            endpointInstancesBefore = set(PayloadIO().endpoints)
-            tupleNamesBefore = set(registeredTupleNames())
+            # Record the modules and registrations made for this plugin
+            self._moduleIndex.track(pluginName)
+            with PluginRegistrationCapture(pluginName) as registrations:
+                pluginImport = self._importPlugin(pluginName, loadStats)
+                if not pluginImport:
+                    loadStats.finish(loaded=False)
+                    return
+
+                self._startPlugin(pluginImport, loadStats)
+
+            # The tuple modules imported for the lazy stub aren't imported again
+            tupleNames = (self._lazyTupleNamesByPluginName.pop(pluginName, [])
+                          + registrations.tupleNames)
+
+            self._vortexEndpointInstancesByPluginName[pluginName] = registrations.endpoints
+            self._vortexTupleNamesByPluginName[pluginName] = tupleNames
+            self._recordTupleModules(pluginName, tupleNames)
+
+            with loadStats.phase('sanityCheckSeconds'):
+                self.sanityCheckServerPlugin(pluginName)
+
+            loadStats.finish(loaded=True)
+
+        except Exception as e:
+            loadStats.finish(loaded=False, error=e)
+            logger.error("Failed to load plugin %s", pluginName)
+            logger.exception(e)
+
+    def _recordTupleModules(self, pluginName: str, tupleNames: [str]) -> None:
+        """ Record Tuple Modules
+
+        Record the modules that register the plugins tuple types in the manifest, the
+        lazy stub imports them so the tuples can be deserialised before the plugin
+        is loaded.
+        """
+        moduleNames = {tupleForTupleName(name).__module__ for name in tupleNames}
+        self._manifestCache.setTupleModuleNames(pluginName, sorted(moduleNames))
+
+    def _saveManifestCache(self) -> None:
+        try:
+            self._manifestCache.save()
+
+        except Exception as e:
+            logger.warning("Failed to save the plugin manifest cache, %s", e)
+
+    def _importPlugin(self, pluginName: str,
+                      loadStats: PluginLoadStatsRecorder) -> Optional[_PluginImport]:
+        """ Import Plugin
+
+        Import the plugin package and read it's package config, this is thread safe,
+        it doesn't start the plugin.
+
+        :return: The details required to start the plugin, or None if the plugin isn't
+            to be loaded for this service.
+        """
+        startTime = time.perf_counter()
+
+        # Skip plugins that don't require this service, without importing them
+        manifest = self._pluginManifest(pluginName)
+        if manifest and not self._requiresThisService(pluginName, manifest):
+            return None
 
+        with loadStats.phase('findSpecSeconds'):
             modSpec = find_spec(pluginName)
             if not modSpec:
                 raise Exception("Can not load Peek App package %s", pluginName)
 
+        with loadStats.phase('importSeconds'):
             PluginPackage = modSpec.loader.load_module()
             pluginRootDir = os.path.dirname(PluginPackage.__file__)
 
-            # Load up the plugin package info
-            pluginPackageJson = PluginPackageFileConfig(pluginRootDir)
-            pluginVersion = pluginPackageJson.config.plugin.version(require_string)
-            pluginRequiresService = pluginPackageJson.config.requiresServices(require_array)
+        # Load up the plugin package info
+        with loadStats.phase('packageConfigSeconds'):
+            if not manifest or manifest.pluginRootDir != pluginRootDir:
+                manifest = self._manifestCache.update(pluginName, pluginRootDir)
+
+        # Make sure the service is required
+        if not self._requiresThisService(pluginName, manifest):
+            return None
+
+        # Get the entry hook class from the package
+        entryHookGetter = getattr(PluginPackage, str(self._entryHookFuncName))
+        EntryHookClass = entryHookGetter() if entryHookGetter else None
+
+        if not EntryHookClass:
+            logger.warning(
+                "Skipping load for %s, %s.%s is missing or returned None",
+                pluginName, pluginName, self._entryHookFuncName)
+            return None
+
+        if not issubclass(EntryHookClass, self._entryHookClassType):
+            raise Exception("%s load error, Excpected %s, received %s"
+                            % (pluginName, self._entryHookClassType, EntryHookClass))
+
+        return _PluginImport(pluginName=pluginName,
+                             pluginRootDir=pluginRootDir,
+                             pluginVersion=manifest.pluginVersion,
+                             requiresPlugins=manifest.requiresPlugins,
+                             EntryHookClass=EntryHookClass,
+                             importSeconds=time.perf_counter() - startTime)
+
+    def _pluginManifest(self, pluginName: str) -> Optional[PluginManifest]:
+        """ Plugin Manifest
+
+        :return: The cached manifest, if it's for the version the config last
+            recorded for this plugin.
+        """
+        return self._manifestCache.get(
+            pluginName, PeekPlatformConfig.config.pluginVersion(pluginName))
 
-            # Make sure the service is required
-            # Storage and Server are loaded at the same time, hence the intersection
-            if not set(pluginRequiresService) & set(self._platformServiceNames):
-                logger.debug("%s does not require %s, Skipping load",
-                             pluginName, self._platformServiceNames)
-                return
+    def _requiresThisService(self, pluginName: str, manifest: PluginManifest) -> bool:
+        # Storage and Server are loaded at the same time, hence the intersection
+        if set(manifest.requiresServices) & set(self._platformServiceNames):
+            return True
 
-            # Get the entry hook class from the package
-            entryHookGetter = getattr(PluginPackage, str(self._entryHookFuncName))
-            EntryHookClass = entryHookGetter() if entryHookGetter else None
+        logger.debug("%s does not require %s, Skipping load",
+                     pluginName, self._platformServiceNames)
+        return False
 
-            if not EntryHookClass:
-                logger.warning(
-                    "Skipping load for %s, %s.%s is missing or returned None",
-                    pluginName, pluginName, self._entryHookFuncName)
-                return
+    def invalidatePluginManifest(self, pluginName: str) -> None:
+        """ Invalidate Plugin Manifest
 
-            if not issubclass(EntryHookClass, self._entryHookClassType):
-                raise Exception("%s load error, Excpected %s, received %s"
-                                % (pluginName, self._entryHookClassType, EntryHookClass))
+        Called when a new version of the plugin is installed.
+        """
+        self._manifestCache.invalidate(pluginName)
 
-            ### Perform the loading of the plugin
-            self._loadPluginThrows(pluginName, EntryHookClass, pluginRootDir)
+    def _startPlugin(self, pluginImport: _PluginImport,
+                     loadStats: PluginLoadStatsRecorder) -> float:
+        """ Start Plugin
 
-            # Make sure the version we have recorded is correct
-            PeekPlatformConfig.config.setPluginVersion(pluginName, pluginVersion)
+        Perform the load of the plugin, this must be called from the main thread.
 
-            # Make note of the final registrations for this plugin
-            self._vortexEndpointInstancesByPluginName[pluginName] = list(
-                set(PayloadIO().endpoints) - endpointInstancesBefore)
+        :return: The seconds it took
+        """
+        startTime = time.perf_counter()
 
-            self._vortexTupleNamesByPluginName[pluginName] = list(
-                set(registeredTupleNames()) - tupleNamesBefore)
+        ### Perform the loading of the plugin
+        with loadStats.phase('loadSeconds'):
+            self._loadPluginThrows(pluginImport.pluginName, pluginImport.EntryHookClass,
+                                   pluginImport.pluginRootDir)
 
-            self.sanityCheckServerPlugin(pluginName)
+        # Make sure the version we have recorded is correct
+        PeekPlatformConfig.config.setPluginVersion(pluginImport.pluginName,
+                                                   pluginImport.pluginVersion)
 
-        except Exception as e:
-            logger.error("Failed to load plugin %s", pluginName)
-            logger.exception(e)
+        return time.perf_counter() - startTime
 
     @abstractmethod
     def _loadPluginThrows(self, pluginName: str, EntryHookClass: Type[PluginCommonEntryHookABC],
@@ -145,31 +296,373 @@ class PluginLoaderABC(metaclass=ABCMeta):
         removeTuplesForTupleNames(self._vortexTupleNamesByPluginName[pluginName])
         del self._vortexTupleNamesByPluginName[pluginName]
 
+        # The old plugin is checked for leaks after the batch of unloads, a check
+        # walks the whole heap, see PluginLeakDetector
         self._unloadPluginPackage(pluginName, oldLoadedPlugin)
 
     def listPlugins(self):
-        def pluginTest(name):
-            if not name.startswith("plugin_"):
-                return False
-            return os.path.isdir(os.path.join(self._pluginPath, name))
-
-        plugins = os.listdir(self._pluginPath)
-        plugins = list(filter(pluginTest, plugins))
+        plugins = self._manifestCache.listSubDirs(self._pluginPath)
+        plugins = [name for name in plugins if name.startswith("plugin_")]
+        self._saveManifestCache()
         return plugins
 
     def loadAllPlugins(self):
-        for pluginName in PeekPlatformConfig.config.pluginsEnabled:
+        pluginNames = PeekPlatformConfig.config.pluginsEnabled
+        loadThreads = PeekPlatformConfig.config.pluginLoadThreads
+
+        # Plugins can import each other, track the modules of them all from the start
+        for pluginName in pluginNames:
+            self._moduleIndex.track(pluginName)
+
+        if PeekPlatformConfig.config.pluginLazyLoad:
+            for pluginName in pluginNames:
+                self._addLazyStub(pluginName)
+            self._saveManifestCache()
+            return
+
+        if loadThreads > 1:
+            self._loadAllPluginsParallel(pluginNames, loadThreads)
+            return
+
+        for pluginName in pluginNames:
+            self._loadPlugin(pluginName)
+
+        self._saveManifestCache()
+
+    def _addLazyStub(self, pluginName: str) -> None:
+        """ Add Lazy Stub
+
+        Register a stub endpoint for the plugin from the filters declared in it's
+        package config, without importing the plugin.
+
+        The filters are declared with "lazyLoadFilters", they default to
+        [{"plugin": pluginName}]. Plugins can opt out with "lazyLoad": false,
+        they are loaded now.
+
+        The plugins tuple types are registered now, so the first payload for the
+        plugin can be deserialised. The modules that register them are recorded in
+        the manifest when the plugin loads, until then the plugin is loaded now.
+
+        """
+        try:
+            manifest = self._pluginManifest(pluginName)
+            if not manifest:
+                modSpec = find_spec(pluginName)
+                if not modSpec:
+                    raise Exception("Can not load Peek App package %s", pluginName)
+
+                # find_spec doesn't import top level packages
+                if modSpec.submodule_search_locations:
+                    pluginRootDir = list(modSpec.submodule_search_locations)[0]
+                else:
+                    pluginRootDir = os.path.dirname(modSpec.origin)
+
+                manifest = self._manifestCache.update(pluginName, pluginRootDir)
+
+            lazyLoad = manifest.packageConfig.get('lazyLoad', True)
+            lazyLoadFilters = manifest.packageConfig.get('lazyLoadFilters',
+                                                         [{'plugin': pluginName}])
+
+        except Exception as e:
+            logger.error("Failed to read plugin %s for lazy loading", pluginName)
+            logger.exception(e)
+            return
+
+        if not self._requiresThisService(pluginName, manifest):
+            return
+
+        if not lazyLoad:
+            self._loadPlugin(pluginName)
+            return
+
+        if manifest.tupleModuleNames is None:
+            logger.debug("Plugin %s hasn't recorded it's tuples, loading it now",
+                         pluginName)
+            self._loadPlugin(pluginName)
+            return
+
+        try:
+            self._registerLazyTuples(pluginName, manifest.tupleModuleNames)
+
+        except Exception as e:
+            logger.error("Failed to register the tuples for plugin %s,"
+                         " loading it now", pluginName)
+            logger.exception(e)
+            self._loadPlugin(pluginName)
+            return
+
+        self._removeLazyStub(pluginName)
+        self._lazyRequiresPluginsByPluginName[pluginName] = manifest.requiresPlugins
+        self._lazyStubsByPluginName[pluginName] = PluginLazyStub(
+            pluginName, lazyLoadFilters, self._activateLazyPlugin)
+
+        logger.debug("Plugin %s will load on it's first payload", pluginName)
+
+    def _registerLazyTuples(self, pluginName: str, tupleModuleNames: [str]) -> None:
+        """ Register Lazy Tuples
+
+        Import the plugins tuple modules, without importing the rest of the plugin.
+        The modules stay imported when the plugin loads, so the tuple names are
+        merged into the plugins registrations then.
+
+        """
+        with PluginRegistrationCapture(pluginName) as registrations:
+            for moduleName in tupleModuleNames:
+                import_module(moduleName)
+
+        self._lazyTupleNamesByPluginName[pluginName] = \
+            self._lazyTupleNamesByPluginName.get(pluginName, []) \
+            + registrations.tupleNames
+
+    def _removeLazyStub(self, pluginName: str) -> None:
+        stub = self._lazyStubsByPluginName.pop(pluginName, None)
+        self._lazyRequiresPluginsByPluginName.pop(pluginName, None)
+        if stub:
+            stub.shutdown()
+
+    def _activateLazyPlugin(self, pluginName: str, payload=None, **kwargs) -> None:
+        """ Activate Lazy Plugin
+
+        Load the plugin, and the lazy plugins it requires, then pass the payload that
+        activated it to the plugins endpoints.
+
+        PayloadIO had already chosen the endpoints for the payload before the plugin
+        was loaded, so the payload has to be passed on here.
+
+        Payloads that were already queued for the stub still arrive here after the
+        plugin is loaded, they are passed straight on.
+
+        """
+        if pluginName in self._lazyStubsByPluginName:
+            requiresPlugins = self._lazyRequiresPluginsByPluginName[pluginName]
+            self._removeLazyStub(pluginName)
+
+            for requiredName in requiresPlugins:
+                if requiredName in self._lazyStubsByPluginName:
+                    self._activateLazyPlugin(requiredName)
+
+            logger.info("Lazy loading plugin %s", pluginName)
             self.loadPlugin(pluginName)
 
+        if payload is None:
+            return
+
+        for endpoint in self._vortexEndpointInstancesByPluginName.get(pluginName, []):
+            try:
+                endpoint.process(payload, **kwargs)
+
+            except Exception as e:
+                logger.error("Plugin %s failed to process it's first payload",
+                             pluginName)
+                logger.exception(e)
+
+    @property
+    def lazyPluginNames(self) -> [str]:
+        """ Lazy Plugin Names
+
+        :return: The names of the plugins that are waiting for their first payload
+        """
+        return list(self._lazyStubsByPluginName)
+
+    def warmUpPlugin(self, pluginName: str) -> None:
+        """ Warm Up Plugin
+
+        Load a lazy plugin now, rather than on it's first payload.
+        """
+        if pluginName in self._lazyStubsByPluginName:
+            self._activateLazyPlugin(pluginName)
+
+    def warmUpAllPlugins(self) -> None:
+        for pluginName in self.lazyPluginNames:
+            self.warmUpPlugin(pluginName)
+
+    def _loadAllPluginsParallel(self, pluginNames: [str], loadThreads: int) -> None:
+        """ Load All Plugins in Parallel
+
+        The plugin packages are imported concurrently in a thread pool, then started
+        one at a time on this thread, in the order of their "requiresPlugins"
+        dependencies.
+
+        The registrations are captured per thread, so the ones made while the
+        plugins import concurrently are still recorded against the right plugin.
+
+        """
+        startTime = time.perf_counter()
+        rssBytesStart = processRssBytes()
+
+        for pluginName in pluginNames:
+            self.unloadPlugin(pluginName)
+
+        registrationsByName = {}
+        for pluginName in pluginNames:
+            self._moduleIndex.track(pluginName)
+            registrationsByName[pluginName] = PluginRegistrationCapture(pluginName)
+
+        # The recorders are created as each import starts, so the time waiting for a
+        # worker isn't counted. The plugins share the memory, it's logged for the batch
+        recordersByName = {}
+
+        def importCaptured(pluginName):
+            loadStats = PluginLoadStatsRecorder(pluginName, recordMemory=False)
+            recordersByName[pluginName] = loadStats
+            with registrationsByName[pluginName]:
+                return self._importPlugin(pluginName, loadStats)
+
+        pluginImportsByName = {}
+        with ThreadPoolExecutor(max_workers=loadThreads) as executor:
+            futuresByName = [(pluginName, executor.submit(importCaptured, pluginName))
+                             for pluginName in pluginNames]
+
+            for pluginName, future in futuresByName:
+                # Wait for the import, the recorder is created as it starts
+                future.exception()
+
+                loadStats = recordersByName[pluginName]
+                self._loadStatsRecorderByPluginName[pluginName] = loadStats
+                try:
+                    pluginImport = future.result()
+                    if pluginImport:
+                        pluginImportsByName[pluginName] = pluginImport
+                    else:
+                        loadStats.finish(loaded=False)
+
+                except Exception as e:
+                    loadStats.finish(loaded=False, error=e)
+                    logger.error("Failed to load plugin %s", pluginName)
+                    logger.exception(e)
+
+        startSecondsByName = {}
+
+        for pluginName in self._dependencyOrder(pluginImportsByName):
+            loadStats = self._loadStatsRecorderByPluginName[pluginName]
+            registrations = registrationsByName[pluginName]
+            try:
+                with registrations:
+                    startSecondsByName[pluginName] = self._startPlugin(
+                        pluginImportsByName[pluginName], loadStats)
+
+                self._vortexEndpointInstancesByPluginName[pluginName] = \
+                    registrations.endpoints
+                self._vortexTupleNamesByPluginName[pluginName] = \
+                    registrations.tupleNames
+                self._recordTupleModules(pluginName, registrations.tupleNames)
+
+                with loadStats.phase('sanityCheckSeconds'):
+                    self.sanityCheckServerPlugin(pluginName)
+
+                loadStats.finish(loaded=True)
+
+            except Exception as e:
+                loadStats.finish(loaded=False, error=e)
+                logger.error("Failed to load plugin %s", pluginName)
+                logger.exception(e)
+
+        self._saveManifestCache()
+
+        criticalPath, criticalSeconds = self._criticalPath(pluginImportsByName,
+                                                           startSecondsByName)
+        logger.info("Loaded %s plugins in %.2fs, critical path %.2fs : %s",
+                    len(startSecondsByName), time.perf_counter() - startTime,
+                    criticalSeconds, ' -> '.join(criticalPath))
+
+        rssBytes = processRssBytes()
+        if rssBytes is not None and rssBytesStart is not None:
+            logger.info("The plugins added %.1fMB of resident memory",
+                        (rssBytes - rssBytesStart) / (1024 * 1024))
+
+    def _dependencyOrder(self, pluginImportsByName: {str: _PluginImport}) -> [str]:
+        """ Dependency Order
+
+        :return: The plugin names, ordered so that plugins start after the plugins
+            they require. Otherwise the order of pluginsEnabled is kept.
+        """
+        ordered = []
+        visiting = set()
+
+        def visit(pluginName):
+            if pluginName in ordered:
+                return
+
+            if pluginName in visiting:
+                logger.warning("Plugin %s has a circular dependency", pluginName)
+                return
+
+            visiting.add(pluginName)
+            for requiredName in pluginImportsByName[pluginName].requiresPlugins:
+                if requiredName in pluginImportsByName:
+                    visit(requiredName)
+                else:
+                    logger.warning("Plugin %s requires plugin %s, it's not loaded",
+                                   pluginName, requiredName)
+
+            visiting.remove(pluginName)
+            ordered.append(pluginName)
+
+        for pluginName in pluginImportsByName:
+            visit(pluginName)
+
+        return ordered
+
+    def _criticalPath(self, pluginImportsByName: {str: _PluginImport},
+                      startSecondsByName: {str: float}) -> ([str], float):
+        """ Critical Path
+
+        :return: The chain of required plugins that took the longest to import and
+            start, and the seconds it took.
+        """
+        pathByName = {}
+
+        def path(pluginName, visiting=()):
+            if pluginName in pathByName:
+                return pathByName[pluginName]
+
+            pluginImport = pluginImportsByName[pluginName]
+            seconds = (pluginImport.importSeconds
+                       + startSecondsByName.get(pluginName, 0.0))
+
+            requiredPaths = [path(name, visiting + (pluginName,))
+                             for name in pluginImport.requiresPlugins
+                             if name in pluginImportsByName and name not in visiting]
+            requiredPath = max(requiredPaths, key=lambda p: p[1], default=([], 0.0))
+
+            pathByName[pluginName] = (requiredPath[0] + [pluginName],
+                                      requiredPath[1] + seconds)
+            return pathByName[pluginName]
+
+        paths = [path(name) for name in pluginImportsByName]
+        return max(paths, key=lambda p: p[1], default=([], 0.0))
+
     def unloadAllPlugins(self):
+        for pluginName in self.lazyPluginNames:
+            self._removeLazyStub(pluginName)
+
+        # Remove the tuples of the lazy plugins that were never loaded
+        for pluginName in list(self._lazyTupleNamesByPluginName):
+            removeTuplesForTupleNames(self._lazyTupleNamesByPluginName.pop(pluginName))
+            for modName in self._moduleIndex.popModuleNames(pluginName):
+                sys.modules.pop(modName, None)
+
         while self._loadedPlugins:
             self.unloadPlugin(list(self._loadedPlugins.keys())[0])
 
+        # Check that nothing else still holds on to the old plugins
+        self._leakDetector.checkAll()
+
     def _unloadPluginPackage(self, pluginName, oldLoadedPlugin):
 
         # Stop and remove the Plugin
         del self._loadedPlugins[pluginName]
+        self._stopPlugin(pluginName, oldLoadedPlugin)
+
+        # Unload the packages
+        pluginPackage = sys.modules.get(pluginName)
+
+        for modName in self._moduleIndex.popModuleNames(pluginName):
+            sys.modules.pop(modName, None)
 
+        self._leakDetector.watch(pluginName, [oldLoadedPlugin, pluginPackage])
+
+    def _stopPlugin(self, pluginName, oldLoadedPlugin):
         try:
             oldLoadedPlugin.stop()
             oldLoadedPlugin.unload()
@@ -179,38 +672,29 @@ class PluginLoaderABC(metaclass=ABCMeta):
                          " unloading continues" % pluginName)
             logger.exception(e)
 
-        # Unload the packages
-        loadedSubmodules = [modName
-                            for modName in list(sys.modules.keys())
-                            if modName.startswith('%s.' % pluginName)]
-
-        for modName in loadedSubmodules:
-            del sys.modules[modName]
-
-        if pluginName in sys.modules:
-            del sys.modules[pluginName]
-
-        # pypy doesn't have getrefcount
-        if hasattr(sys, "getrefcount") and sys.getrefcount(oldLoadedPlugin) > 2:
-            logger.warning("Old references to %s still exist, count = %s",
-                           pluginName, sys.getrefcount(oldLoadedPlugin))
-
-    def sanityCheckServerPlugin(self, pluginName):
+    def sanityCheckServerPlugin(self, pluginName, endpoints=None, tupleNames=None):
         ''' Sanity Check Plugin
 
         This method ensures that all the things registed for this plugin are
         prefixed by it's pluginName, EG plugin_noop
+
+        The endpoints and tupleNames default to the ones registered for the plugin.
         '''
+        if endpoints is None:
+            endpoints = self._vortexEndpointInstancesByPluginName[pluginName]
+
+        if tupleNames is None:
+            tupleNames = self._vortexTupleNamesByPluginName[pluginName]
 
         # All endpoint filters must have the 'plugin' : 'plugin_name' in them
-        for endpoint in self._vortexEndpointInstancesByPluginName[pluginName]:
+        for endpoint in endpoints:
             filt = endpoint.filt
             if 'plugin' not in filt and filt['plugin'] != pluginName:
                 raise Exception("Payload endpoint does not contan 'plugin':'%s'\n%s"
                                 % (pluginName, filt))
 
         # all tuple names must start with their pluginName
-        for tupleName in self._vortexTupleNamesByPluginName[pluginName]:
+        for tupleName in tupleNames:
             TupleCls = tupleForTupleName(tupleName)
             if not tupleName.startswith(pluginName):
                 raise Exception("Tuple name does not start with '%s', %s (%s)"
@@ -218,4 +702,131 @@ class PluginLoaderABC(metaclass=ABCMeta):
 
     def notifyOfPluginVersionUpdate(self, pluginName, pluginVersion):
         logger.info("Received PLUGIN update for %s version %s", pluginName, pluginVersion)
-        return self.loadPlugin(pluginName)
+        if PeekPlatformConfig.config.pluginHotSwap:
+            return self.swapPlugin(pluginName)
+
+        self.loadPlugin(pluginName)
+
+        # Check that nothing else still holds on to the old version
+        self._leakDetector.scheduleCheck()
+
+    @inlineCallbacks
+    def swapPlugin(self, pluginName: str) -> Deferred:
+        """ Swap Plugin
+
+        Load the new version of a plugin alongside the old version, then swap them.
+
+        1) The old versions modules are moved out of sys.modules, so the new version
+            is imported fresh. The old version keeps running on it's modules.
+
+        2) The new version is imported and started, it's endpoints are held back
+            from PayloadIO, it's tuple types replace the old versions.
+
+        3) The old endpoints are swapped for the new ones in one step on the reactor
+            thread, so every payload goes to one version or the other.
+
+        4) The old version finishes the payloads it has in flight, then it's
+            stopped, unloaded and checked for leaks.
+
+        If the new version fails to load, the old version is put back as it was.
+
+        :return: A Deferred that fires when the old version is unloaded
+        """
+        oldLoadedPlugin = self._loadedPlugins.get(pluginName)
+        if not oldLoadedPlugin:
+            self.loadPlugin(pluginName)
+            return
+
+        oldEndpoints = self._vortexEndpointInstancesByPluginName[pluginName]
+        oldTupleNames = self._vortexTupleNamesByPluginName[pluginName]
+        oldTuplesByName = {name: tupleForTupleName(name) for name in oldTupleNames}
+
+        oldModuleNames = self._moduleIndex.popModuleNames(pluginName)
+        oldModules = {name: sys.modules.pop(name)
+                      for name in oldModuleNames if name in sys.modules}
+
+        loadStats = PluginLoadStatsRecorder(pluginName)
+        self._loadStatsRecorderByPluginName[pluginName] = loadStats
+
+        registrations = PluginRegistrationCapture(pluginName, deferEndpoints=True,
+                                                  replaceTupleNames=oldTupleNames)
+
+        try:
+            del self._loadedPlugins[pluginName]
+            self._moduleIndex.track(pluginName)
+
+            with registrations:
+                pluginImport = self._importPlugin(pluginName, loadStats)
+                if pluginImport:
+                    self._startPlugin(pluginImport, loadStats)
+
+            with loadStats.phase('sanityCheckSeconds'):
+                self.sanityCheckServerPlugin(pluginName,
+                                             endpoints=registrations.endpoints,
+                                             tupleNames=registrations.tupleNames)
+
+        except Exception as e:
+            loadStats.finish(loaded=False, error=e)
+            logger.error("Failed to swap plugin %s, the old version is kept",
+                         pluginName)
+            logger.exception(e)
+
+            self._swapRollback(pluginName, oldLoadedPlugin, oldModules,
+                               oldTuplesByName, registrations)
+            return
+
+        finally:
+            self._saveManifestCache()
+
+        # Cut over, nothing else runs on the reactor thread between these
+        for endpoint in oldEndpoints:
+            PayloadIO().remove(endpoint)
+
+        for endpoint in registrations.endpoints:
+            PayloadIO().add(endpoint)
+
+        self._vortexEndpointInstancesByPluginName[pluginName] = registrations.endpoints
+        self._vortexTupleNamesByPluginName[pluginName] = registrations.tupleNames
+        self._recordTupleModules(pluginName, registrations.tupleNames)
+        removeTuplesForTupleNames(set(oldTupleNames) - set(registrations.tupleNames))
+
+        loadStats.finish(loaded=bool(pluginImport))
+        logger.info("Swapped plugin %s, draining the old version", pluginName)
+
+        # Let the old version finish what it's doing
+        yield PluginEndpointDrain(pluginName, oldEndpoints,
+                                  PeekPlatformConfig.config.pluginSwapDrainSeconds
+                                  ).start()
+
+        self._stopPlugin(pluginName, oldLoadedPlugin)
+        self._leakDetector.watch(pluginName,
+                                 [oldLoadedPlugin, oldModules.get(pluginName)])
+
+        # Check that nothing else still holds on to the old version
+        self._leakDetector.scheduleCheck()
+
+    def _swapRollback(self, pluginName, oldLoadedPlugin, oldModules,
+                      oldTuplesByName, registrations) -> None:
+        """ Swap Rollback
+
+        Put the old version of the plugin back, after the new version failed
+        """
+        newLoadedPlugin = self._loadedPlugins.get(pluginName)
+        if newLoadedPlugin and newLoadedPlugin is not oldLoadedPlugin:
+            self._stopPlugin(pluginName, newLoadedPlugin)
+
+        for endpoint in registrations.endpoints:
+            PayloadIO().remove(endpoint)
+
+        # Put back the old tuple types that the new version replaced
+        removeTuplesForTupleNames(registrations.tupleNames)
+        for TupleCls in oldTuplesByName.values():
+            if TupleCls.tupleName() not in vortexTuple.TUPLE_TYPES_BY_NAME:
+                vortexTuple.addTupleType(TupleCls)
+
+        for modName in self._moduleIndex.popModuleNames(pluginName):
+            sys.modules.pop(modName, None)
+
+        sys.modules.update(oldModules)
+        self._moduleIndex.setModuleNames(pluginName, set(oldModules))
+        self._loadedPlugins[pluginName] = oldLoadedPlugin
@@ -0,0 +1,376 @@
+import functools
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+from twisted.internet.task import Clock
+from vortex.Payload import Payload
+from vortex.PayloadIO import PayloadIO
+from vortex.Tuple import tupleForTupleName, TUPLE_TYPES_BY_NAME
+
+from peek_platform import PeekPlatformConfig
+from peek_platform.plugin import PluginLoaderABC as loaderModule
+from peek_platform.plugin.PluginEndpointDrain import PluginEndpointDrain
+from peek_platform.plugin.PluginLeakDetector import PluginLeakDetector
+from peek_platform.plugin.PluginLoaderABC import PluginLoaderABC
+
+_ENTRY_HOOK_SRC = '''
+import ltest_events
+from vortex.PayloadEndpoint import PayloadEndpoint
+
+VERSION = %(version)r
+
+
+class EntryHook:
+    def __init__(self, pluginName, pluginRootDir):
+        self.pluginName = pluginName
+        self._endpoint = None
+
+    def load(self):
+        %(loadSrc)s
+
+    def start(self):
+        if %(failOnStart)r:
+            raise Exception("%%s failed to start" %% self.pluginName)
+
+        ltest_events.events.append(('start', self.pluginName, VERSION))
+        self._endpoint = PayloadEndpoint({'plugin': self.pluginName, 'key': 'test'},
+                                         self._process)
+
+    def _process(self, payload, **kwargs):
+        ltest_events.events.append(('payload', self.pluginName, payload, VERSION))
+
+    def stop(self):
+        ltest_events.events.append(('stop', self.pluginName, VERSION))
+        if self._endpoint:
+            self._endpoint.shutdown()
+
+    def unload(self):
+        pass
+'''
+
+_TUPLE_SRC = '''
+from vortex.Tuple import addTupleType, Tuple, TupleField
+
+
+@addTupleType
+class %(className)s(Tuple):
+    __tupleType__ = "%(pluginName)s.%(className)s"
+
+    value = TupleField()
+'''
+
+
+class _Config:
+    """ The config the loader reads """
+
+    def __init__(self, homeDir):
+        self.pluginManifestCachePath = os.path.join(homeDir, 'manifest.json')
+        self.pluginsEnabled = []
+        self.pluginLoadThreads = 1
+        self.pluginLazyLoad = False
+        self.pluginHotSwap = False
+        self.pluginSwapDrainSeconds = 5.0
+        self.versions = {}
+
+    def pluginVersion(self, pluginName):
+        return self.versions.get(pluginName)
+
+    def setPluginVersion(self, pluginName, version):
+        self.versions[pluginName] = version
+
+
+class _TestLoader(PluginLoaderABC):
+    _entryHookFuncName = "peekTestEntryHook"
+    _entryHookClassType = object
+    _platformServiceNames = ["server"]
+
+    def _loadPluginThrows(self, pluginName, EntryHookClass, pluginRootDir):
+        plugin = EntryHookClass(pluginName, pluginRootDir)
+        plugin.load()
+        plugin.start()
+        self._loadedPlugins[pluginName] = plugin
+
+
+class PluginLoaderABCTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._dir)
+
+        self.pluginsDir = os.path.join(self._dir, 'plugins')
+        os.mkdir(self.pluginsDir)
+        with open(os.path.join(self.pluginsDir, 'ltest_events.py'), 'w') as f:
+            f.write("events = []\n")
+
+        sys.path.insert(0, self.pluginsDir)
+        self.addCleanup(sys.path.remove, self.pluginsDir)
+
+        oldConfig = PeekPlatformConfig.config
+        self.addCleanup(setattr, PeekPlatformConfig, 'config', oldConfig)
+        self.config = PeekPlatformConfig.config = _Config(self._dir)
+
+        # Cleanups run in reverse, the plugins are unloaded before the modules go
+        self.addCleanup(self._cleanUpModules)
+        self.loader = self._newLoader()
+
+        import ltest_events
+        self.events = ltest_events.events
+
+    def _newLoader(self) -> _TestLoader:
+        _TestLoader._instance = None
+        loader = _TestLoader()
+        self.addCleanup(loader._loadStatsHandler.shutdown)
+        self.addCleanup(loader.unloadAllPlugins)
+        return loader
+
+    def _cleanUpModules(self):
+        for modName in list(sys.modules):
+            if modName.startswith('plugin_ltest') or modName == 'ltest_events':
+                del sys.modules[modName]
+
+    def _writePlugin(self, pluginName, requiresPlugins=(), failOnStart=False,
+                     failOnImport=False, tupleClassName=None, version=1):
+        rootDir = os.path.join(self.pluginsDir, pluginName)
+
+        # A new version replaces the old one, and it's byte code
+        if os.path.isdir(rootDir):
+            shutil.rmtree(rootDir)
+            importlib.invalidate_caches()
+        os.mkdir(rootDir)
+
+        packageConfig = {"plugin": {"version": "%s.0.0" % version},
+                         "requiresServices": ["server"],
+                         "requiresPlugins": list(requiresPlugins)}
+        with open(os.path.join(rootDir, 'plugin_package.json'), 'w') as f:
+            json.dump(packageConfig, f)
+
+        with open(os.path.join(rootDir, '__init__.py'), 'w') as f:
+            if failOnImport:
+                f.write("raise ImportError('%s failed to import')\n" % pluginName)
+            f.write("def peekTestEntryHook():\n"
+                    "    from ._EntryHook import EntryHook\n"
+                    "    return EntryHook\n")
+
+        loadSrc = 'pass'
+        if tupleClassName:
+            os.mkdir(os.path.join(rootDir, 'tuples'))
+            open(os.path.join(rootDir, 'tuples', '__init__.py'), 'w').close()
+            with open(os.path.join(rootDir, 'tuples', tupleClassName + '.py'), 'w') as f:
+                f.write(textwrap.dedent(_TUPLE_SRC % {"className": tupleClassName,
+                                                      "pluginName": pluginName}))
+            loadSrc = 'from %s.tuples import %s' % (pluginName, tupleClassName)
+
+        with open(os.path.join(rootDir, '_EntryHook.py'), 'w') as f:
+            f.write(_ENTRY_HOOK_SRC % {"loadSrc": loadSrc, "failOnStart": failOnStart,
+                                       "version": version})
+
+    def _started(self):
+        return [e[1] for e in self.events if e[0] == 'start']
+
+    def _send(self, pluginName):
+        """ Send a payload to the plugins endpoints in PayloadIO
+
+        :return: The versions of the plugin that received it
+        """
+        payload = Payload(filt={'plugin': pluginName, 'key': 'test'})
+        count = len(self.events)
+        for endpoint in PayloadIO().endpoints:
+            endpoint.process(payload)
+        return [e[3] for e in self.events[count:] if e[0] == 'payload']
+
+    def _loadForSwap(self, pluginName):
+        self._writePlugin(pluginName, tupleClassName='SwapTuple')
+        self.config.pluginsEnabled = [pluginName]
+        self.config.pluginHotSwap = True
+        self.loader.loadAllPlugins()
+
+        # The drain and the leak check run on a clock, rather than the reactor
+        self.clock = Clock()
+        self.loader._leakDetector = PluginLeakDetector(reactor=self.clock)
+        patch = mock.patch.object(loaderModule, 'PluginEndpointDrain',
+                                  functools.partial(PluginEndpointDrain,
+                                                    clock=self.clock))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def testParallelStartsInDependencyOrder(self):
+        self._writePlugin('plugin_ltest_app', requiresPlugins=['plugin_ltest_db'])
+        self._writePlugin('plugin_ltest_db', requiresPlugins=['plugin_ltest_base'])
+        self._writePlugin('plugin_ltest_base')
+        self._writePlugin('plugin_ltest_other')
+
+        self.config.pluginsEnabled = ['plugin_ltest_app', 'plugin_ltest_other',
+                                      'plugin_ltest_db', 'plugin_ltest_base']
+        self.config.pluginLoadThreads = 4
+
+        with mock.patch.object(self.loader._manifestCache, 'save') as save:
+            self.loader.loadAllPlugins()
+
+        # The required plugins start first, otherwise the enabled order is kept
+        self.assertEqual(self._started(),
+                         ['plugin_ltest_base', 'plugin_ltest_db', 'plugin_ltest_app',
+                          'plugin_ltest_other'])
+        self.assertEqual(save.call_count, 1)
+
+        stats = {s.pluginName: s for s in self.loader.pluginLoadStats}
+        self.assertTrue(all(s.loaded for s in stats.values()))
+
+        # The plugins share the memory of the parallel import
+        self.assertTrue(all(s.rssBytes is None for s in stats.values()))
+        self.assertTrue(all(s.importSeconds is not None for s in stats.values()))
+
+    def testParallelPluginFailsMidBatch(self):
+        self._writePlugin('plugin_ltest_base')
+        self._writePlugin('plugin_ltest_broken', failOnStart=True)
+        self._writePlugin('plugin_ltest_noimport', failOnImport=True)
+        self._writePlugin('plugin_ltest_app', requiresPlugins=['plugin_ltest_base'])
+
+        self.config.pluginsEnabled = ['plugin_ltest_base', 'plugin_ltest_broken',
+                                      'plugin_ltest_noimport', 'plugin_ltest_app']
+        self.config.pluginLoadThreads = 4
+        self.loader.loadAllPlugins()
+
+        # The failures don't stop the rest of the batch
+        self.assertEqual(self._started(), ['plugin_ltest_base', 'plugin_ltest_app'])
+
+        stats = {s.pluginName: s for s in self.loader.pluginLoadStats}
+        self.assertEqual({n for n, s in stats.items() if s.loaded},
+                         {'plugin_ltest_base', 'plugin_ltest_app'})
+        self.assertIn('failed to start', stats['plugin_ltest_broken'].error)
+        self.assertIn('failed to import', stats['plugin_ltest_noimport'].error)
+
+        # A failed plugin can be loaded on it's own later
+        self.assertEqual(sorted(self.loader._loadedPlugins),
+                         ['plugin_ltest_app', 'plugin_ltest_base'])
+
+    def testSequentialSavesManifestOnce(self):
+        for pluginName in ('plugin_ltest_one', 'plugin_ltest_two'):
+            self._writePlugin(pluginName)
+
+        self.config.pluginsEnabled = ['plugin_ltest_one', 'plugin_ltest_two']
+
+        with mock.patch.object(self.loader._manifestCache, 'save') as save:
+            self.loader.loadAllPlugins()
+
+        self.assertEqual(self._started(), ['plugin_ltest_one', 'plugin_ltest_two'])
+        self.assertEqual(save.call_count, 1)
+
+    def testLazyPluginFirstPayloadCarriesATuple(self):
+        pluginName = 'plugin_ltest_lazy'
+        tupleName = pluginName + '.LazyTuple'
+        self._writePlugin(pluginName, tupleClassName='LazyTuple')
+
+        self.config.pluginsEnabled = [pluginName]
+        self.config.pluginLazyLoad = True
+
+        # The plugin hasn't recorded it's tuple modules yet, so it's loaded now
+        self.loader.loadAllPlugins()
+        self.assertEqual(self._started(), [pluginName])
+        self.assertEqual(self.loader.lazyPluginNames, [])
+
+        self.loader.unloadAllPlugins()
+        self.assertNotIn(tupleName, TUPLE_TYPES_BY_NAME)
+        del self.events[:]
+
+        # The next start only registers the tuples
+        self.loader = self._newLoader()
+        self.loader.loadAllPlugins()
+        self.assertEqual(self._started(), [])
+        self.assertEqual(self.loader.lazyPluginNames, [pluginName])
+
+        LazyTuple = tupleForTupleName(tupleName)
+        vortexMsg = Payload(filt={'plugin': pluginName, 'key': 'test'},
+                            tuples=[LazyTuple(value=42)]).toVortexMsg()
+
+        # The first payload deserialises before the plugin is loaded
+        payload = Payload().fromVortexMsg(vortexMsg)
+        self.assertEqual(payload.tuples[0].value, 42)
+
+        self.loader._lazyStubsByPluginName[pluginName].process(payload)
+
+        self.assertEqual(self._started(), [pluginName])
+        payloadEvents = [e for e in self.events if e[0] == 'payload']
+        self.assertEqual(len(payloadEvents), 1)
+        self.assertEqual(payloadEvents[0][2].tuples[0].value, 42)
+
+        # The tuple registered for the stub belongs to the loaded plugin
+        self.loader.unloadAllPlugins()
+        self.assertNotIn(tupleName, TUPLE_TYPES_BY_NAME)
+
+    def testSwapPlugin(self):
+        pluginName = 'plugin_ltest_swap'
+        tupleName = pluginName + '.SwapTuple'
+        self._loadForSwap(pluginName)
+
+        oldPlugin = self.loader._loadedPlugins[pluginName]
+        oldEndpoints = self.loader._vortexEndpointInstancesByPluginName[pluginName]
+        OldTuple = tupleForTupleName(tupleName)
+        self.assertEqual(self._send(pluginName), [1])
+
+        self._writePlugin(pluginName, tupleClassName='SwapTuple', version=2)
+        results = []
+        self.loader.notifyOfPluginVersionUpdate(pluginName, '2.0.0') \
+            .addCallback(results.append)
+
+        # The new version is live, the old one is draining
+        newEndpoints = self.loader._vortexEndpointInstancesByPluginName[pluginName]
+        self.assertEqual(len(newEndpoints), 1)
+        self.assertTrue(set(newEndpoints) <= set(PayloadIO().endpoints))
+        self.assertFalse(set(oldEndpoints) & set(PayloadIO().endpoints))
+        self.assertEqual(self._send(pluginName), [2])
+
+        NewTuple = tupleForTupleName(tupleName)
+        self.assertIsNot(NewTuple, OldTuple)
+        self.assertIs(sys.modules[pluginName + '.tuples.SwapTuple'].SwapTuple, NewTuple)
+
+        self.assertNotIn(('stop', pluginName, 1), self.events)
+        self.assertEqual(results, [])
+
+        # Once drained, the old version is stopped and watched for leaks
+        self.clock.advance(0)
+        self.assertEqual(results, [None])
+        self.assertIn(('stop', pluginName, 1), self.events)
+        self.assertNotIn(('stop', pluginName, 2), self.events)
+        self.assertIsNot(self.loader._loadedPlugins[pluginName], oldPlugin)
+        self.assertIn(pluginName, self.loader._leakDetector._refsByPluginName)
+        self.assertEqual(self._send(pluginName), [2])
+
+    def testSwapPluginFailsToLoad(self):
+        pluginName = 'plugin_ltest_swap'
+        tupleName = pluginName + '.SwapTuple'
+        self._loadForSwap(pluginName)
+
+        oldPlugin = self.loader._loadedPlugins[pluginName]
+        oldEndpoints = self.loader._vortexEndpointInstancesByPluginName[pluginName]
+        oldModules = {name: mod for name, mod in sys.modules.items()
+                      if name.startswith(pluginName)}
+        OldTuple = tupleForTupleName(tupleName)
+
+        for failure in ('failOnStart', 'failOnImport'):
+            with self.subTest(failure=failure):
+                self._writePlugin(pluginName, tupleClassName='SwapTuple', version=2,
+                                  **{failure: True})
+                results = []
+                self.loader.swapPlugin(pluginName).addCallback(results.append)
+                self.assertEqual(results, [None])
+
+                # The old version is back as it was, and it still answers
+                self.assertIs(self.loader._loadedPlugins[pluginName], oldPlugin)
+                self.assertEqual(
+                    self.loader._vortexEndpointInstancesByPluginName[pluginName],
+                    oldEndpoints)
+                self.assertTrue(set(oldEndpoints) <= set(PayloadIO().endpoints))
+                self.assertEqual({name: mod for name, mod in sys.modules.items()
+                                  if name.startswith(pluginName)},
+                                 oldModules)
+                self.assertIs(tupleForTupleName(tupleName), OldTuple)
+                self.assertEqual(self._send(pluginName), [1])
+
+                self.assertNotIn(('stop', pluginName, 1), self.events)
+                self.assertNotIn(('start', pluginName, 2), self.events)
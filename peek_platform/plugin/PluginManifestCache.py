@@ -0,0 +1,224 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional, List
+
+from jsoncfg import load_config
+from jsoncfg.value_mappers import require_string, require_array
+
+logger = logging.getLogger(__name__)
+
+PLUGIN_PACKAGE_JSON = "plugin_package.json"
+
+
+class PluginManifest:
+    """ Plugin Manifest
+
+    The details from a plugins package config that the platform needs before the
+    plugin is imported.
+
+    """
+
+    def __init__(self, pluginName: str, data: dict):
+        self.pluginName = pluginName
+        self._data = data
+
+    @property
+    def pluginRootDir(self) -> str:
+        return self._data["rootDir"]
+
+    @property
+    def pluginVersion(self) -> str:
+        return self._data["version"]
+
+    @property
+    def requiresServices(self) -> [str]:
+        return self._data["requiresServices"]
+
+    @property
+    def requiresPlugins(self) -> [str]:
+        return self._data["requiresPlugins"]
+
+    @property
+    def tupleModuleNames(self) -> Optional[List[str]]:
+        """ Tuple Module Names
+
+        :return: The modules that register the plugins tuple types, or None if the
+            plugin hasn't been loaded since the manifest was updated.
+        """
+        return self._data.get("tupleModuleNames")
+
+    @property
+    def packageConfig(self) -> dict:
+        """ Package Config
+
+        :return: The whole package config, EG for the angular settings
+        """
+        return self._data["packageConfig"]
+
+
+class PluginManifestCache:
+    """ Plugin Manifest Cache
+
+    This class stores what the loader needs to know about each plugin in one json
+    file, so the services don't have to import every plugin and parse every
+    package config at startup to know what to load.
+
+    An entry is used while the plugin version matches and the package configs mtime
+    hasn't changed. The directory listings of the plugin paths are cached against
+    the directories mtime.
+
+    """
+
+    def __init__(self, filePath: str):
+        self._filePath = filePath
+        self._lock = threading.RLock()
+        self._data = None
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if self._data is not None:
+            return self._data
+
+        self._data = {"plugins": {}, "dirs": {}}
+        try:
+            with open(self._filePath) as f:
+                data = json.load(f)
+
+            if isinstance(data, dict):
+                self._data["plugins"].update(data.get("plugins", {}))
+                self._data["dirs"].update(data.get("dirs", {}))
+
+        except FileNotFoundError:
+            pass
+
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring the plugin manifest cache %s, %s",
+                           self._filePath, e)
+
+        return self._data
+
+    @staticmethod
+    def _mtimeNs(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, pluginName: str,
+            expectedVersion: Optional[str] = None) -> Optional[PluginManifest]:
+        """ Get
+
+        :param pluginName: The name of the plugin, EG plugin_noop
+        :param expectedVersion: The version the plugin should be, None to accept
+            any version
+        :return: The manifest, or None if it's not cached or out of date.
+        """
+        with self._lock:
+            entry = self._load()["plugins"].get(pluginName)
+
+        if not entry:
+            return None
+
+        if expectedVersion is not None and entry["version"] != expectedVersion:
+            return None
+
+        packageJsonPath = os.path.join(entry["rootDir"], PLUGIN_PACKAGE_JSON)
+        if self._mtimeNs(packageJsonPath) != entry["packageMtimeNs"]:
+            return None
+
+        return PluginManifest(pluginName, entry)
+
+    def update(self, pluginName: str, pluginRootDir: str) -> PluginManifest:
+        """ Update
+
+        Read the plugins package config and store the manifest for it.
+
+        """
+        packageJsonPath = os.path.join(pluginRootDir, PLUGIN_PACKAGE_JSON)
+        packageMtimeNs = self._mtimeNs(packageJsonPath)
+
+        # The same parser as PluginPackageFileConfig, it allows comments
+        config = load_config(packageJsonPath)
+
+        entry = {
+            "rootDir": pluginRootDir,
+            "packageMtimeNs": packageMtimeNs,
+            "version": config.plugin.version(require_string),
+            "requiresServices": config.requiresServices(require_array),
+            "requiresPlugins": config.requiresPlugins([], require_array),
+            "packageConfig": config()
+        }
+
+        with self._lock:
+            self._load()["plugins"][pluginName] = entry
+            self._dirty = True
+
+        return PluginManifest(pluginName, entry)
+
+    def setTupleModuleNames(self, pluginName: str, moduleNames: [str]) -> None:
+        """ Set Tuple Module Names
+
+        Record the modules that register the plugins tuple types, so they can be
+        registered before a lazy plugin is loaded.
+
+        """
+        with self._lock:
+            entry = self._load()["plugins"].get(pluginName)
+            if entry and entry.get("tupleModuleNames") != list(moduleNames):
+                entry["tupleModuleNames"] = list(moduleNames)
+                self._dirty = True
+
+    def invalidate(self, pluginName: str) -> None:
+        with self._lock:
+            if self._load()["plugins"].pop(pluginName, None):
+                self._dirty = True
+
+        self.save()
+
+    def listSubDirs(self, path: str) -> [str]:
+        """ List Sub Dirs
+
+        :return: The names of the directories in path, cached until the directories
+            mtime changes
+        """
+        mtimeNs = self._mtimeNs(path)
+
+        with self._lock:
+            entry = self._load()["dirs"].get(path)
+            if entry and mtimeNs is not None and entry["mtimeNs"] == mtimeNs:
+                return list(entry["names"])
+
+        with os.scandir(path) as it:
+            names = [e.name for e in it if e.is_dir()]
+
+        with self._lock:
+            self._load()["dirs"][path] = {"mtimeNs": mtimeNs, "names": names}
+            self._dirty = True
+
+        return list(names)
+
+    def save(self) -> None:
+        """ Save
+
+        Write the cache if it's changed, the file is replaced atomically.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+
+            fileDir = os.path.dirname(self._filePath)
+            fd, tmpPath = tempfile.mkstemp(dir=fileDir, prefix='.manifest.')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self._data, f, indent=2, sort_keys=True)
+                os.replace(tmpPath, self._filePath)
+
+            except Exception:
+                if os.path.exists(tmpPath):
+                    os.remove(tmpPath)
+                raise
+
+            self._dirty = False
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import unittest
+
+from jsoncfg import JSONConfigValueNotFoundError
+
+from peek_platform.plugin.PluginManifestCache import PluginManifestCache, \
+    PLUGIN_PACKAGE_JSON
+
+
+class PluginManifestCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.cacheFilePath = os.path.join(self._dir.name, 'manifest.json')
+
+        self.pluginRootDir = os.path.join(self._dir.name, 'plugin_noop')
+        os.mkdir(self.pluginRootDir)
+        self._writePackageJson('1.0.0')
+
+    def _writePackageJson(self, version, mtimeNs=None):
+        path = os.path.join(self.pluginRootDir, PLUGIN_PACKAGE_JSON)
+        with open(path, 'w') as f:
+            json.dump({"plugin": {"version": version},
+                       "requiresServices": ["server"],
+                       "server": {"angularMainModule": "plugin-noop.module"}}, f)
+
+        if mtimeNs is not None:
+            os.utime(path, ns=(mtimeNs, mtimeNs))
+
+    def testCacheIsPersisted(self):
+        cache = PluginManifestCache(self.cacheFilePath)
+        self.assertIsNone(cache.get('plugin_noop'))
+
+        cache.update('plugin_noop', self.pluginRootDir)
+        cache.save()
+
+        manifest = PluginManifestCache(self.cacheFilePath).get('plugin_noop', '1.0.0')
+        self.assertEqual(manifest.pluginRootDir, self.pluginRootDir)
+        self.assertEqual(manifest.requiresServices, ["server"])
+        self.assertEqual(manifest.requiresPlugins, [])
+        self.assertEqual(manifest.packageConfig["server"]["angularMainModule"],
+                         "plugin-noop.module")
+
+    def testStaleEntries(self):
+        cache = PluginManifestCache(self.cacheFilePath)
+        cache.update('plugin_noop', self.pluginRootDir)
+
+        # A different version is expected
+        self.assertIsNone(cache.get('plugin_noop', '2.0.0'))
+
+        # The package config changed
+        self._writePackageJson('1.0.0', mtimeNs=1000000000)
+        self.assertIsNone(cache.get('plugin_noop'))
+
+        cache.update('plugin_noop', self.pluginRootDir)
+        cache.invalidate('plugin_noop')
+        self.assertIsNone(PluginManifestCache(self.cacheFilePath).get('plugin_noop'))
+
+    def testPackageConfigIsParsedWithJsonCfg(self):
+        path = os.path.join(self.pluginRootDir, PLUGIN_PACKAGE_JSON)
+        with open(path, 'w') as f:
+            f.write('{\n'
+                    '    // The services that load this plugin\n'
+                    '    "plugin": {"version": "1.0.0"},\n'
+                    '    "requiresServices": ["server"],\n'
+                    '}\n')
+
+        cache = PluginManifestCache(self.cacheFilePath)
+        manifest = cache.update('plugin_noop', self.pluginRootDir)
+        self.assertEqual(manifest.pluginVersion, '1.0.0')
+        self.assertEqual(manifest.requiresServices, ["server"])
+
+        # requiresServices is required
+        with open(path, 'w') as f:
+            json.dump({"plugin": {"version": "1.0.0"}}, f)
+
+        with self.assertRaises(JSONConfigValueNotFoundError):
+            cache.update('plugin_noop', self.pluginRootDir)
+
+    def testListSubDirs(self):
+        cache = PluginManifestCache(self.cacheFilePath)
+        with open(os.path.join(self._dir.name, 'file.txt'), 'w'):
+            pass
+        self.assertEqual(cache.listSubDirs(self._dir.name), ['plugin_noop'])
+
+        os.mkdir(os.path.join(self._dir.name, 'plugin_two'))
+        self.assertEqual(sorted(cache.listSubDirs(self._dir.name)),
+                         ['plugin_noop', 'plugin_two'])
+
+    def testTupleModuleNames(self):
+        cache = PluginManifestCache(self.cacheFilePath)
+        cache.update('plugin_noop', self.pluginRootDir)
+        self.assertIsNone(cache.get('plugin_noop').tupleModuleNames)
+
+        cache.setTupleModuleNames('plugin_noop', ['plugin_noop.tuples.NoopTuple'])
+        cache.save()
+
+        manifest = PluginManifestCache(self.cacheFilePath).get('plugin_noop')
+        self.assertEqual(manifest.tupleModuleNames, ['plugin_noop.tuples.NoopTuple'])
+
+        # A new version of the plugin has to be loaded again to know it's tuples
+        self._writePackageJson('2.0.0')
+        cache.update('plugin_noop', self.pluginRootDir)
+        self.assertIsNone(cache.get('plugin_noop').tupleModuleNames)
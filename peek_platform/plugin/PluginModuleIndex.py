@@ -0,0 +1,62 @@
+import logging
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PluginModuleIndex:
+    """ Plugin Module Index
+
+    This class records the modules imported for each plugin package, so a plugin can
+    be unloaded without scanning all of sys.modules.
+
+    It's installed at the start of sys.meta_path, the import system asks it for every
+    module that isn't already imported. It records the module name against the
+    plugin with the same top level package name, then lets the other finders find it.
+
+    """
+
+    def __init__(self):
+        self._moduleNamesByPluginName = {}
+        self._installLock = threading.Lock()
+        self._installed = False
+
+    def install(self) -> None:
+        with self._installLock:
+            if not self._installed:
+                sys.meta_path.insert(0, self)
+                self._installed = True
+
+    def track(self, pluginName: str) -> None:
+        """ Track
+
+        Start recording the modules imported for this plugin package.
+        """
+        self.install()
+        self._moduleNamesByPluginName.setdefault(pluginName, {pluginName})
+
+    def popModuleNames(self, pluginName: str) -> set:
+        """ Pop Module Names
+
+        :return: The names of the modules imported for the plugin, the plugin is no
+            longer tracked.
+        """
+        return self._moduleNamesByPluginName.pop(pluginName, set())
+
+    def setModuleNames(self, pluginName: str, moduleNames: set) -> None:
+        """ Set Module Names
+
+        Track the plugin with these modules, EG to put back the names popped with
+        popModuleNames.
+        """
+        self.install()
+        self._moduleNamesByPluginName[pluginName] = set(moduleNames) | {pluginName}
+
+    def find_spec(self, fullname, path=None, target=None):
+        moduleNames = self._moduleNamesByPluginName.get(fullname.partition('.')[0])
+        if moduleNames is not None:
+            moduleNames.add(fullname)
+
+        # Let the other finders find it
+        return None
@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from peek_platform.plugin.PluginModuleIndex import PluginModuleIndex
+
+
+class PluginModuleIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        packageDir = os.path.join(self._dir, 'plugin_index_test')
+        os.makedirs(os.path.join(packageDir, 'sub'))
+
+        with open(os.path.join(packageDir, '__init__.py'), 'w') as f:
+            f.write('from . import mod\n')
+        with open(os.path.join(packageDir, 'mod.py'), 'w') as f:
+            f.write('import json\n')
+        with open(os.path.join(packageDir, 'sub', '__init__.py'), 'w') as f:
+            f.write('')
+
+        sys.path.insert(0, self._dir)
+
+        self._index = PluginModuleIndex()
+
+    def tearDown(self):
+        sys.meta_path.remove(self._index)
+        sys.path.remove(self._dir)
+        for modName in list(sys.modules):
+            if modName.partition('.')[0] == 'plugin_index_test':
+                del sys.modules[modName]
+        shutil.rmtree(self._dir)
+
+    def testModulesAreIndexed(self):
+        self._index.track('plugin_index_test')
+
+        import plugin_index_test
+        import plugin_index_test.sub
+
+        self.assertEqual(self._index.popModuleNames('plugin_index_test'),
+                         {'plugin_index_test',
+                          'plugin_index_test.mod',
+                          'plugin_index_test.sub'})
+
+        # It's no longer tracked
+        self.assertEqual(self._index.popModuleNames('plugin_index_test'), set())
@@ -0,0 +1,110 @@
+import logging
+import threading
+
+import vortex.Tuple
+from vortex.PayloadIO import PayloadIO
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_installLock = threading.Lock()
+_installed = False
+
+
+def _captureStack() -> list:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _currentCapture():
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def _installHooks() -> None:
+    """ Install Hooks
+
+    Wrap PayloadIO.add and vortex.Tuple.addTupleType, so the registrations are
+    recorded against the capture that's active on the registering thread.
+
+    Modules that imported addTupleType before this is called keep the unwrapped
+    version, the plugins are imported after it's called.
+
+    """
+    global _installed
+
+    with _installLock:
+        if _installed:
+            return
+
+        payloadIOAdd = PayloadIO.add
+
+        def add(self, endpoint):
+            capture = _currentCapture()
+            if capture is not None:
+                capture.endpoints.append(endpoint)
+                if capture.deferEndpoints:
+                    return
+            payloadIOAdd(self, endpoint)
+
+        PayloadIO.add = add
+
+        addTupleType = vortex.Tuple.addTupleType
+
+        def addTupleTypeCaptured(cls):
+            capture = _currentCapture()
+            if (capture is not None
+                    and cls.tupleName() in capture.replaceTupleNames
+                    and cls.tupleName() in vortex.Tuple.TUPLE_TYPES_BY_NAME):
+                vortex.Tuple.removeTuplesForTupleNames([cls.tupleName()])
+
+            cls = addTupleType(cls)
+            if capture is not None:
+                capture.tupleNames.append(cls.tupleName())
+            return cls
+
+        vortex.Tuple.addTupleType = addTupleTypeCaptured
+
+        _installed = True
+
+
+class PluginRegistrationCapture:
+    """ Plugin Registration Capture
+
+    While this context is active on a thread, every PayloadEndpoint and tuple type
+    registered by that thread is recorded against the plugin, EG
+
+        with PluginRegistrationCapture("plugin_noop") as registrations:
+            import plugin_noop
+
+        registrations.endpoints, registrations.tupleNames
+
+    The same capture can be entered more than once, EG on an import thread and
+    then on the main thread, the registrations are appended.
+
+    When a new version of a plugin is started alongside the old one, the new
+    endpoints are held back with deferEndpoints, they're added to PayloadIO at the
+    cut over. The tuple names in replaceTupleNames replace the old versions tuple
+    types, rather than failing as duplicates.
+
+    """
+
+    def __init__(self, pluginName: str, deferEndpoints: bool = False,
+                 replaceTupleNames=()):
+        self.pluginName = pluginName
+        self.deferEndpoints = deferEndpoints
+        self.replaceTupleNames = set(replaceTupleNames)
+        self.endpoints = []
+        self.tupleNames = []
+
+    def __enter__(self):
+        _installHooks()
+        _captureStack().append(self)
+        return self
+
+    def __exit__(self, type, value, tb):
+        stack = _captureStack()
+        assert stack[-1] is self, "Plugin registration captures exited out of order"
+        stack.pop()
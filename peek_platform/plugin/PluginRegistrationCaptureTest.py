@@ -0,0 +1,72 @@
+import threading
+import unittest
+
+import vortex.Tuple
+from vortex.PayloadEndpoint import PayloadEndpoint
+from vortex.PayloadIO import PayloadIO
+from vortex.Tuple import Tuple, TupleField, removeTuplesForTupleNames
+
+from peek_platform.plugin.PluginRegistrationCapture import PluginRegistrationCapture
+
+
+class PluginRegistrationCaptureTest(unittest.TestCase):
+    def _callback(self, payload, **kwargs):
+        pass
+
+    def _registerPlugin(self, pluginName: str):
+        """ Register what a plugin would when it's imported """
+        endpoint = PayloadEndpoint({'plugin': pluginName, 'key': 'test'}, self._callback)
+        self.addCleanup(PayloadIO().remove, endpoint)
+
+        class CaptureTestTuple(Tuple):
+            __tupleType__ = "%s.CaptureTestTuple" % pluginName
+            value = TupleField()
+
+        # Plugins import addTupleType after the capture is installed
+        vortex.Tuple.addTupleType(CaptureTestTuple)
+        self.addCleanup(removeTuplesForTupleNames, [CaptureTestTuple.tupleName()])
+
+        return endpoint
+
+    def testCaptureOnlyOwnRegistrations(self):
+        with PluginRegistrationCapture('plugin_one') as registrations:
+            endpoint = self._registerPlugin('plugin_one')
+
+        # Registrations outside the capture aren't recorded
+        self._registerPlugin('plugin_two')
+
+        self.assertEqual(registrations.endpoints, [endpoint])
+        self.assertEqual(registrations.tupleNames, ['plugin_one.CaptureTestTuple'])
+
+    def testCaptureIsPerThread(self):
+        capturesByName = {name: PluginRegistrationCapture(name)
+                          for name in ('plugin_a', 'plugin_b', 'plugin_c')}
+        endpointsByName = {}
+        barrier = threading.Barrier(len(capturesByName))
+
+        def load(pluginName):
+            with capturesByName[pluginName]:
+                barrier.wait()  # Make sure all the captures are active at once
+                endpointsByName[pluginName] = self._registerPlugin(pluginName)
+
+        threads = [threading.Thread(target=load, args=(name,))
+                   for name in capturesByName]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+
+        for name, capture in capturesByName.items():
+            self.assertEqual(capture.endpoints, [endpointsByName[name]])
+            self.assertEqual(capture.tupleNames, ['%s.CaptureTestTuple' % name])
+
+    def testDeferEndpointsAndReplaceTuples(self):
+        self._registerPlugin('plugin_swap')
+
+        with PluginRegistrationCapture('plugin_swap', deferEndpoints=True,
+                                       replaceTupleNames=['plugin_swap.CaptureTestTuple']
+                                       ) as registrations:
+            endpoint = self._registerPlugin('plugin_swap')
+
+        # The new endpoint waits for the cut over
+        self.assertNotIn(endpoint, PayloadIO().endpoints)
+        self.assertEqual(registrations.endpoints, [endpoint])
+        self.assertEqual(registrations.tupleNames, ['plugin_swap.CaptureTestTuple'])
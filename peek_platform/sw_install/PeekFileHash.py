@@ -0,0 +1,13 @@
+import hashlib
+
+
+def fileSha256(filePath: str) -> str:
+    """ File SHA-256
+
+    :return: The hex SHA-256 of the files content, it's read a chunk at a time
+    """
+    digest = hashlib.sha256()
+    with open(filePath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
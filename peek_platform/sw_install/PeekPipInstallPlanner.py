@@ -0,0 +1,289 @@
+import json
+import logging
+import os
+import re
+import shlex
+import subprocess
+import tempfile
+import time
+from collections import namedtuple, OrderedDict
+from subprocess import PIPE, STDOUT
+from typing import Optional
+
+from peek_platform.sw_install.PeekFileHash import fileSha256
+
+try:
+    from packaging.version import Version as _parseVersion
+except ImportError:
+    from pkg_resources import parse_version as _parseVersion
+
+logger = logging.getLogger(__name__)
+
+PipPackage = namedtuple("PipPackage", ["name", "version", "filePath", "sha256",
+                                       "reason"])
+
+PipInstallPlan = namedtuple("PipInstallPlan", ["toInstall", "unchanged"])
+
+PipInstallResult = namedtuple("PipInstallResult", ["returnCode", "output",
+                                                   "phaseTimes"])
+
+# The reasons a package is installed
+REASON_NOT_INSTALLED = "not installed"
+REASON_VERSION_CHANGED = "version changed"
+REASON_CONTENT_CHANGED = "content changed"
+
+# EG peek_platform-0.4.1-py3-none-any.whl, or peek_platform-0.4.1.tar.gz
+_WHEEL_RE = re.compile(r'^(?P<name>.+?)-(?P<version>[^-]+)(-\d[^-]*)?-[^-]+-[^-]+-[^-]+\.whl$')
+_SDIST_RE = re.compile(r'^(?P<name>.+)-(?P<version>[^-]+)\.(tar\.gz|zip)$')
+
+# The lines pip prints as it moves from one package to the next
+_PIP_PHASE_RES = [
+    ("process", re.compile(r'^Processing (?P<path>\S+)')),
+    ("build", re.compile(r'^\s*Building wheel for (?P<name>\S+)')),
+    ("uninstall", re.compile(r'^\s*Attempting uninstall: (?P<name>\S+)')),
+    ("install", re.compile(r'^Installing collected packages: ')),
+    ("done", re.compile(r'^Successfully installed ')),
+]
+
+
+def normalisePackageName(name: str) -> str:
+    """ Normalise Package Name
+
+    The PEP 503 form, EG Peek_Platform and peek-platform are the same package
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def parsePackageFileName(fileName: str) -> Optional[tuple]:
+    """ Parse Package File Name
+
+    :return: A tuple of the normalised name and the version, or None if it's not a
+        wheel or sdist
+    """
+    match = _WHEEL_RE.match(fileName) or _SDIST_RE.match(fileName)
+    if not match:
+        return None
+    return normalisePackageName(match.group('name')), match.group('version')
+
+
+def sameVersion(version1: str, version2: str) -> bool:
+    """ Same Version
+
+    The PEP 440 comparison, EG 0.0.6dev123456 from an sdist name is the same as
+    the 0.0.6.dev123456 pip reports as installed.
+    """
+    if version1 == version2:
+        return True
+
+    try:
+        return _parseVersion(version1) == _parseVersion(version2)
+
+    except ValueError:
+        # Not a PEP 440 version, the strings have to match
+        return False
+
+
+def installedPackageVersions() -> {str: str}:
+    """ Installed Package Versions
+
+    :return: The versions of the packages installed in this environment, by the
+        normalised name
+    """
+    try:
+        from importlib.metadata import distributions
+        return {normalisePackageName(d.metadata['Name']): d.version
+                for d in distributions() if d.metadata['Name']}
+
+    except ImportError:
+        import pkg_resources
+        return {normalisePackageName(d.project_name): d.version
+                for d in pkg_resources.working_set}
+
+
+class PeekPipInstallPlanner:
+    """ Peek Pip Install Planner
+
+    This class compares the packages in a release with the installed packages, and
+    installs only the packages that have changed, in one pip command.
+
+    A package is installed if it's not installed, the version is different, or the
+    content hash is different to the one recorded when it was last installed. The
+    hashes are kept in the state file.
+
+    The changed packages are installed with --no-deps, the releases contain every
+    dependency, so a dependency that changed is in the plan it's self.
+
+    """
+
+    def __init__(self, stateFilePath: str):
+        self._stateFilePath = stateFilePath
+
+    def _loadState(self) -> {str: dict}:
+        try:
+            with open(self._stateFilePath) as f:
+                return json.load(f)
+
+        except FileNotFoundError:
+            return {}
+
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to read the pip install state %s, %s",
+                           self._stateFilePath, e)
+            return {}
+
+    def _saveState(self, state: {str: dict}) -> None:
+        dirName = os.path.dirname(os.path.abspath(self._stateFilePath))
+        os.makedirs(dirName, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=dirName, prefix='.pip_install_state.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmpPath, self._stateFilePath)
+
+    def plan(self, packagePaths: [str],
+             installedVersions: Optional[dict] = None) -> PipInstallPlan:
+        """ Plan
+
+        :param packagePaths: The wheels and sdists in the release
+        :param installedVersions: The installed versions, by normalised name, the
+            packages in this environment if None
+        """
+        if installedVersions is None:
+            installedVersions = installedPackageVersions()
+
+        state = self._loadState()
+        toInstall = []
+        unchanged = []
+
+        for filePath in sorted(packagePaths):
+            parsed = parsePackageFileName(os.path.basename(filePath))
+            if not parsed:
+                logger.warning("Skipping %s, it's not a wheel or sdist", filePath)
+                continue
+
+            name, version = parsed
+            sha256 = fileSha256(filePath)
+
+            installedVersion = installedVersions.get(name)
+            if installedVersion is None:
+                reason = REASON_NOT_INSTALLED
+            elif not sameVersion(installedVersion, version):
+                reason = REASON_VERSION_CHANGED
+            elif state.get(name, {}).get("sha256") != sha256:
+                reason = REASON_CONTENT_CHANGED
+            else:
+                reason = None
+
+            package = PipPackage(name, version, filePath, sha256, reason)
+            (toInstall if reason else unchanged).append(package)
+
+        return PipInstallPlan(toInstall, unchanged)
+
+    @staticmethod
+    def makePipArgs(findLinksDir: str, plan: PipInstallPlan) -> [str]:
+        return ['install',
+                '--force-reinstall',  # Reinstall the changed packages
+                '--no-deps',  # The changed dependencies are in the plan
+                '--no-cache-dir',  # Don't use the local pip cache
+                '--no-index',  # Work offline, don't use pypi
+                '--find-links', findLinksDir,
+                ] + [p.filePath for p in plan.toInstall]
+
+    def install(self, pipExec: str, findLinksDir: str, plan: PipInstallPlan,
+                bashExec: Optional[str] = None) -> PipInstallResult:
+        """ Install
+
+        Run pip for the changed packages, then record their hashes if it succeeds.
+
+        :return: The pip return code and output, and the seconds each package spent
+            in each phase, by package name, see pipPhaseTimes
+        """
+        if not plan.toInstall:
+            logger.info("All %s packages are up to date", len(plan.unchanged))
+            return PipInstallResult(0, '', {})
+
+        for package in plan.toInstall:
+            logger.info("Installing %s %s, %s", package.name, package.version,
+                        package.reason)
+
+        args = [pipExec] + self.makePipArgs(findLinksDir, plan)
+        logger.debug("Executing command : %s", args)
+
+        process = subprocess.Popen(' '.join(shlex.quote(a) for a in args),
+                                   executable=bashExec, shell=True,
+                                   stdout=PIPE, stderr=STDOUT,
+                                   universal_newlines=True)
+
+        # Time the lines as they arrive, to split the time between the packages
+        timedLines = []
+        for line in process.stdout:
+            timedLines.append((time.monotonic(), line.rstrip('\n')))
+        process.wait()
+        timedLines.append((time.monotonic(), ''))
+
+        output = '\n'.join(l for _, l in timedLines)
+        if process.returncode:
+            return PipInstallResult(process.returncode, output, {})
+
+        state = self._loadState()
+        for package in plan.toInstall:
+            state[package.name] = {"version": package.version,
+                                   "sha256": package.sha256}
+        self._saveState(state)
+
+        phaseTimes = pipPhaseTimes(timedLines, plan)
+        for name, phases in phaseTimes.items():
+            logger.info("Installed %s in %.2fs, %s", name, sum(phases.values()),
+                        ', '.join("%s %.2fs" % p for p in phases.items()))
+
+        return PipInstallResult(0, output, phaseTimes)
+
+
+def pipPhaseTimes(timedLines: [(float, str)],
+                  plan: PipInstallPlan) -> {str: {str: float}}:
+    """ Pip Phase Times
+
+    pip prints a line as it starts to process, build and uninstall each package,
+    the time until the next of these lines is counted against that package.
+
+    pip installs the packages together, that time is split evenly between them.
+
+    :param timedLines: The time each line of pip output arrived, and the line, the
+        last line is the time pip finished.
+    :return: The seconds in each phase, by package name
+    """
+    namesByPath = {os.path.basename(p.filePath): p.name for p in plan.toInstall}
+    times = OrderedDict((p.name, OrderedDict()) for p in plan.toInstall)
+
+    current = None  # (startTime, phase, packageName or None for all of them)
+
+    def finish(endTime):
+        if not current:
+            return
+        startTime, phase, name = current
+        names = [name] if name in times else list(times)
+        for n in names:
+            times[n][phase] = times[n].get(phase, 0.0) + (endTime - startTime) / len(names)
+
+    for lineTime, line in timedLines:
+        for phase, phaseRe in _PIP_PHASE_RES:
+            match = phaseRe.match(line)
+            if not match:
+                continue
+
+            finish(lineTime)
+
+            if phase == "done":
+                current = None
+            elif phase == "install":
+                current = (lineTime, phase, None)
+            elif phase == "process":
+                current = (lineTime, phase,
+                           namesByPath.get(os.path.basename(match.group('path'))))
+            else:
+                current = (lineTime, phase, normalisePackageName(match.group('name')))
+            break
+
+    if timedLines:
+        finish(timedLines[-1][0])
+
+    return times
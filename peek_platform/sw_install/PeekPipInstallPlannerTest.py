@@ -0,0 +1,103 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from peek_platform.sw_install.PeekPipInstallPlanner import PeekPipInstallPlanner, \
+    parsePackageFileName, pipPhaseTimes, sameVersion, REASON_NOT_INSTALLED, \
+    REASON_VERSION_CHANGED, REASON_CONTENT_CHANGED
+
+
+class PeekPipInstallPlannerTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.releaseDir = os.path.join(self._dir.name, 'release')
+        os.mkdir(self.releaseDir)
+        self.planner = PeekPipInstallPlanner(os.path.join(self._dir.name, 'state.json'))
+
+    def _writePackage(self, fileName, content=b'package'):
+        path = os.path.join(self.releaseDir, fileName)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _writeFakePip(self, output):
+        path = os.path.join(self._dir.name, 'pip')
+        with open(path, 'w') as f:
+            f.write("#!/bin/sh\ncat <<'EOF'\n%s\nEOF\n" % output)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+
+    def testParsePackageFileName(self):
+        self.assertEqual(parsePackageFileName('Peek_Platform-0.4.1-py3-none-any.whl'),
+                         ('peek-platform', '0.4.1'))
+        self.assertEqual(parsePackageFileName('json-cfg-rw-0.5.0.tar.gz'),
+                         ('json-cfg-rw', '0.5.0'))
+        self.assertIsNone(parsePackageFileName('stamp'))
+
+    def testPlanAndInstall(self):
+        paths = [self._writePackage('peek_platform-1.0-py3-none-any.whl'),
+                 self._writePackage('vortexpy-0.2.tar.gz'),
+                 self._writePackage('txhttputil-0.3.tar.gz')]
+        installed = {'peek-platform': '1.0', 'vortexpy': '0.1'}
+
+        plan = self.planner.plan(paths, installed)
+        self.assertEqual([(p.name, p.reason) for p in plan.toInstall],
+                         [('peek-platform', REASON_CONTENT_CHANGED),
+                          ('txhttputil', REASON_NOT_INSTALLED),
+                          ('vortexpy', REASON_VERSION_CHANGED)])
+
+        pipExec = self._writeFakePip("Successfully installed peek-platform-1.0")
+        result = self.planner.install(pipExec, self.releaseDir, plan)
+        self.assertEqual(result.returnCode, 0)
+
+        # The hashes were recorded, nothing has changed now
+        installed.update({'vortexpy': '0.2', 'txhttputil': '0.3'})
+        plan = self.planner.plan(paths, installed)
+        self.assertEqual(plan.toInstall, [])
+        self.assertEqual(len(plan.unchanged), 3)
+
+        # A package rebuilt with the same version
+        self._writePackage('vortexpy-0.2.tar.gz', b'rebuilt')
+        plan = self.planner.plan(paths, installed)
+        self.assertEqual([(p.name, p.reason) for p in plan.toInstall],
+                         [('vortexpy', REASON_CONTENT_CHANGED)])
+
+    def testNonNormalisedVersion(self):
+        self.assertTrue(sameVersion('0.0.6dev123456', '0.0.6.dev123456'))
+        self.assertTrue(sameVersion('1.0', '1.0.0'))
+        self.assertFalse(sameVersion('1.0', '1.0.1'))
+        self.assertFalse(sameVersion('not a version', 'not-a-version'))
+
+        paths = [self._writePackage('peek_platform-0.0.6dev123456.tar.gz')]
+        installed = {'peek-platform': '0.0.6.dev123456'}
+
+        plan = self.planner.plan(paths, installed)
+        self.assertEqual([(p.name, p.reason) for p in plan.toInstall],
+                         [('peek-platform', REASON_CONTENT_CHANGED)])
+
+        self.planner.install(self._writeFakePip(""), self.releaseDir, plan)
+
+        plan = self.planner.plan(paths, installed)
+        self.assertEqual(plan.toInstall, [])
+
+    def testPipPhaseTimes(self):
+        paths = [self._writePackage('peek_platform-1.0-py3-none-any.whl'),
+                 self._writePackage('vortexpy-0.2.tar.gz')]
+        plan = self.planner.plan(paths, {})
+
+        lines = [(0.0, "Processing %s" % paths[0]),
+                 (1.0, "Processing %s" % paths[1]),
+                 (3.0, "Building wheel for vortexpy (setup.py): started"),
+                 (7.0, "Installing collected packages: vortexpy, peek-platform"),
+                 (8.0, "  Attempting uninstall: vortexpy"),
+                 (8.5, "Installing collected packages: vortexpy, peek-platform"),
+                 (10.5, "Successfully installed vortexpy-0.2 peek-platform-1.0"),
+                 (11.0, "")]
+
+        times = pipPhaseTimes(lines, plan)
+        self.assertEqual(times['peek-platform'], {'process': 1.0, 'install': 1.5})
+        self.assertEqual(times['vortexpy'], {'process': 2.0, 'build': 4.0,
+                                             'install': 1.5, 'uninstall': 0.5})
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from typing import Optional
+
+from peek_platform.sw_install.PeekFileHash import fileSha256
+
+logger = logging.getLogger(__name__)
+
+# The kinds of release, the peek server has a download endpoint for each
+RELEASE_KIND_PLATFORM = "platform"
+RELEASE_KIND_PLUGIN = "plugin"
+
+CachedRelease = namedtuple("CachedRelease", ["filePath", "sha256", "sizeBytes"])
+
+# One lock for each cache dir, the managers and the relay share them
+_locks = {}
+_locksLock = threading.Lock()
+
+
+def _dirLock(cacheDir: str) -> threading.Lock:
+    with _locksLock:
+        return _locks.setdefault(os.path.abspath(cacheDir), threading.Lock())
+
+
+class PeekReleaseCache:
+    """ Peek Release Cache
+
+    This class keeps the release tars downloaded from the peek server, named by
+    their SHA-256, so a release is only downloaded once for each node. The index maps
+    the name and version of each release to it's tar.
+
+    The newest keepVersions releases of each name are kept, the tars no release
+    refers to are removed.
+
+    See PeekReleaseRelay, it serves the cache to the other services on the site.
+
+    """
+
+    INDEX_FILE = "index.json"
+    BLOBS_DIR = "sha256"
+
+    def __init__(self, cacheDir: str, keepVersions: int = 2):
+        self._cacheDir = cacheDir
+        self._keepVersions = max(1, keepVersions)
+        self._lock = _dirLock(cacheDir)
+        os.makedirs(os.path.join(cacheDir, self.BLOBS_DIR), exist_ok=True)
+
+    @staticmethod
+    def _key(kind: str, name: str, version: str) -> str:
+        return "%s/%s/%s" % (kind, name, version)
+
+    def _blobPath(self, sha256: str) -> str:
+        return os.path.join(self._cacheDir, self.BLOBS_DIR, sha256)
+
+    def _loadIndex(self) -> {str: dict}:
+        try:
+            with open(os.path.join(self._cacheDir, self.INDEX_FILE)) as f:
+                return json.load(f)
+
+        except FileNotFoundError:
+            return {}
+
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to read the release cache index in %s, %s",
+                           self._cacheDir, e)
+            return {}
+
+    def _saveIndex(self, index: {str: dict}) -> None:
+        fd, tmpPath = tempfile.mkstemp(dir=self._cacheDir, prefix='.index.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        os.replace(tmpPath, os.path.join(self._cacheDir, self.INDEX_FILE))
+
+    def get(self, kind: str, name: str, version: str) -> Optional[CachedRelease]:
+        """ Get
+
+        :return: The cached release, or None if it's not in the cache
+        """
+        if not version:
+            return None
+
+        with self._lock:
+            index = self._loadIndex()
+            entry = index.get(self._key(kind, name, version))
+            if not entry:
+                return None
+
+            filePath = self._blobPath(entry["sha256"])
+            if not os.path.isfile(filePath):
+                del index[self._key(kind, name, version)]
+                self._saveIndex(index)
+                return None
+
+            entry["lastUsed"] = time.time()
+            self._saveIndex(index)
+
+        return CachedRelease(filePath, entry["sha256"], entry["sizeBytes"])
+
+    def add(self, kind: str, name: str, version: str, filePath: str,
+            sha256: Optional[str] = None) -> CachedRelease:
+        """ Add
+
+        Move the downloaded release into the cache.
+
+        :param filePath: The release tar, it's moved into the cache
+        :param sha256: The SHA-256 of the release, if it's already known
+        """
+        if sha256 is None:
+            sha256 = fileSha256(filePath)
+
+        blobPath = self._blobPath(sha256)
+        sizeBytes = os.path.getsize(filePath)
+
+        # The tmp dir may be on another file system, so the move may be a copy, it's
+        # moved beside the blob before the lock is taken
+        tmpPath = "%s.%s.%s.tmp" % (blobPath, os.getpid(), threading.get_ident())
+        shutil.move(filePath, tmpPath)
+
+        try:
+            with self._lock:
+                if os.path.isfile(blobPath):
+                    os.remove(tmpPath)
+                else:
+                    os.replace(tmpPath, blobPath)
+
+                index = self._loadIndex()
+                index[self._key(kind, name, version)] = {"sha256": sha256,
+                                                         "sizeBytes": sizeBytes,
+                                                         "lastUsed": time.time()}
+                self._prune(index, kind, name)
+                self._saveIndex(index)
+
+        finally:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+        logger.debug("Cached %s %s %s, %s", kind, name, version, sha256)
+        return CachedRelease(blobPath, sha256, sizeBytes)
+
+    def _prune(self, index: {str: dict}, kind: str, name: str) -> None:
+        prefix = "%s/%s/" % (kind, name)
+        keys = sorted((k for k in index if k.startswith(prefix)),
+                      key=lambda k: index[k]["lastUsed"], reverse=True)
+        for key in keys[self._keepVersions:]:
+            del index[key]
+
+        referenced = {e["sha256"] for e in index.values()}
+        blobsDir = os.path.join(self._cacheDir, self.BLOBS_DIR)
+        for fileName in os.listdir(blobsDir):
+            if len(fileName) == 64 and fileName not in referenced:
+                os.remove(os.path.join(blobsDir, fileName))
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from peek_platform.sw_install.PeekReleaseCache import PeekReleaseCache, \
+    RELEASE_KIND_PLATFORM, RELEASE_KIND_PLUGIN
+
+
+class PeekReleaseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.cache = PeekReleaseCache(os.path.join(self._dir.name, 'cache'),
+                                      keepVersions=2)
+
+    def _writeRelease(self, content):
+        fd, path = tempfile.mkstemp(dir=self._dir.name)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _blobs(self):
+        return sorted(os.listdir(os.path.join(self._dir.name, 'cache', 'sha256')))
+
+    def testAddAndGet(self):
+        self.assertIsNone(self.cache.get(RELEASE_KIND_PLATFORM, 'peek_agent', '1.0'))
+
+        path = self._writeRelease(b'release 1.0')
+        cached = self.cache.add(RELEASE_KIND_PLATFORM, 'peek_agent', '1.0', path)
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(cached.sha256, hashlib.sha256(b'release 1.0').hexdigest())
+        self.assertEqual(self.cache.get(RELEASE_KIND_PLATFORM, 'peek_agent', '1.0'),
+                         cached)
+        self.assertIsNone(self.cache.get(RELEASE_KIND_PLUGIN, 'peek_agent', '1.0'))
+        self.assertIsNone(self.cache.get(RELEASE_KIND_PLATFORM, 'peek_agent', None))
+
+    def testSameContentIsStoredOnce(self):
+        for name in ('peek_agent', 'peek_worker'):
+            self.cache.add(RELEASE_KIND_PLATFORM, name, '1.0',
+                           self._writeRelease(b'release 1.0'))
+
+        self.assertEqual(len(self._blobs()), 1)
+
+    def testPrune(self):
+        for version in ('1.0', '1.1', '1.2'):
+            self.cache.add(RELEASE_KIND_PLUGIN, 'peek_plugin_noop', version,
+                           self._writeRelease(version.encode()))
+
+        self.assertIsNone(self.cache.get(RELEASE_KIND_PLUGIN, 'peek_plugin_noop', '1.0'))
+        self.assertIsNotNone(self.cache.get(RELEASE_KIND_PLUGIN, 'peek_plugin_noop', '1.2'))
+        self.assertEqual(self._blobs(),
+                         sorted(hashlib.sha256(v).hexdigest() for v in (b'1.1', b'1.2')))
+
+    def testMissingBlob(self):
+        cached = self.cache.add(RELEASE_KIND_PLATFORM, 'peek_agent', '1.0',
+                                self._writeRelease(b'release 1.0'))
+        os.remove(cached.filePath)
+
+        self.assertIsNone(self.cache.get(RELEASE_KIND_PLATFORM, 'peek_agent', '1.0'))
+
+    def testMoveIsNotLocked(self):
+        moveLocked = []
+
+        def move(src, dst):
+            # The move may be a copy, the other services can use the cache meanwhile
+            moveLocked.append(self.cache._lock.locked())
+            return realMove(src, dst)
+
+        realMove = shutil.move
+        with mock.patch.object(shutil, 'move', move):
+            cached = self.cache.add(RELEASE_KIND_PLATFORM, 'peek_agent', '1.0',
+                                    self._writeRelease(b'release 1.0'))
+
+        self.assertEqual(moveLocked, [False])
+        self.assertTrue(os.path.isfile(cached.filePath))
+        self.assertEqual(self._blobs(), [cached.sha256])
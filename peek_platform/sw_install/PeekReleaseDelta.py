@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+from collections import namedtuple
+
+from peek_platform.sw_install.PeekFileHash import fileSha256
+from peek_platform.sw_install.PeekReleaseStreamExtractor import \
+    PeekReleaseStreamExtractor
+
+logger = logging.getLogger(__name__)
+
+DELTA_MANIFEST_FILE = "delta_manifest.json"
+"""The first entry of a delta release, it lists every file in the full release"""
+
+DELTA_FILES_DIR = "files"
+"""The dir in a delta release with the files the agent doesn't have, by SHA-256"""
+
+# The number of hex digits of each SHA-256 the agent sends, to keep the url short
+HAVE_HASH_PREFIX_LENGTH = 16
+
+DeltaRebuildStats = namedtuple("DeltaRebuildStats",
+                               ["version", "fileCount", "cachedFileCount",
+                                "cachedBytes", "downloadedFileCount"])
+
+
+class PeekReleaseFileCache:
+    """ Peek Release File Cache
+
+    This class keeps the files of the installed release, named by their SHA-256, so
+    the next release can be rebuilt from a delta that only contains the files that
+    changed.
+
+    """
+
+    def __init__(self, cacheDir: str):
+        self._cacheDir = cacheDir
+        os.makedirs(cacheDir, exist_ok=True)
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self._cacheDir, sha256)
+
+    def has(self, sha256: str) -> bool:
+        return os.path.isfile(self.path(sha256))
+
+    @property
+    def sha256s(self) -> [str]:
+        return sorted(name for name in os.listdir(self._cacheDir)
+                      if len(name) == 64 and not name.startswith('.'))
+
+    def havePrefixes(self) -> [str]:
+        """ Have Prefixes
+
+        :return: The start of each SHA-256 in the cache, for the delta request
+        """
+        return [s[:HAVE_HASH_PREFIX_LENGTH] for s in self.sha256s]
+
+    def add(self, filePath: str) -> str:
+        """ Add
+
+        :return: The SHA-256 of the file
+        """
+        sha256 = fileSha256(filePath)
+        if self.has(sha256):
+            return sha256
+
+        fd, tmpPath = tempfile.mkstemp(dir=self._cacheDir, prefix='.add.')
+        os.close(fd)
+        shutil.copyfile(filePath, tmpPath)
+        os.replace(tmpPath, self.path(sha256))
+        return sha256
+
+    def replaceWithDir(self, releaseDir: str) -> None:
+        """ Replace With Dir
+
+        Cache the files of the release that was just installed, and remove the
+        files of the older releases.
+        """
+        keep = set()
+        for dirPath, dirNames, fileNames in os.walk(releaseDir):
+            for fileName in fileNames:
+                keep.add(self.add(os.path.join(dirPath, fileName)))
+
+        for sha256 in self.sha256s:
+            if sha256 not in keep:
+                os.remove(self.path(sha256))
+
+
+def rebuildReleaseFromDelta(deltaTarPath: str, cache: PeekReleaseFileCache,
+                            releaseTarPath: str) -> DeltaRebuildStats:
+    """ Rebuild Release From Delta
+
+    Write the full release tar, from the files in the delta and the files in the
+    cache. Every file is checked against the SHA-256 in the delta manifest.
+
+    The manifest looks like
+
+        {"version": "0.5.1", "fromVersion": "0.5.0",
+         "files": [{"path": "peek-release/stamp", "sha256": "...", "mode": 420}]}
+
+    """
+    deltaDir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(releaseTarPath)),
+                                prefix='.delta_')
+    try:
+        PeekReleaseStreamExtractor(deltaDir).extractFile(deltaTarPath)
+
+        with open(os.path.join(deltaDir, DELTA_MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        tmpTarPath = releaseTarPath + '.tmp'
+        try:
+            _writeReleaseTar(tmpTarPath, manifest, deltaDir, cache)
+        except Exception:
+            if os.path.exists(tmpTarPath):
+                os.remove(tmpTarPath)
+            raise
+
+        os.replace(tmpTarPath, releaseTarPath)
+
+        cachedFiles = [e for e in manifest["files"]
+                       if not os.path.isfile(os.path.join(deltaDir, DELTA_FILES_DIR,
+                                                          e["sha256"]))]
+
+        return DeltaRebuildStats(
+            version=manifest["version"],
+            fileCount=len(manifest["files"]),
+            cachedFileCount=len(cachedFiles),
+            cachedBytes=sum(os.path.getsize(cache.path(e["sha256"]))
+                            for e in cachedFiles),
+            downloadedFileCount=len(manifest["files"]) - len(cachedFiles))
+
+    finally:
+        shutil.rmtree(deltaDir, ignore_errors=True)
+
+
+def _writeReleaseTar(tarPath: str, manifest: dict, deltaDir: str,
+                     cache: PeekReleaseFileCache) -> None:
+    with tarfile.open(tarPath, 'w') as tar:
+        for entry in manifest["files"]:
+            sha256 = entry["sha256"]
+
+            if entry.get("diffBase"):
+                raise Exception("Delta file %s is a binary diff, they are not"
+                                " supported" % entry["path"])
+
+            sourcePath = os.path.join(deltaDir, DELTA_FILES_DIR, sha256)
+            if os.path.isfile(sourcePath):
+                if fileSha256(sourcePath) != sha256:
+                    raise Exception("Delta file %s failed the SHA-256 check"
+                                    % entry["path"])
+
+            elif cache.has(sha256):
+                sourcePath = cache.path(sha256)
+
+            else:
+                raise Exception("Delta file %s, %s isn't in the delta or the"
+                                " cache" % (entry["path"], sha256))
+
+            info = tar.gettarinfo(sourcePath, arcname=entry["path"])
+            info.mode = entry.get("mode", 0o644)
+            with open(sourcePath, 'rb') as f:
+                tar.addfile(info, f)
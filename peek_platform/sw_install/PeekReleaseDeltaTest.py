@@ -0,0 +1,108 @@
+import hashlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+import unittest
+
+from peek_platform.sw_install.PeekReleaseDelta import PeekReleaseFileCache, \
+    rebuildReleaseFromDelta, DELTA_MANIFEST_FILE, DELTA_FILES_DIR
+
+
+class PeekReleaseDeltaTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.cache = PeekReleaseFileCache(os.path.join(self._dir.name, 'cache'))
+        self.releaseTarPath = os.path.join(self._dir.name, 'release.tar')
+
+    def _path(self, *names):
+        return os.path.join(self._dir.name, *names)
+
+    def _writeDelta(self, entries, includedContents, diffBase=None):
+        """ Write a delta with the files in includedContents, by their SHA-256 """
+        files = [{"path": path, "sha256": hashlib.sha256(content).hexdigest(),
+                  "mode": 0o644}
+                 for path, content in entries]
+        if diffBase:
+            files[0]["diffBase"] = diffBase
+
+        manifest = {"version": "2.0", "fromVersion": "1.0", "files": files}
+
+        deltaPath = self._path('delta.tar.gz')
+        with tarfile.open(deltaPath, 'w:gz') as tar:
+            def add(name, data):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+
+            add(DELTA_MANIFEST_FILE, json.dumps(manifest).encode())
+            for content in includedContents:
+                add(DELTA_FILES_DIR + '/' + hashlib.sha256(content).hexdigest(),
+                    content)
+
+        return deltaPath
+
+    def _cacheRelease(self, files):
+        releaseDir = self._path('installed')
+        for path, content in files:
+            filePath = os.path.join(releaseDir, path)
+            os.makedirs(os.path.dirname(filePath), exist_ok=True)
+            with open(filePath, 'wb') as f:
+                f.write(content)
+
+        self.cache.replaceWithDir(releaseDir)
+
+    def testReplaceWithDir(self):
+        self._cacheRelease([('peek-release/a.whl', b'a1'),
+                            ('peek-release/b.whl', b'b1')])
+        self.assertEqual(len(self.cache.sha256s), 2)
+
+        os.remove(self._path('installed', 'peek-release', 'a.whl'))
+        self._cacheRelease([('peek-release/b.whl', b'b1'),
+                            ('peek-release/c.whl', b'c1')])
+
+        self.assertEqual(set(self.cache.sha256s),
+                         {hashlib.sha256(c).hexdigest() for c in (b'b1', b'c1')})
+        self.assertEqual(len(self.cache.havePrefixes()[0]), 16)
+
+    def testRebuild(self):
+        self._cacheRelease([('peek-release/a.whl', b'a1'),
+                            ('peek-release/b.whl', b'b1')])
+
+        files = [('peek-release/a.whl', b'a1'),
+                 ('peek-release/b.whl', b'b2'),
+                 ('peek-release/stamp', b'2.0')]
+        deltaPath = self._writeDelta(files, [b'b2', b'2.0'])
+
+        stats = rebuildReleaseFromDelta(deltaPath, self.cache, self.releaseTarPath)
+
+        self.assertEqual(stats.version, "2.0")
+        self.assertEqual((stats.fileCount, stats.cachedFileCount,
+                          stats.downloadedFileCount), (3, 1, 2))
+        self.assertEqual(stats.cachedBytes, 2)
+
+        with tarfile.open(self.releaseTarPath) as tar:
+            contents = {m.name: tar.extractfile(m).read() for m in tar.getmembers()}
+        self.assertEqual(contents, dict(files))
+
+        # Only the release is left, the delta is extracted to a temp dir
+        self.assertEqual(sorted(os.listdir(self._dir.name)),
+                         ['cache', 'delta.tar.gz', 'installed', 'release.tar'])
+
+    def testRebuildMissingFile(self):
+        deltaPath = self._writeDelta([('peek-release/a.whl', b'a1')], [])
+
+        with self.assertRaisesRegex(Exception, "isn't in the delta or the cache"):
+            rebuildReleaseFromDelta(deltaPath, self.cache, self.releaseTarPath)
+
+        self.assertFalse(os.path.exists(self.releaseTarPath))
+
+    def testRebuildBinaryDiff(self):
+        deltaPath = self._writeDelta([('peek-release/a.whl', b'a1')], [b'a1'],
+                                     diffBase='0' * 64)
+
+        with self.assertRaisesRegex(Exception, "not supported"):
+            rebuildReleaseFromDelta(deltaPath, self.cache, self.releaseTarPath)
@@ -0,0 +1,313 @@
+import base64
+import binascii
+import http.client
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from peek_platform.sw_install.PeekFileHash import fileSha256
+
+logger = logging.getLogger(__name__)
+
+# The header the peek server sends the SHA-256 of the release in, as hex.
+# A "Digest: SHA-256=<base64>" header is used if it's not sent.
+PEEK_CONTENT_SHA256_HEADER = "X-Peek-Content-SHA256"
+
+ReleaseDownloadResult = namedtuple("ReleaseDownloadResult",
+                                   ["filePath", "sizeBytes", "sha256", "verified",
+                                    "resumedBytes", "segmentCount", "retryCount",
+                                    "seconds"])
+
+_ReleaseInfo = namedtuple("_ReleaseInfo", ["sizeBytes", "sha256", "rangesSupported"])
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes \d+-\d+/(\d+)$')
+
+
+def _headerSha256(headers) -> Optional[str]:
+    """ Header SHA-256
+
+    :return: The hex SHA-256 the server sent, or None
+    """
+    sha256 = headers.get(PEEK_CONTENT_SHA256_HEADER)
+    if sha256:
+        return sha256.strip().lower()
+
+    for digest in (headers.get("Digest") or "").split(','):
+        algorithm, _, value = digest.strip().partition('=')
+        if algorithm.lower() == 'sha-256' and value:
+            try:
+                return binascii.hexlify(base64.b64decode(value)).decode()
+            except (binascii.Error, ValueError):
+                logger.warning("Ignoring the malformed Digest header %s", digest)
+
+    return None
+
+
+class _Segment:
+    """ Segment
+
+    The range of the file one thread downloads, offset is the next byte to fetch.
+    """
+
+    def __init__(self, start: int, end: int, offset: Optional[int] = None):
+        self.start = start
+        self.end = end
+        self.offset = start if offset is None else offset
+
+    @property
+    def done(self) -> bool:
+        return self.offset >= self.end
+
+
+class PeekReleaseDownloader:
+    """ Peek Release Downloader
+
+    This class downloads a release to a file, so it can be checked before it's
+    extracted.
+
+     * Large releases are fetched in segments, in parallel, with HTTP Range requests.
+     * A dropped connection is resumed from the last byte received, and a download
+       interrupted by a restart is resumed from the .part file.
+     * The file is checked against the SHA-256 the server sends, see
+       PEEK_CONTENT_SHA256_HEADER, a file that doesn't match is deleted.
+
+    If the server doesn't support ranges the file is downloaded in one request, and
+    restarted from the start if the connection drops.
+
+    The download blocks, run it in a thread.
+
+    """
+
+    READ_SIZE = 256 * 1024
+
+    # Save the progress of the segments this often, for resuming after a restart
+    SAVE_PROGRESS_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, segmentCount: int = 4,
+                 segmentMinBytes: int = 16 * 1024 * 1024,
+                 maxRetries: int = 5,
+                 retryDelaySeconds: float = 1.0,
+                 timeoutSeconds: float = 60.0):
+        self._segmentCount = max(1, segmentCount)
+        self._segmentMinBytes = segmentMinBytes
+        self._maxRetries = maxRetries
+        self._retryDelaySeconds = retryDelaySeconds
+        self._timeoutSeconds = timeoutSeconds
+
+        self._lock = threading.Lock()
+        self._retryCount = 0
+
+    def download(self, url: str, filePath: str) -> Optional[ReleaseDownloadResult]:
+        """ Download
+
+        :return: The result, or None if the server has no release for us.
+        """
+        startTime = time.time()
+        self._retryCount = 0
+
+        info = self._retry(self._fetchInfo, url)
+        if not info.sizeBytes:
+            return None
+
+        partPath = filePath + '.part'
+        progressPath = filePath + '.part.json'
+
+        segments = self._loadProgress(progressPath, url, info)
+        resumedBytes = sum(s.offset - s.start for s in segments)
+        if resumedBytes:
+            logger.info("Resuming the download of %s from %s of %s bytes",
+                        url, resumedBytes, info.sizeBytes)
+        else:
+            segments = self._makeSegments(info)
+            with open(partPath, 'wb') as f:
+                f.truncate(info.sizeBytes)
+
+        self._saveProgress(progressPath, url, info, segments)
+
+        if len(segments) == 1:
+            self._fetchSegment(url, partPath, progressPath, info, segments, segments[0])
+
+        else:
+            with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                futures = [executor.submit(self._fetchSegment, url, partPath,
+                                           progressPath, info, segments, segment)
+                           for segment in segments]
+                for future in futures:
+                    future.result()
+
+        sha256 = fileSha256(partPath)
+        if info.sha256 and sha256 != info.sha256:
+            os.remove(partPath)
+            os.remove(progressPath)
+            raise Exception("Release download %s failed the SHA-256 check,"
+                            " expected %s, got %s" % (url, info.sha256, sha256))
+
+        if not info.sha256:
+            logger.warning("The server didn't send a SHA-256 for %s,"
+                           " the download can't be verified", url)
+
+        os.replace(partPath, filePath)
+        os.remove(progressPath)
+
+        return ReleaseDownloadResult(filePath=filePath,
+                                     sizeBytes=info.sizeBytes,
+                                     sha256=sha256,
+                                     verified=bool(info.sha256),
+                                     resumedBytes=resumedBytes,
+                                     segmentCount=len(segments),
+                                     retryCount=self._retryCount,
+                                     seconds=time.time() - startTime)
+
+    def _retry(self, call, *args):
+        attempt = 0
+        while True:
+            try:
+                return call(*args)
+
+            except (OSError, http.client.HTTPException) as e:
+                # urllib.error.URLError and socket.timeout are OSErrors
+                if isinstance(e, urllib.error.HTTPError) and e.code < 500:
+                    raise
+
+                attempt += 1
+                with self._lock:
+                    self._retryCount += 1
+
+                if attempt > self._maxRetries:
+                    raise
+
+                logger.debug("Retrying the release download, %s", e)
+                time.sleep(self._retryDelaySeconds * attempt)
+
+    def _fetchInfo(self, url: str) -> _ReleaseInfo:
+        """ Fetch Info
+
+        Request the first byte, the response says if ranges are supported, the size,
+        and the SHA-256.
+        """
+        request = urllib.request.Request(url, headers={"Range": "bytes=0-0"})
+        try:
+            response = urllib.request.urlopen(request, timeout=self._timeoutSeconds)
+
+        except urllib.error.HTTPError as e:
+            # The release is empty, there's no first byte
+            if e.code == 416:
+                return _ReleaseInfo(0, None, True)
+            raise
+
+        with response:
+            sha256 = _headerSha256(response.headers)
+
+            if response.status == 206:
+                match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+                if match:
+                    return _ReleaseInfo(int(match.group(1)), sha256, True)
+
+            contentLength = response.headers.get("Content-Length")
+            if contentLength is not None:
+                return _ReleaseInfo(int(contentLength), sha256, False)
+
+            # There's no length, read it all to find out
+            return _ReleaseInfo(len(response.read()), sha256, False)
+
+    def _makeSegments(self, info: _ReleaseInfo) -> [_Segment]:
+        if not info.rangesSupported or info.sizeBytes < self._segmentMinBytes:
+            return [_Segment(0, info.sizeBytes)]
+
+        segmentBytes = -(-info.sizeBytes // self._segmentCount)
+        return [_Segment(start, min(start + segmentBytes, info.sizeBytes))
+                for start in range(0, info.sizeBytes, segmentBytes)]
+
+    def _loadProgress(self, progressPath: str, url: str,
+                      info: _ReleaseInfo) -> [_Segment]:
+        if not info.rangesSupported or not os.path.exists(progressPath):
+            return []
+
+        try:
+            with open(progressPath) as f:
+                progress = json.load(f)
+
+            # Only resume the same release
+            if (progress["url"] != url or progress["sizeBytes"] != info.sizeBytes
+                    or progress["sha256"] != info.sha256
+                    or os.path.getsize(progressPath[:-len('.json')]) != info.sizeBytes):
+                return []
+
+            return [_Segment(*s) for s in progress["segments"]]
+
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug("Not resuming the download of %s, %s", url, e)
+            return []
+
+    def _saveProgress(self, progressPath: str, url: str, info: _ReleaseInfo,
+                      segments: [_Segment]) -> None:
+        with self._lock:
+            progress = {"url": url,
+                        "sizeBytes": info.sizeBytes,
+                        "sha256": info.sha256,
+                        "segments": [[s.start, s.end, s.offset] for s in segments]}
+
+            tmpPath = progressPath + '.tmp'
+            with open(tmpPath, 'w') as f:
+                json.dump(progress, f)
+            os.replace(tmpPath, progressPath)
+
+    def _fetchSegment(self, url: str, partPath: str, progressPath: str,
+                      info: _ReleaseInfo, segments: [_Segment],
+                      segment: _Segment) -> None:
+        def fetch():
+            # Without ranges, a dropped download starts again
+            if not info.rangesSupported:
+                segment.offset = segment.start
+
+            headers = {}
+            if info.rangesSupported:
+                headers["Range"] = "bytes=%s-%s" % (segment.offset, segment.end - 1)
+
+            request = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(request, timeout=self._timeoutSeconds) as response, \
+                    open(partPath, 'r+b') as f:
+                if info.rangesSupported and response.status != 206:
+                    raise http.client.HTTPException(
+                        "Expected a partial response, got %s" % response.status)
+
+                f.seek(segment.offset)
+                unsavedBytes = 0
+
+                while not segment.done:
+                    data = response.read(min(self.READ_SIZE, segment.end - segment.offset))
+                    if not data:
+                        raise http.client.IncompleteRead(
+                            b'', segment.end - segment.offset)
+
+                    f.write(data)
+                    segment.offset += len(data)
+                    unsavedBytes += len(data)
+
+                    if unsavedBytes >= self.SAVE_PROGRESS_BYTES:
+                        f.flush()
+                        self._saveProgress(progressPath, url, info, segments)
+                        unsavedBytes = 0
+
+                f.flush()
+
+            self._saveProgress(progressPath, url, info, segments)
+
+        def fetchAndSave():
+            try:
+                fetch()
+            except Exception:
+                if info.rangesSupported:
+                    self._saveProgress(progressPath, url, info, segments)
+                raise
+
+        self._retry(fetchAndSave)
+
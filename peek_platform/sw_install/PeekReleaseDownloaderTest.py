@@ -0,0 +1,148 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from peek_platform.sw_install.PeekReleaseDownloader import PeekReleaseDownloader, \
+    PEEK_CONTENT_SHA256_HEADER
+
+
+class _FlakyReleaseHandler(BaseHTTPRequestHandler):
+    """ Serves the release, dropping the connection part way through the first
+    dropCount responses """
+
+    protocol_version = "HTTP/1.1"
+
+    release = b''
+    sha256 = None
+    rangesSupported = True
+    dropCount = 0
+    ranges = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        body = cls.release
+        start, end = 0, len(body) - 1
+
+        rangeHeader = self.headers.get("Range")
+        if rangeHeader and cls.rangesSupported:
+            match = re.match(r'bytes=(\d+)-(\d*)', rangeHeader)
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %s-%s/%s" % (start, end, len(body)))
+        else:
+            self.send_response(200)
+
+        with cls.lock:
+            cls.ranges.append((start, end))
+            drop = cls.dropCount > 0 and end - start > 1
+            if drop:
+                cls.dropCount -= 1
+
+        if cls.sha256:
+            self.send_header(PEEK_CONTENT_SHA256_HEADER, cls.sha256)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        data = body[start:end + 1]
+        if drop:
+            self.wfile.write(data[:len(data) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class PeekReleaseDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.filePath = os.path.join(self._dir.name, 'release.tar.gz')
+
+        self.release = os.urandom(1024 * 1024 + 7)
+        _FlakyReleaseHandler.release = self.release
+        _FlakyReleaseHandler.sha256 = hashlib.sha256(self.release).hexdigest()
+        _FlakyReleaseHandler.rangesSupported = True
+        _FlakyReleaseHandler.dropCount = 0
+        _FlakyReleaseHandler.ranges = []
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _FlakyReleaseHandler)
+        self.server.daemon_threads = True
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.url = "http://127.0.0.1:%s/release" % self.server.server_port
+        self.downloader = PeekReleaseDownloader(segmentCount=4,
+                                                segmentMinBytes=64 * 1024,
+                                                retryDelaySeconds=0.01,
+                                                timeoutSeconds=5)
+
+    def _readFile(self):
+        with open(self.filePath, 'rb') as f:
+            return f.read()
+
+    def testSegmentedWithDrops(self):
+        _FlakyReleaseHandler.dropCount = 3
+
+        result = self.downloader.download(self.url, self.filePath)
+
+        self.assertEqual(self._readFile(), self.release)
+        self.assertTrue(result.verified)
+        self.assertEqual(result.segmentCount, 4)
+        self.assertEqual(result.retryCount, 3)
+        self.assertEqual(os.listdir(self._dir.name), ['release.tar.gz'])
+
+        # The retries resumed from where the drops stopped, not the segment starts
+        segmentStarts = {0, 262144, 524288, 786432}
+        retryStarts = [s for s, e in _FlakyReleaseHandler.ranges[1 + 4:]]
+        self.assertTrue(retryStarts)
+        self.assertFalse(set(retryStarts) & segmentStarts)
+
+    def testResumeAfterRestart(self):
+        _FlakyReleaseHandler.dropCount = 100
+        downloader = PeekReleaseDownloader(segmentCount=1, maxRetries=0,
+                                           retryDelaySeconds=0.01, timeoutSeconds=5)
+
+        with self.assertRaises(Exception):
+            downloader.download(self.url, self.filePath)
+
+        _FlakyReleaseHandler.dropCount = 0
+        result = downloader.download(self.url, self.filePath)
+
+        self.assertEqual(result.resumedBytes, len(self.release) // 2)
+        self.assertEqual(self._readFile(), self.release)
+
+    def testChecksumMismatch(self):
+        _FlakyReleaseHandler.sha256 = hashlib.sha256(b'other').hexdigest()
+
+        with self.assertRaisesRegex(Exception, "SHA-256"):
+            self.downloader.download(self.url, self.filePath)
+
+        self.assertEqual(os.listdir(self._dir.name), [])
+
+    def testRangesNotSupported(self):
+        _FlakyReleaseHandler.rangesSupported = False
+        _FlakyReleaseHandler.dropCount = 1
+
+        result = self.downloader.download(self.url, self.filePath)
+
+        self.assertEqual(result.segmentCount, 1)
+        self.assertEqual(self._readFile(), self.release)
+
+    def testNoRelease(self):
+        _FlakyReleaseHandler.release = b''
+        _FlakyReleaseHandler.rangesSupported = False
+
+        self.assertIsNone(self.downloader.download(self.url, self.filePath))
@@ -0,0 +1,284 @@
+""" Peek Release Relay
+
+Serves the releases in the release caches to the other services on the site, so
+each release is downloaded from the peek server once for each site.
+
+A service starts the relay with startReleaseRelay when platform.releaseRelayPort is
+set, the other services point releaseRelay.host and releaseRelay.port at it.
+
+Run a standalone relay with :
+
+    python -m peek_platform.sw_install.PeekReleaseRelay \\
+        --upstream-host 10.0.0.1 --upstream-port 8011 --port 8012 --cache-dir relay
+
+"""
+import argparse
+import logging
+import os
+import sys
+import urllib.error
+import urllib.parse
+from typing import Optional
+from weakref import WeakSet
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+from twisted.internet.threads import deferToThread
+from twisted.web import server, static
+from twisted.web.resource import Resource
+
+from peek_platform.sw_install.PeekReleaseCache import PeekReleaseCache, \
+    CachedRelease, RELEASE_KIND_PLATFORM, RELEASE_KIND_PLUGIN
+from peek_platform.sw_install.PeekReleaseDownloader import PeekReleaseDownloader, \
+    PEEK_CONTENT_SHA256_HEADER
+
+logger = logging.getLogger(__name__)
+
+
+def releaseDownloadPath(kind: str) -> str:
+    """ Release Download Path
+
+    :return: The path of the peek server download endpoint for the kind of release
+    """
+    return "peek_server.sw_install.%s.download" % kind
+
+
+class _ReleaseDownloadResource(Resource):
+    isLeaf = True
+
+    def __init__(self, relay: 'PeekReleaseRelayResource', kind: str):
+        Resource.__init__(self)
+        self._relay = relay
+        self._kind = kind
+
+    def render_GET(self, request):
+        def arg(name):
+            values = request.args.get(name.encode())
+            return values[0].decode() if values else None
+
+        name, version = arg("name"), arg("version")
+        if not name:
+            request.setResponseCode(400)
+            return b'The name argument is required'
+
+        # The latest release may change, only the versioned ones are cached
+        if not version:
+            return self._relay.redirectUpstream(request)
+
+        self._relay.watchDisconnect(request)
+
+        def fetchIfNotCached(cached):
+            if cached:
+                return cached
+            return self._relay.fetch(self._kind, name, version)
+
+        # The cache reads it's index from disk, so it's not done on the reactor thread
+        d = deferToThread(self._relay.cache(self._kind).get, self._kind, name, version)
+        d.addCallback(fetchIfNotCached)
+        d.addCallback(lambda cached: self._relay.serveLater(request, cached))
+        d.addErrback(lambda failure: self._relay.failLater(request, failure))
+        return server.NOT_DONE_YET
+
+
+class _UpstreamRedirectResource(Resource):
+    isLeaf = True
+
+    def __init__(self, relay: 'PeekReleaseRelayResource'):
+        Resource.__init__(self)
+        self._relay = relay
+
+    def render(self, request):
+        return self._relay.redirectUpstream(request)
+
+
+class PeekReleaseRelayResource(Resource):
+    """ Peek Release Relay Resource
+
+    Serves the peek server release download endpoints from the release caches. A
+    release that isn't cached is downloaded from the peek server once, the requests
+    for it wait for that download.
+
+    The other requests, EG the delta downloads, are redirected to the peek server.
+
+    """
+
+    def __init__(self, caches: {str: PeekReleaseCache}, upstreamHost: str,
+                 upstreamPort: int, tmpPath: str,
+                 downloader: Optional[PeekReleaseDownloader] = None):
+        Resource.__init__(self)
+        self._caches = caches
+        self._upstreamUrl = "http://%s:%s" % (upstreamHost, upstreamPort)
+        self._tmpPath = tmpPath
+        self._downloader = downloader if downloader else PeekReleaseDownloader()
+
+        # The waiting deferreds of each release being downloaded
+        self._fetching = {}
+
+        # The requests that were closed before they were answered
+        self._disconnected = WeakSet()
+
+        for kind in caches:
+            self.putChild(releaseDownloadPath(kind).encode(),
+                          _ReleaseDownloadResource(self, kind))
+
+        self._redirect = _UpstreamRedirectResource(self)
+
+    def getChild(self, path, request):
+        return self._redirect
+
+    def cache(self, kind: str) -> PeekReleaseCache:
+        return self._caches[kind]
+
+    def redirectUpstream(self, request) -> bytes:
+        request.redirect((self._upstreamUrl + request.uri.decode()).encode())
+        return b''
+
+    def watchDisconnect(self, request) -> None:
+        """ Watch Disconnect
+
+        Record the request if it's closed before it's answered, so the answer isn't
+        written to it.
+        """
+        request.notifyFinish().addErrback(lambda _: self._disconnected.add(request))
+
+    def _isGone(self, request) -> bool:
+        return request.finished or request in self._disconnected
+
+    def fetch(self, kind: str, name: str, version: str) -> Deferred:
+        """ Fetch
+
+        :return: A deferred that fires with the CachedRelease, or None if the peek
+            server doesn't have the release
+        """
+        key = (kind, name, version)
+        waiter = Deferred()
+
+        if key in self._fetching:
+            self._fetching[key].append(waiter)
+            return waiter
+
+        self._fetching[key] = [waiter]
+
+        def done(result):
+            for d in self._fetching.pop(key):
+                if isinstance(result, CachedRelease) or result is None:
+                    d.callback(result)
+                else:
+                    d.errback(result)
+
+        fetchD = deferToThread(self._blockingFetch, kind, name, version)
+        fetchD.addBoth(done)
+        return waiter
+
+    def _blockingFetch(self, kind: str, name: str,
+                       version: str) -> Optional[CachedRelease]:
+        url = "%s/%s?%s" % (self._upstreamUrl, releaseDownloadPath(kind),
+                            urllib.parse.urlencode({"name": name, "version": version}))
+
+        logger.info("Relay is downloading %s %s %s", kind, name, version)
+        filePath = os.path.join(self._tmpPath,
+                                'relay-%s-%s-%s.tar.gz' % (kind, name, version))
+
+        download = self._downloader.download(url, filePath)
+        if not download:
+            return None
+
+        return self.cache(kind).add(kind, name, version, download.filePath,
+                                    sha256=download.sha256)
+
+    @staticmethod
+    def serve(request, cached: Optional[CachedRelease]):
+        if not cached:
+            # The same as the peek server, an empty response when there's no release
+            request.setHeader(b'Content-Length', b'0')
+            return b''
+
+        request.setHeader(PEEK_CONTENT_SHA256_HEADER.encode(), cached.sha256.encode())
+
+        # static.File supports the Range requests PeekReleaseDownloader makes
+        fileResource = static.File(cached.filePath,
+                                   defaultType='application/octet-stream')
+        return fileResource.render(request)
+
+    def serveLater(self, request, cached: Optional[CachedRelease]) -> None:
+        if self._isGone(request):
+            return
+
+        result = self.serve(request, cached)
+        if result is not server.NOT_DONE_YET:
+            request.write(result)
+            request.finish()
+
+    def failLater(self, request, failure) -> None:
+        logger.error("Relay download failed, %s", failure.value)
+        if self._isGone(request):
+            return
+
+        error = failure.value
+        code = error.code if isinstance(error, urllib.error.HTTPError) else 502
+        request.setResponseCode(code)
+        request.write(("Relay download failed, %s" % error).encode())
+        request.finish()
+
+
+def startReleaseRelay():
+    """ Start Release Relay
+
+    Serve the releases in this services release caches, if platform.releaseRelayPort
+    is set.
+
+    :return: The listening port, or None if the relay isn't configured
+    """
+    from peek_platform import PeekPlatformConfig
+    config = PeekPlatformConfig.config
+
+    if config.platformReleaseRelayPort is None:
+        return None
+
+    caches = {
+        RELEASE_KIND_PLATFORM: PeekReleaseCache(config.platformReleaseTarCachePath),
+        RELEASE_KIND_PLUGIN: PeekReleaseCache(config.pluginReleaseTarCachePath)
+    }
+
+    relay = PeekReleaseRelayResource(
+        caches, config.peekServerHost, config.peekServerPort, config.tmpPath,
+        PeekReleaseDownloader(segmentCount=config.platformDownloadSegments))
+
+    listeningPort = reactor.listenTCP(config.platformReleaseRelayPort,
+                                      server.Site(relay))
+    logger.info("Release relay is serving on port %s, for the peek server %s:%s",
+                listeningPort.getHost().port, config.peekServerHost,
+                config.peekServerPort)
+    return listeningPort
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve peek releases to a site")
+    parser.add_argument('--upstream-host', default='127.0.0.1')
+    parser.add_argument('--upstream-port', type=int, default=8011)
+    parser.add_argument('--port', type=int, default=8012,
+                        help="The port to serve on, 0 picks a free port")
+    parser.add_argument('--cache-dir', required=True)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    tmpPath = os.path.join(args.cache_dir, 'tmp')
+    os.makedirs(tmpPath, exist_ok=True)
+
+    caches = {kind: PeekReleaseCache(os.path.join(args.cache_dir, kind))
+              for kind in (RELEASE_KIND_PLATFORM, RELEASE_KIND_PLUGIN)}
+
+    relay = PeekReleaseRelayResource(caches, args.upstream_host, args.upstream_port,
+                                     tmpPath)
+    listeningPort = reactor.listenTCP(args.port, server.Site(relay))
+
+    # The tests read the port from the first line
+    print("Release relay listening on port %s" % listeningPort.getHost().port)
+    sys.stdout.flush()
+
+    reactor.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+from twisted.internet import defer
+from twisted.python.failure import Failure
+from twisted.web import server
+from twisted.web.test.requesthelper import DummyRequest
+
+from peek_platform.sw_install import PeekReleaseRelay
+from peek_platform.sw_install.PeekReleaseCache import PeekReleaseCache, \
+    RELEASE_KIND_PLUGIN
+from peek_platform.sw_install.PeekReleaseDownloader import PeekReleaseDownloader, \
+    PEEK_CONTENT_SHA256_HEADER
+from peek_platform.sw_install.PeekReleaseRelay import PeekReleaseRelayResource, \
+    releaseDownloadPath
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    """ The peek server, it counts the downloads of each url """
+
+    protocol_version = "HTTP/1.1"
+
+    releases = {}
+    probes = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        body = cls.releases.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = 0, len(body) - 1
+        rangeHeader = self.headers.get("Range")
+        if rangeHeader:
+            match = re.match(r'bytes=(\d+)-(\d*)', rangeHeader)
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %s-%s/%s" % (start, end, len(body)))
+        else:
+            self.send_response(200)
+
+        if rangeHeader == "bytes=0-0":
+            with cls.lock:
+                cls.probes.append(self.path)
+
+        self.send_header(PEEK_CONTENT_SHA256_HEADER, hashlib.sha256(body).hexdigest())
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self.wfile.write(body[start:end + 1])
+
+    def log_message(self, *args):
+        pass
+
+
+class PeekReleaseRelayTest(unittest.TestCase):
+    """ Runs the relay in another process, with several services downloading
+    through it """
+
+    RELEASE_PATH = '/peek_server.sw_install.plugin.download?name=peek_plugin_noop&version=1.0'
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.release = os.urandom(512 * 1024 + 3)
+        _UpstreamHandler.releases = {self.RELEASE_PATH: self.release}
+        _UpstreamHandler.probes = []
+
+        self.upstream = ThreadingHTTPServer(('127.0.0.1', 0), _UpstreamHandler)
+        self.upstream.daemon_threads = True
+        thread = threading.Thread(target=self.upstream.serve_forever,
+                                  kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(self.upstream.server_close)
+        self.addCleanup(self.upstream.shutdown)
+
+        self.relay = subprocess.Popen(
+            [sys.executable, '-m', 'peek_platform.sw_install.PeekReleaseRelay',
+             '--upstream-port', str(self.upstream.server_port), '--port', '0',
+             '--cache-dir', os.path.join(self._dir.name, 'relay')],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True)
+        self.addCleanup(self.relay.wait)
+        self.addCleanup(self.relay.kill)
+
+        line = self.relay.stdout.readline()
+        self.relayPort = int(re.search(r'port (\d+)', line).group(1))
+
+    def _download(self, index):
+        downloader = PeekReleaseDownloader(segmentCount=4, segmentMinBytes=64 * 1024,
+                                           retryDelaySeconds=0.01, timeoutSeconds=10)
+        filePath = os.path.join(self._dir.name, 'service%s.tar.gz' % index)
+        return downloader.download(
+            'http://127.0.0.1:%s%s' % (self.relayPort, self.RELEASE_PATH), filePath)
+
+    def testServicesShareOneDownload(self):
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(self._download, range(6)))
+
+        for result in results:
+            self.assertTrue(result.verified)
+            self.assertEqual(result.segmentCount, 4)
+            with open(result.filePath, 'rb') as f:
+                self.assertEqual(f.read(), self.release)
+
+        # The relay downloaded it from the peek server once
+        self.assertEqual(_UpstreamHandler.probes, [self.RELEASE_PATH])
+
+    def testMissingRelease(self):
+        self.RELEASE_PATH = self.RELEASE_PATH.replace('1.0', '2.0')
+
+        with self.assertRaisesRegex(Exception, '404'):
+            self._download(0)
+
+
+class PeekReleaseRelayResourceTest(unittest.TestCase):
+    """ The relay resource on it's own, the threads are run inline """
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.cache = PeekReleaseCache(os.path.join(self._dir.name, 'cache'))
+        self.relay = PeekReleaseRelayResource({RELEASE_KIND_PLUGIN: self.cache},
+                                              '127.0.0.1', 8011, self._dir.name)
+
+        patcher = mock.patch.object(PeekReleaseRelay, 'deferToThread',
+                                    lambda f, *args: defer.maybeDeferred(f, *args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request(self):
+        request = DummyRequest([b''])
+        request.args = {b'name': [b'peek_plugin_noop'], b'version': [b'1.0']}
+        return request
+
+    def _render(self, request):
+        resource = self.relay.getChildWithDefault(
+            releaseDownloadPath(RELEASE_KIND_PLUGIN).encode(), request)
+        return resource.render(request)
+
+    def testClientDisconnectsWhileWaiting(self):
+        fetchD = defer.Deferred()
+        with mock.patch.object(self.relay, 'fetch', return_value=fetchD):
+            request = self._request()
+            self.assertEqual(self._render(request), server.NOT_DONE_YET)
+
+        # The client goes away before the peek server download finishes
+        request.processingFailed(Failure(Exception("Connection lost")))
+
+        filePath = os.path.join(self._dir.name, 'release.tar.gz')
+        with open(filePath, 'wb') as f:
+            f.write(b'release')
+        fetchD.callback(self.cache.add(RELEASE_KIND_PLUGIN, 'peek_plugin_noop', '1.0',
+                                       filePath))
+
+        self.assertEqual(request.written, [])
+        self.assertEqual(request.finished, 0)
+
+    def testMissingReleaseIsAnswered(self):
+        with mock.patch.object(self.relay, 'fetch', return_value=defer.succeed(None)):
+            request = self._request()
+            self._render(request)
+
+        self.assertEqual(request.finished, 1)
+        self.assertEqual(b''.join(request.written), b'')
@@ -0,0 +1,154 @@
+import logging
+import os
+import tarfile
+import time
+from collections import namedtuple
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# The peak disk use is the size of the extracted files, plus the tar when it's
+# extracted from a file
+ReleaseExtractStats = namedtuple("ReleaseExtractStats",
+                                 ["source", "downloadedBytes", "extractedBytes",
+                                  "fileCount", "peakDiskBytes", "seconds"])
+
+
+class _CountingReader:
+    """ Counting Reader
+
+    Wraps the release file, counting the bytes read from it.
+    """
+
+    def __init__(self, fileobj, firstChunk: bytes):
+        self._fileobj = fileobj
+        self._buffer = firstChunk
+        self.bytesRead = len(firstChunk)
+
+    def read(self, size: int = -1) -> bytes:
+        # A short read is fine, tarfile reads until it has what it needs
+        if self._buffer:
+            data, self._buffer = self._buffer, b''
+            return data
+
+        data = self._fileobj.read(size)
+        self.bytesRead += len(data)
+        return data
+
+
+class PeekReleaseStreamExtractor:
+    """ Peek Release Stream Extractor
+
+    This class extracts a release tar in one pass, as it's read, rather than
+    checking it's a tar, then extracting it.
+
+    The memberCallback is called with each TarInfo before it's extracted, and the
+    fileCallback with each TarInfo and the path it was extracted to, so the release
+    can be checked, and rejected by raising an exception, as the entries arrive.
+
+    The extraction blocks, run it in a thread.
+
+    """
+
+    READ_SIZE = 1024 * 1024
+
+    def __init__(self, targetDir: str,
+                 memberCallback: Optional[Callable[[tarfile.TarInfo], None]] = None,
+                 fileCallback: Optional[Callable[[tarfile.TarInfo, str], None]] = None):
+        self._targetDir = targetDir
+        self._memberCallback = memberCallback
+        self._fileCallback = fileCallback
+
+    def extractFile(self, filePath: str) -> Optional[ReleaseExtractStats]:
+        """ Extract File
+
+        :return: The stats, or None if the file is empty
+        """
+        with open(filePath, 'rb') as f:
+            stats = self.extractStream(f, filePath)
+
+        if not stats:
+            return None
+
+        return stats._replace(
+            peakDiskBytes=stats.peakDiskBytes + os.path.getsize(filePath))
+
+    def extractStream(self, fileobj, source: str) -> Optional[ReleaseExtractStats]:
+        startTime = time.time()
+
+        firstChunk = fileobj.read(self.READ_SIZE)
+        if not firstChunk:
+            return None
+
+        reader = _CountingReader(fileobj, firstChunk)
+        extractedBytes = 0
+        fileCount = 0
+
+        try:
+            # "r|*" reads the tar as a stream, it never seeks back
+            with tarfile.open(fileobj=reader, mode='r|*') as tar:
+                for member in tar:
+                    self._checkMemberIsSafe(member)
+
+                    if self._memberCallback:
+                        self._memberCallback(member)
+
+                    self._extractMember(tar, member)
+
+                    if member.isfile():
+                        extractedBytes += member.size
+                        fileCount += 1
+
+                        if self._fileCallback:
+                            self._fileCallback(
+                                member, os.path.join(self._targetDir, member.name))
+
+        except tarfile.ReadError as e:
+            raise Exception("Release %s is not a tar file, %s" % (source, e))
+
+        return ReleaseExtractStats(source=source,
+                                   downloadedBytes=reader.bytesRead,
+                                   extractedBytes=extractedBytes,
+                                   fileCount=fileCount,
+                                   peakDiskBytes=extractedBytes,
+                                   seconds=time.time() - startTime)
+
+    def _extractMember(self, tar: tarfile.TarFile, member: tarfile.TarInfo) -> None:
+        if hasattr(tarfile, 'data_filter'):
+            tar.extract(member, self._targetDir, filter='data')
+        else:
+            tar.extract(member, self._targetDir)
+
+    @staticmethod
+    def _checkMemberIsSafe(member: tarfile.TarInfo) -> None:
+        """ Check Member Is Safe
+
+        Reject the entries that would be written outside the target dir, and
+        devices.
+        """
+
+        def isOutside(path: str) -> bool:
+            path = os.path.normpath(path)
+            return os.path.isabs(path) or path == '..' or path.startswith('..' + os.sep)
+
+        if isOutside(member.name):
+            raise Exception("Release entry %s is outside the release" % member.name)
+
+        if member.issym() and isOutside(os.path.join(os.path.dirname(member.name),
+                                                     member.linkname)):
+            raise Exception("Release symlink %s points outside the release"
+                            % member.name)
+
+        if member.islnk() and isOutside(member.linkname):
+            raise Exception("Release hardlink %s points outside the release"
+                            % member.name)
+
+        if member.isdev():
+            raise Exception("Release entry %s is a device" % member.name)
+
+
+def logReleaseExtractStats(description: str, stats: ReleaseExtractStats) -> None:
+    logger.info("%s : downloaded %.1f MB, extracted %s files, %.1f MB peak disk use,"
+                " in %.1fs",
+                description, stats.downloadedBytes / 1024.0 / 1024.0, stats.fileCount,
+                stats.peakDiskBytes / 1024.0 / 1024.0, stats.seconds)
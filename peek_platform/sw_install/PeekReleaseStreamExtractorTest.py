@@ -0,0 +1,95 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+
+from peek_platform.sw_install.PeekReleaseStreamExtractor import \
+    PeekReleaseStreamExtractor
+
+
+def _makeTar(files: [(str, bytes)]) -> bytes:
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w:gz') as tar:
+        for name, content in files:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return data.getvalue()
+
+
+class PeekReleaseStreamExtractorTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.targetDir = os.path.join(self._dir.name, 'release')
+        os.mkdir(self.targetDir)
+
+    def _file(self, fileName: str, data: bytes) -> str:
+        filePath = os.path.join(self._dir.name, fileName)
+        with open(filePath, 'wb') as f:
+            f.write(data)
+        return filePath
+
+    def testExtractFile(self):
+        package = os.urandom(200 * 1024)
+        filePath = self._file('release.tar.gz',
+                              _makeTar([('peek-release/stamp', b'1.2.3\n'),
+                                        ('peek-release/peek_platform.tar.gz', package)]))
+
+        checkedFiles = []
+        extractor = PeekReleaseStreamExtractor(
+            self.targetDir,
+            fileCallback=lambda member, path: checkedFiles.append(member.name))
+        stats = extractor.extractFile(filePath)
+
+        self.assertEqual(checkedFiles, ['peek-release/stamp',
+                                        'peek-release/peek_platform.tar.gz'])
+        self.assertEqual(stats.fileCount, 2)
+        self.assertEqual(stats.downloadedBytes, os.path.getsize(filePath))
+
+        # The tar is on disk while it's extracted
+        self.assertEqual(stats.peakDiskBytes,
+                         len(package) + 6 + os.path.getsize(filePath))
+
+        with open(os.path.join(self.targetDir, 'peek-release',
+                               'peek_platform.tar.gz'), 'rb') as f:
+            self.assertEqual(f.read(), package)
+
+    def testRejectEarly(self):
+        filePath = self._file('bad.tar.gz',
+                              _makeTar([('peek-release/stamp', b'9.9.9'),
+                                        ('peek-release/peek_platform.tar.gz',
+                                         b'x' * 1000)]))
+
+        def checkFile(member, path):
+            with open(path) as f:
+                if f.read() != '1.2.3':
+                    raise Exception("Wrong version")
+
+        with self.assertRaisesRegex(Exception, "Wrong version"):
+            PeekReleaseStreamExtractor(self.targetDir, fileCallback=checkFile) \
+                .extractFile(filePath)
+
+        self.assertFalse(os.path.exists(os.path.join(self.targetDir, 'peek-release',
+                                                     'peek_platform.tar.gz')))
+
+    def testNoRelease(self):
+        filePath = self._file('empty.tar.gz', b'')
+        self.assertIsNone(PeekReleaseStreamExtractor(self.targetDir)
+                          .extractFile(filePath))
+
+    def testUnsafeEntry(self):
+        filePath = self._file('unsafe.tar.gz', _makeTar([('../outside', b'x')]))
+
+        with self.assertRaisesRegex(Exception, "outside the release"):
+            PeekReleaseStreamExtractor(self.targetDir).extractFile(filePath)
+
+        self.assertFalse(os.path.exists(os.path.join(self._dir.name, 'outside')))
+
+    def testNotATar(self):
+        filePath = self._file('html.tar.gz', b'<html>Not found</html>')
+
+        with self.assertRaisesRegex(Exception, "not a tar file"):
+            PeekReleaseStreamExtractor(self.targetDir).extractFile(filePath)
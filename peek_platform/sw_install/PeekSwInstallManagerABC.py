@@ -13,20 +13,29 @@ import sys
 
 import logging
 import os
-import subprocess
-import tarfile
+import shutil
+import tempfile
+import time
 import urllib.error
 import urllib.parse
 import urllib.request
 from abc import ABCMeta
 from pytmpdir.Directory import Directory
-from subprocess import PIPE
 from twisted.internet import defer
 from twisted.internet.defer import inlineCallbacks
-from txhttputil.downloader.HttpFileDownloader import HttpFileDownloader
+from twisted.internet.threads import deferToThread
 from txhttputil.util.DeferUtil import deferToThreadWrap
 from typing import Optional, Generator
 
+from peek_platform.sw_install.PeekPipInstallPlanner import PeekPipInstallPlanner
+from peek_platform.sw_install.PeekReleaseCache import PeekReleaseCache, \
+    RELEASE_KIND_PLATFORM
+from peek_platform.sw_install.PeekReleaseDelta import PeekReleaseFileCache, \
+    rebuildReleaseFromDelta
+from peek_platform.sw_install.PeekReleaseDownloader import PeekReleaseDownloader
+from peek_platform.sw_install.PeekReleaseStreamExtractor import \
+    PeekReleaseStreamExtractor, logReleaseExtractStats
+
 logger = logging.getLogger(__name__)
 
 PEEK_PLATFORM_STAMP_FILE = 'stamp'
@@ -91,13 +100,24 @@ class PeekSwInstallManagerABC(metaclass=ABCMeta):
                         for f in directory.files
                         if f.name.endswith(".tar.gz") or f.name.endswith(".whl")]
 
+        return cls.makePipArgsForFiles(directory.path, absFilePaths)
+
+    @classmethod
+    def makePipArgsForFiles(cls, findLinksDir: str, absFilePaths: [str]):
+        """ Make PIP Args For Files
+
+        The same as makePipArgs, for a list of package files
+
+        :param findLinksDir: The directory where the peek-release is extracted to
+        :param absFilePaths: The absolute paths of the package files to install
+        """
         for absFilePath in absFilePaths:
             # Create and return the pip args
             yield ['install',  # Install the packages
                    '--force-reinstall',  # Reinstall if they already exist
                    '--no-cache-dir',  # Don't use the local pip cache
                    '--no-index',  # Work offline, don't use pypi
-                   '--find-links', directory.path,
+                   '--find-links', findLinksDir,
                    # Look in the directory for dependencies
                    absFilePath
                    ]
@@ -119,26 +139,124 @@ class PeekSwInstallManagerABC(metaclass=ABCMeta):
 
         from peek_platform import PeekPlatformConfig
 
-        url = ('http://%(ip)s:%(port)s/peek_server.sw_install.platform.download?'
-               ) % {"ip": PeekPlatformConfig.config.peekServerHost,
-                    "port": PeekPlatformConfig.config.peekServerPort}
+        # This is the site release relay, if there is one, see PeekReleaseRelay
+        serverUrl = 'http://%(ip)s:%(port)s/' % {
+            "ip": PeekPlatformConfig.config.releaseServerHost,
+            "port": PeekPlatformConfig.config.releaseServerPort}
 
         args = {"name": PeekPlatformConfig.componentName}
         if targetVersion:
             args["version"] = str(targetVersion)
 
-        url += urllib.parse.urlencode(args)
-
-        file = yield HttpFileDownloader(url).run()
-        if file.size == 0:
-            logger.warning("Peek server doesn't have any updates for %s, version %s",
-                           PeekPlatformConfig.componentName, targetVersion)
-            return
+        cache = PeekReleaseCache(PeekPlatformConfig.config.platformReleaseTarCachePath)
+        cached = yield deferToThread(cache.get, RELEASE_KIND_PLATFORM,
+                                     PeekPlatformConfig.componentName, targetVersion)
+        if cached:
+            logger.info("Installing peek release %s from the release cache",
+                        targetVersion)
+            yield self._blockingInstallUpdate(targetVersion, cached.filePath)
+            defer.returnValue(targetVersion)
+
+        releasePath = os.path.join(PeekPlatformConfig.config.tmpPath,
+                                   'peek-release-%s.tar.gz' % targetVersion)
+
+        # The download is resumed if it was interrupted, and checked before it's
+        # extracted
+        downloader = PeekReleaseDownloader(
+            segmentCount=PeekPlatformConfig.config.platformDownloadSegments)
+
+        rebuilt = False
+        if PeekPlatformConfig.config.platformDeltaUpdates:
+            rebuilt = yield self._downloadDelta(downloader, serverUrl, args,
+                                                targetVersion, releasePath)
+
+        # The cache works out the SHA-256 of a rebuilt release
+        sha256 = None
+
+        if not rebuilt:
+            url = (serverUrl + 'peek_server.sw_install.platform.download?'
+                   + urllib.parse.urlencode(args))
+
+            download = yield deferToThread(downloader.download, url, releasePath)
+
+            if not download:
+                logger.warning("Peek server doesn't have any updates for %s, version %s",
+                               PeekPlatformConfig.componentName, targetVersion)
+                return
+
+            logger.info("Downloaded peek release %s, %s bytes in %s segments,"
+                        " in %.1fs",
+                        targetVersion, download.sizeBytes, download.segmentCount,
+                        download.seconds)
+            sha256 = download.sha256
+
+        # Keep it for the next install, and for the relay to serve
+        if targetVersion:
+            cached = yield deferToThread(
+                cache.add, RELEASE_KIND_PLATFORM, PeekPlatformConfig.componentName,
+                targetVersion, releasePath, sha256)
+            releasePath = cached.filePath
 
-        yield self._blockingInstallUpdate(targetVersion, file.name)
+        try:
+            yield self._blockingInstallUpdate(targetVersion, releasePath)
+        finally:
+            if not cached:
+                os.remove(releasePath)
 
         defer.returnValue(targetVersion)
 
+    @inlineCallbacks
+    def _downloadDelta(self, downloader: PeekReleaseDownloader, serverUrl: str,
+                       args: dict, targetVersion: str, releasePath: str) -> bool:
+        """ Download Delta
+
+        Ask the server for only the files of the release that we don't have, from
+        the files of the current release kept in the release file cache, then
+        rebuild the full release from them, see rebuildReleaseFromDelta.
+
+        :return: True if the release was rebuilt at releasePath, False if the full
+            release has to be downloaded
+        """
+        from peek_platform import PeekPlatformConfig
+
+        cache = PeekReleaseFileCache(PeekPlatformConfig.config.platformReleaseCachePath)
+        fromVersion = PeekPlatformConfig.config.platformVersion
+        havePrefixes = cache.havePrefixes()
+
+        if not fromVersion or not havePrefixes:
+            defer.returnValue(False)
+
+        # There's no binary diff format yet, the changed files are sent whole
+        deltaArgs = dict(args, fromVersion=fromVersion, have=','.join(havePrefixes),
+                         diffFormats='')
+        url = (serverUrl + 'peek_server.sw_install.platform.download.delta?'
+               + urllib.parse.urlencode(deltaArgs))
+
+        deltaPath = releasePath + '.delta'
+        try:
+            download = yield deferToThread(downloader.download, url, deltaPath)
+            if not download:
+                defer.returnValue(False)
+
+            try:
+                stats = yield deferToThread(rebuildReleaseFromDelta, deltaPath, cache,
+                                            releasePath)
+            finally:
+                os.remove(deltaPath)
+
+        except Exception as e:
+            logger.warning("Delta update from %s to %s failed,"
+                           " downloading the full release, %s",
+                           fromVersion, targetVersion, e)
+            defer.returnValue(False)
+
+        logger.info("Rebuilt peek release %s from a %s byte delta, %s of %s files"
+                    " (%s bytes) were reused from %s",
+                    targetVersion, download.sizeBytes, stats.cachedFileCount,
+                    stats.fileCount, stats.cachedBytes, fromVersion)
+
+        defer.returnValue(True)
+
     @inlineCallbacks
     def installAndRestart(self, targetVersion: str) -> None:
         newSoftwareTar = self.makeReleaseFileName(targetVersion)
@@ -152,6 +270,9 @@ class PeekSwInstallManagerABC(metaclass=ABCMeta):
         This method installs the packages in the latest peek-release.
         It then calls self.restartProcess to restart the service
 
+        The release is extracted in one pass, the stamp file is checked as soon as
+        it's extracted.
+
         :param targetVersion: The version we should be updating to.
         :param fullTarPath: The path to the peek-release to install
         :return: The version that was installed, (from the file in the release)
@@ -159,40 +280,72 @@ class PeekSwInstallManagerABC(metaclass=ABCMeta):
 
         from peek_platform import PeekPlatformConfig
 
-        if not tarfile.is_tarfile(fullTarPath):
-            raise Exception("Platform update download is not a tar file")
+        startTime = time.time()
+        releaseDir = tempfile.mkdtemp(prefix="peek_release_")
+        packagePaths = []
+        stampVersions = []
+
+        def checkFile(member, absPath):
+            fileName = os.path.basename(member.name)
+            if fileName.endswith(".tar.gz") or fileName.endswith(".whl"):
+                packagePaths.append(absPath)
+
+            if fileName != PEEK_PLATFORM_STAMP_FILE:
+                return
+
+            with open(absPath) as f:
+                stampVersion = f.read().strip()
+
+            if stampVersion != targetVersion:
+                raise Exception("Stamp file version %s doesn't match target version %s"
+                                % (stampVersion, targetVersion))
+
+            stampVersions.append(stampVersion)
+
+        try:
+            extractor = PeekReleaseStreamExtractor(releaseDir, fileCallback=checkFile)
+            stats = extractor.extractFile(fullTarPath)
+
+            if not stats:
+                raise Exception("Peek release %s is empty" % fullTarPath)
 
-        directory = Directory()
-        tarfile.open(fullTarPath).extractall(directory.path)
-        directory.scan()
+            if not stampVersions:
+                raise Exception("Peek release %s doesn't contain version stamp file %s"
+                                % (stats.source, PEEK_PLATFORM_STAMP_FILE))
 
-        stampFile = directory.getFile(name=PEEK_PLATFORM_STAMP_FILE)
-        if not stampFile:
-            raise Exception("Peek release %s doesn't contain version stamp file %s"
-                            % (fullTarPath, PEEK_PLATFORM_STAMP_FILE))
+            logReleaseExtractStats("Peek release %s" % targetVersion, stats)
 
-        with stampFile.open() as f:
-            stampVersion = f.read().strip()
+            self._pipInstall(releaseDir, packagePaths)
 
-        if stampVersion != targetVersion:
-            raise Exception("Stamp file version %s doesn't match target version %s"
-                            % (stampVersion, targetVersion))
+            # Keep the files of this release, so the next update can be a delta
+            try:
+                PeekReleaseFileCache(PeekPlatformConfig.config.platformReleaseCachePath) \
+                    .replaceWithDir(releaseDir)
 
-        self._pipInstall(directory)
+            except Exception as e:
+                logger.warning("Failed to cache the release files, %s", e)
+
+        finally:
+            shutil.rmtree(releaseDir, ignore_errors=True)
 
         PeekPlatformConfig.config.platformVersion = targetVersion
 
+        logger.info("Peek release %s installed in %.1fs",
+                    targetVersion, time.time() - startTime)
+
         # Call later, allow the server time to respond to the UI
         # reactor.callLater(2.0, self.restartProcess)
 
         return targetVersion
 
-    def _pipInstall(self, directory: Directory) -> None:
+    def _pipInstall(self, releaseDir: str, packagePaths: [str]) -> None:
         """ Pip Install
 
-        Runs the PIP install for the packages provided in the directory
+        Runs one PIP install for the packages in the release that have changed,
+        see PeekPipInstallPlanner
 
-        :param directory: The directory containing the
+        :param releaseDir: The directory containing the extracted release
+        :param packagePaths: The absolute paths of the packages in the release
         :return: None
 
         """
@@ -203,28 +356,15 @@ class PeekSwInstallManagerABC(metaclass=ABCMeta):
 
         logger.debug("Using interpreter : %s", bashExec)
 
-        ### DEBUG ###
-        self._autoDelete = False
-
-
-        for pipArgs in self.makePipArgs(directory):
-            pipArgs = [pipExec] + pipArgs
-
-            print(' '.join(pipArgs))  # DEBUG
+        planner = PeekPipInstallPlanner(
+            PeekPlatformConfig.config.platformPipInstallStatePath)
+        plan = planner.plan(packagePaths)
 
-            logger.debug("Executing command : %s", pipArgs)
-
-            commandComplete = subprocess.run(' '.join(pipArgs),
-                                             executable=bashExec,
-                                             stdout=PIPE, stderr=PIPE, shell=True)
-
-            if commandComplete.returncode:
-                raise PlatformInstallException(
-                    "Failed to install platform package updates",
-                    stdout=commandComplete.stdout.decode(),
-                    stderr=commandComplete.stderr.decode())
-
-        pass
+        result = planner.install(pipExec, releaseDir, plan, bashExec=bashExec)
+        if result.returnCode:
+            raise PlatformInstallException(
+                "Failed to install platform package updates",
+                stdout=result.output, stderr='')
 
     # @abstractmethod
     # def _stopCode(self) -> None:
@@ -0,0 +1,104 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+
+from twisted.internet import defer
+from twisted.python.failure import Failure
+
+from peek_platform import PeekPlatformConfig
+from peek_platform.sw_install.PeekSwInstallManagerABC import PeekSwInstallManagerABC
+
+
+class _Config:
+    """ The config the install reads and writes """
+
+    def __init__(self, homeDir):
+        self.platformReleaseCachePath = os.path.join(homeDir, 'release_cache')
+        self.platformVersion = '1.0.0'
+
+
+class PeekSwInstallManagerABCTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        # The release is extracted in the temp dir
+        self.tmpDir = os.path.join(self._dir.name, 'tmp')
+        os.mkdir(self.tmpDir)
+
+        oldConfig = PeekPlatformConfig.config
+        self.addCleanup(setattr, PeekPlatformConfig, 'config', oldConfig)
+        self.config = PeekPlatformConfig.config = _Config(self._dir.name)
+
+        # Install in this thread, without pip
+        self.manager = PeekSwInstallManagerABC()
+        for patch in (mock.patch('txhttputil.util.DeferUtil.deferToThread',
+                                 defer.execute),
+                      mock.patch.object(tempfile, 'tempdir', self.tmpDir),
+                      mock.patch.object(self.manager, '_pipInstall')):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _tar(self, files: [(str, bytes)]) -> str:
+        tarPath = os.path.join(self._dir.name, 'peek-release.tar.gz')
+        with tarfile.open(tarPath, mode='w:gz') as tar:
+            for name, content in files:
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        return tarPath
+
+    def _install(self, tarPath, targetVersion='1.1.0'):
+        results = []
+        self.manager._blockingInstallUpdate(targetVersion, tarPath) \
+            .addBoth(results.append)
+        return results[0]
+
+    def _assertRejected(self, files, message):
+        failure = self._install(self._tar(files))
+
+        self.assertIsInstance(failure, Failure)
+        self.assertRegex(str(failure.value), message)
+
+        # Nothing is installed, and the extract dir is removed
+        self.assertFalse(self.manager._pipInstall.called)
+        self.assertEqual(self.config.platformVersion, '1.0.0')
+        self.assertEqual(os.listdir(self.tmpDir), [])
+
+    def testInstall(self):
+        self.assertEqual(self._install(self._tar([
+            ('peek-release/stamp', b'1.1.0\n'),
+            ('peek-release/peek_platform-1.1.0.tar.gz', b'platform'),
+            ('peek-release/README', b'')])), '1.1.0')
+
+        releaseDir, packagePaths = self.manager._pipInstall.call_args[0]
+        self.assertEqual(os.path.dirname(releaseDir), self.tmpDir)
+        self.assertEqual(packagePaths,
+                         [os.path.join(releaseDir, 'peek-release',
+                                       'peek_platform-1.1.0.tar.gz')])
+
+        self.assertEqual(self.config.platformVersion, '1.1.0')
+        self.assertEqual(os.listdir(self.tmpDir), [])
+
+    def testWrongStamp(self):
+        self._assertRejected(
+            [('peek-release/stamp', b'1.2.0\n'),
+             ('peek-release/peek_platform-1.2.0.tar.gz', b'platform')],
+            "Stamp file version 1.2.0 doesn't match target version 1.1.0")
+
+    def testMissingStamp(self):
+        self._assertRejected(
+            [('peek-release/peek_platform-1.1.0.tar.gz', b'platform')],
+            "doesn't contain version stamp file stamp")
+
+    def testEmptyRelease(self):
+        tarPath = os.path.join(self._dir.name, 'peek-release.tar.gz')
+        open(tarPath, 'w').close()
+
+        failure = self._install(tarPath)
+        self.assertIsInstance(failure, Failure)
+        self.assertRegex(str(failure.value), "is empty")
+        self.assertEqual(os.listdir(self.tmpDir), [])
@@ -13,20 +13,24 @@ import json
 import logging
 import os
 import shutil
-import tarfile
 import tempfile
+import time
 import urllib.error
 import urllib.parse
 import urllib.request
 
-from pytmpdir.Directory import Directory
 from twisted.internet import reactor, defer
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.threads import deferToThread
 
 from peek_platform import PeekPlatformConfig
 from peek_platform.file_config.PeekFileConfigPlatformMixin import \
     PeekFileConfigPlatformMixin
-from txhttputil.downloader.HttpFileDownloader import HttpFileDownloader
+from peek_platform.sw_install.PeekReleaseCache import PeekReleaseCache, \
+    RELEASE_KIND_PLUGIN
+from peek_platform.sw_install.PeekReleaseDownloader import PeekReleaseDownloader
+from peek_platform.sw_install.PeekReleaseStreamExtractor import \
+    PeekReleaseStreamExtractor, logReleaseExtractStats
 from vortex.Payload import deferToThreadWrap
 
 logger = logging.getLogger(__name__)
@@ -42,9 +46,19 @@ class PluginSwInstallManagerBase:
 
         from peek_platform import PeekPlatformConfig
 
+        cache = PeekReleaseCache(PeekPlatformConfig.config.pluginReleaseTarCachePath)
+        cached = yield deferToThread(cache.get, RELEASE_KIND_PLUGIN, pluginName,
+                                     targetVersion)
+        if cached:
+            logger.info("Installing plugin %s %s from the release cache",
+                        pluginName, targetVersion)
+            yield self.installAndReload(pluginName, targetVersion, cached.filePath)
+            defer.returnValue(targetVersion)
+
+        # This is the site release relay, if there is one, see PeekReleaseRelay
         url = ('http://%(ip)s:%(port)s/peek_server.sw_install.plugin.download?'
-               ) % {"ip": PeekPlatformConfig.config.peekServerHost,
-                    "port": PeekPlatformConfig.config.peekServerPort}
+               ) % {"ip": PeekPlatformConfig.config.releaseServerHost,
+                    "port": PeekPlatformConfig.config.releaseServerPort}
 
         args = {"name": pluginName}
         if targetVersion:
@@ -52,71 +66,129 @@ class PluginSwInstallManagerBase:
 
         url += urllib.parse.urlencode(args)
 
-        file = yield HttpFileDownloader(url).run()
-        if file.size == 0:
+        # The download is resumed if it was interrupted, and checked before it's
+        # extracted
+        downloader = PeekReleaseDownloader(
+            segmentCount=PeekPlatformConfig.config.platformDownloadSegments)
+        download = yield deferToThread(
+            downloader.download, url,
+            os.path.join(PeekPlatformConfig.config.tmpPath,
+                         '%s-%s.tar.gz' % (pluginName, targetVersion)))
+
+        if not download:
             logger.warning(
                 "Peek server doesn't have any updates for agent %s, version %s",
                 pluginName, targetVersion)
             return
 
-        yield self.installAndReload(pluginName, targetVersion, file.realPath)
+        logger.info("Downloaded plugin %s %s, %s bytes in %s segments, in %.1fs",
+                    pluginName, targetVersion, download.sizeBytes,
+                    download.segmentCount, download.seconds)
+
+        releasePath = download.filePath
+
+        # Keep it for the next install, and for the relay to serve
+        if targetVersion:
+            cached = yield deferToThread(cache.add, RELEASE_KIND_PLUGIN, pluginName,
+                                         targetVersion, releasePath, download.sha256)
+            releasePath = cached.filePath
+
+        try:
+            yield self.installAndReload(pluginName, targetVersion, releasePath)
+        finally:
+            if not cached:
+                os.remove(releasePath)
 
         defer.returnValue(targetVersion)
 
     @deferToThreadWrap
     def installAndReload(self, pluginName, targetVersion, fullTarPath):
+        """ Install And Reload
+
+        The release is extracted in one pass, each entry is checked as it's
+        extracted, so a bad release is rejected before the rest is written.
+
+        """
 
         assert isinstance(PeekPlatformConfig.config, PeekFileConfigPlatformMixin)
         pluginVersionJsonFileName = "plugin_version.json"
 
-        if not tarfile.is_tarfile(fullTarPath):
-            raise Exception("Plugin update %s download is not a tar file" % pluginName)
+        startTime = time.time()
+        expectedRootDirPrefix = "%s_%s#" % (pluginName, targetVersion)
+        pluginVersionJsons = []
+
+        def checkMember(member):
+            memberName = os.path.normpath(member.name)
+            if memberName == '.':
+                return
 
-        directory = Directory()
-        tarfile.open(fullTarPath).extractall(directory.path)
-        directory.scan()
+            rootDirName = memberName.split(os.sep)[0]
+            if not rootDirName.startswith(expectedRootDirPrefix):
+                raise Exception("Plugin %s, archive root dir is expected to be %s*"
+                                " but its %s"
+                                % (pluginName, expectedRootDirPrefix, rootDirName))
 
-        pluginVersionJson = [f for f in directory.files if f.name == pluginVersionJsonFileName]
+        def checkFile(member, absPath):
+            if os.path.basename(member.name) != pluginVersionJsonFileName:
+                return
 
-        if len(pluginVersionJson) != 1:
-            raise Exception("Archive does not contain Peek App software"
-                            ", Expected 1 %s, got %s"
-                            % (pluginVersionJsonFileName, len(pluginVersionJson)))
+            archiveRootDirName = os.path.dirname(os.path.normpath(member.name))
 
-        pluginVersionJson = pluginVersionJson[0]
+            if os.sep in archiveRootDirName or not archiveRootDirName:
+                raise Exception("Plugin %s Expected %s to be one level down, it's at %s"
+                                % (pluginName, pluginVersionJsonFileName,
+                                   member.name))
 
-        with pluginVersionJson.open() as f:
-            jsonObj = json.load(f)
+            with open(absPath) as f:
+                jsonObj = json.load(f)
 
-        jsonVersion = jsonObj['version']
-        jsonBuild = jsonObj['buildNumber']
+            jsonVersion = jsonObj['version']
+            jsonBuild = jsonObj['buildNumber']
 
-        if jsonVersion != targetVersion:
-            raise Exception("Plugin %s Target version is %s json version is %s"
-                            % (pluginName, targetVersion, jsonVersion))
+            if jsonVersion != targetVersion:
+                raise Exception("Plugin %s Target version is %s json version is %s"
+                                % (pluginName, targetVersion, jsonVersion))
 
-        archiveRootDirName = pluginVersionJson.path
+            expectedRootDir = "%s_%s#%s" % (pluginName, jsonVersion, jsonBuild)
+            if archiveRootDirName != expectedRootDir:
+                raise Exception("Plugin %s, archive root dir is expected to be %s"
+                                " but its %s"
+                                % (pluginName, expectedRootDir, archiveRootDirName))
 
-        if '/' in archiveRootDirName:
-            raise Exception("Plugin %s Expected %s to be one level down, it's at %s"
-                            % (pluginName, pluginVersionJsonFileName, archiveRootDirName))
+            pluginVersionJsons.append(archiveRootDirName)
 
-        expectedRootDir = "%s_%s#%s" % (pluginName, jsonVersion, jsonBuild)
-        if archiveRootDirName != expectedRootDir:
-            raise Exception("Plugin %s, archive root dir is expected to be %s but its %s"
-                            % (pluginName, expectedRootDir, archiveRootDirName))
+        # Extract next to the plugins, so the new version is moved in with a rename
+        releaseDir = tempfile.mkdtemp(dir=PeekPlatformConfig.config.pluginSoftwarePath,
+                                      prefix=".download_")
+        try:
+            extractor = PeekReleaseStreamExtractor(releaseDir,
+                                                   memberCallback=checkMember,
+                                                   fileCallback=checkFile)
+            stats = extractor.extractFile(fullTarPath)
+
+            if not stats:
+                raise Exception("Plugin %s release %s is empty"
+                                % (pluginName, fullTarPath))
+
+            if len(pluginVersionJsons) != 1:
+                raise Exception("Archive does not contain Peek App software"
+                                ", Expected 1 %s, got %s"
+                                % (pluginVersionJsonFileName, len(pluginVersionJsons)))
+
+            logReleaseExtractStats("Plugin %s %s" % (pluginName, targetVersion), stats)
+
+            archiveRootDirName = pluginVersionJsons[0]
+            self._movePluginIntoPlace(releaseDir, archiveRootDirName)
+
+        finally:
+            shutil.rmtree(releaseDir, ignore_errors=True)
 
         newPath = os.path.join(PeekPlatformConfig.config.pluginSoftwarePath,
                                archiveRootDirName)
 
-        # Move the old version out of the way.
-        if os.path.exists(newPath):
-            oldPath = tempfile.mkdtemp(dir=PeekPlatformConfig.config.pluginSoftwarePath,
-                                       prefix=archiveRootDirName)
-            shutil.move(newPath, oldPath)
-
-        # Move the new version into place
-        shutil.move(os.path.join(directory.path, archiveRootDirName), newPath)
+        # The cached package config is for the old version
+        if PeekPlatformConfig.pluginLoader:
+            PeekPlatformConfig.pluginLoader.invalidatePluginManifest(pluginName)
 
         PeekPlatformConfig.config.setPluginVersion(pluginName, targetVersion)
         PeekPlatformConfig.config.setPluginDir(pluginName, newPath)
@@ -126,8 +198,24 @@ class PluginSwInstallManagerBase:
         PeekPlatformConfig.config.pluginsEnabled = list(set(
             PeekPlatformConfig.config.pluginsEnabled + [pluginName]))
 
+        logger.info("Plugin %s %s installed in %.1fs",
+                    pluginName, targetVersion, time.time() - startTime)
+
         # RELOAD PLUGIN
         reactor.callLater(0, self.notifyOfPluginVersionUpdate, pluginName, targetVersion)
 
+    def _movePluginIntoPlace(self, releaseDir: str, archiveRootDirName: str) -> None:
+        newPath = os.path.join(PeekPlatformConfig.config.pluginSoftwarePath,
+                               archiveRootDirName)
+
+        # Move the old version out of the way.
+        if os.path.exists(newPath):
+            oldPath = tempfile.mkdtemp(dir=PeekPlatformConfig.config.pluginSoftwarePath,
+                                       prefix=archiveRootDirName)
+            shutil.move(newPath, oldPath)
+
+        # Move the new version into place
+        shutil.move(os.path.join(releaseDir, archiveRootDirName), newPath)
+
     def notifyOfPluginVersionUpdate(self, pluginName, targetVersion):
         raise NotImplementedError("notifyOfPluginVersionUpdate")
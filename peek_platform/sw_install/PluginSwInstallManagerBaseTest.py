@@ -0,0 +1,141 @@
+import io
+import json
+import os
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+
+from twisted.internet import defer
+from twisted.python.failure import Failure
+
+from peek_platform import PeekPlatformConfig
+from peek_platform.file_config.PeekFileConfigPlatformMixin import \
+    PeekFileConfigPlatformMixin
+from peek_platform.sw_install import PluginSwInstallManagerBase as managerModule
+from peek_platform.sw_install.PluginSwInstallManagerBase import \
+    PluginSwInstallManagerBase
+
+PLUGIN_NAME = 'plugin_noop'
+
+
+class _Config(PeekFileConfigPlatformMixin):
+    """ The config the install reads and writes """
+
+    pluginSoftwarePath = None
+    pluginsEnabled = None
+
+    def __init__(self, pluginSoftwarePath):
+        self.pluginSoftwarePath = pluginSoftwarePath
+        self.pluginsEnabled = []
+        self.versions = {}
+        self.dirs = {}
+
+    def setPluginVersion(self, pluginName, version):
+        self.versions[pluginName] = version
+
+    def setPluginDir(self, pluginName, dir):
+        self.dirs[pluginName] = dir
+
+
+def _pluginVersionJson(version='1.0.0', buildNumber='5') -> bytes:
+    return json.dumps({"version": version, "buildNumber": buildNumber}).encode()
+
+
+class PluginSwInstallManagerBaseTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+        self.pluginSoftwarePath = os.path.join(self._dir.name, 'plugins')
+        os.mkdir(self.pluginSoftwarePath)
+
+        oldConfig = PeekPlatformConfig.config
+        self.addCleanup(setattr, PeekPlatformConfig, 'config', oldConfig)
+        self.config = PeekPlatformConfig.config = _Config(self.pluginSoftwarePath)
+
+        # Install in this thread, and don't reload the plugin on the reactor
+        for patch in (mock.patch('vortex.Payload.deferToThread', defer.execute),
+                      mock.patch.object(PeekPlatformConfig, 'pluginLoader', None)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.manager = PluginSwInstallManagerBase()
+
+    def _tar(self, files: [(str, bytes)]) -> str:
+        tarPath = os.path.join(self._dir.name, 'release.tar.gz')
+        with tarfile.open(tarPath, mode='w:gz') as tar:
+            for name, content in files:
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        return tarPath
+
+    def _install(self, tarPath, targetVersion='1.0.0'):
+        """ Install the release
+
+        :return: The Failure if the release was rejected, otherwise None
+        """
+        results = []
+        with mock.patch.object(managerModule, 'reactor') as reactor:
+            self.manager.installAndReload(PLUGIN_NAME, targetVersion, tarPath) \
+                .addBoth(results.append)
+
+        self.reloadCalls = reactor.callLater.call_args_list
+        return results[0]
+
+    def _assertRejected(self, files, message):
+        failure = self._install(self._tar(files))
+
+        self.assertIsInstance(failure, Failure)
+        self.assertRegex(str(failure.value), message)
+
+        # Nothing is installed, and the extract dir is removed
+        self.assertEqual(os.listdir(self.pluginSoftwarePath), [])
+        self.assertEqual(self.config.versions, {})
+        self.assertEqual(self.reloadCalls, [])
+
+    def testInstall(self):
+        rootDir = 'plugin_noop_1.0.0#5'
+        self.assertIsNone(self._install(self._tar([
+            (rootDir + '/plugin_version.json', _pluginVersionJson()),
+            (rootDir + '/plugin_noop/__init__.py', b'')])))
+
+        newPath = os.path.join(self.pluginSoftwarePath, rootDir)
+        self.assertEqual(os.listdir(self.pluginSoftwarePath), [rootDir])
+        self.assertTrue(os.path.isfile(os.path.join(newPath, 'plugin_noop',
+                                                    '__init__.py')))
+
+        self.assertEqual(self.config.versions, {PLUGIN_NAME: '1.0.0'})
+        self.assertEqual(self.config.dirs, {PLUGIN_NAME: newPath})
+        self.assertEqual(self.config.pluginsEnabled, [PLUGIN_NAME])
+        self.assertEqual(self.reloadCalls,
+                         [mock.call(0, self.manager.notifyOfPluginVersionUpdate,
+                                    PLUGIN_NAME, '1.0.0')])
+
+    def testWrongVersion(self):
+        self._assertRejected(
+            [('plugin_noop_1.0.0#5/plugin_version.json', _pluginVersionJson('1.0.1'))],
+            "Target version is 1.0.0 json version is 1.0.1")
+
+    def testWrongBuildNumber(self):
+        self._assertRejected(
+            [('plugin_noop_1.0.0#5/plugin_version.json',
+              _pluginVersionJson(buildNumber='6'))],
+            "root dir is expected to be plugin_noop_1.0.0#6")
+
+    def testWrongRootDir(self):
+        self._assertRejected(
+            [('plugin_other_1.0.0#5/plugin_version.json', _pluginVersionJson())],
+            "root dir is expected to be plugin_noop_1.0.0#\\*")
+
+    def testNestedPluginVersionJson(self):
+        self._assertRejected(
+            [('plugin_noop_1.0.0#5/plugin_noop/plugin_version.json',
+              _pluginVersionJson())],
+            "to be one level down")
+
+    def testMissingPluginVersionJson(self):
+        self._assertRejected(
+            [('plugin_noop_1.0.0#5/plugin_noop/__init__.py', b'')],
+            "Expected 1 plugin_version.json, got 0")
@@ -9,6 +9,9 @@ from twisted.internet.defer import Deferred, DeferredList
 from vortex.Payload import Payload
 from vortex.PayloadEndpoint import PayloadEndpoint
 
+# Register the tuple type, the server replies with these
+from peek_platform.sw_version.PeekSwVersionTuple import PeekSwVersionTuple
+
 __author__ = 'peek'
 import logging
 
@@ -1,6 +1,4 @@
 __author__ = 'peek'
 
-from txhttputil.util.ModuleUtil import filterModules
-
-for mod in filterModules(__name__, __file__):
-    __import__(mod, locals(), globals())
+# The submodules are imported by the services that use them, EG
+# from peek_platform.sw_version.PeekSwVersionPollHandler import peekSwVersionPollHandler